@@ -1,7 +1,7 @@
-import random
 from sqlalchemy.orm import Session
 from database import DBDiscussion
 from datetime import datetime
+from core.agent_random import agent_random
 
 # ---------------------------------------------------------
 # 1. 페르소나별 대사 템플릿 (성향 및 현실성 반영 대폭 확장)
@@ -135,8 +135,17 @@ def get_agent_type(agent_id):
     else: return "SPECULATOR"        # 20% 투기/단타꾼
 
 def post_comment(db: Session, agent_id: str, ticker: str, action: str, company_name: str, sim_time: datetime = None):
+    post = compose_comment(agent_id, ticker, action, company_name, sim_time)
+    if post is None:
+        return
+    db.add(DBDiscussion(**post))
+    db.commit()
+
+def compose_comment(agent_id: str, ticker: str, action: str, company_name: str, sim_time: datetime = None):
+    """체결 후 종토방 글 1개를 만듭니다. (DB에 쓰지 않고 DBDiscussion 컬럼 dict 반환, 안 쓰기로 하면 None)"""
     # 🎲 글 쓰는 확률 (투기꾼일수록 말이 많음)
     agent_type = get_agent_type(agent_id)
+    rng = agent_random.get(agent_id)
     
     # 확률 세팅: 실제 종토방처럼 단타꾼들이 가장 글을 많이 쓰도록 설정
     threshold = 0.2
@@ -144,7 +153,7 @@ def post_comment(db: Session, agent_id: str, ticker: str, action: str, company_n
     elif agent_type == "CONTRARIAN": threshold = 0.3 # 역발상은 30%
     elif agent_type == "VALUE": threshold = 0.1     # 가치투자는 10% (묵묵히 매매함)
 
-    if random.random() > threshold:
+    if rng.random() > threshold:
         return
 
     # 대사 선택
@@ -153,15 +162,15 @@ def post_comment(db: Session, agent_id: str, ticker: str, action: str, company_n
 
     if action == "BUY":
         sentiment = "BULL"
-        if agent_type == "VALUE": template = random.choice(VALUE_BULL)
-        elif agent_type == "CONTRARIAN": template = random.choice(CONTRARIAN_BULL)
-        else: template = random.choice(SPECULATOR_BULL)
+        if agent_type == "VALUE": template = rng.choice(VALUE_BULL)
+        elif agent_type == "CONTRARIAN": template = rng.choice(CONTRARIAN_BULL)
+        else: template = rng.choice(SPECULATOR_BULL)
     
     elif action == "SELL":
         sentiment = "BEAR"
-        if agent_type == "VALUE": template = random.choice(VALUE_BEAR)
-        elif agent_type == "CONTRARIAN": template = random.choice(CONTRARIAN_BEAR)
-        else: template = random.choice(SPECULATOR_BEAR)
+        if agent_type == "VALUE": template = rng.choice(VALUE_BEAR)
+        elif agent_type == "CONTRARIAN": template = rng.choice(CONTRARIAN_BEAR)
+        else: template = rng.choice(SPECULATOR_BEAR)
     
     else:
         return
@@ -169,16 +178,13 @@ def post_comment(db: Session, agent_id: str, ticker: str, action: str, company_n
     # 내용 완성 (가끔 템플릿에 {name} 포맷팅이 있을 경우를 위해)
     content = template.replace("{name}", company_name)
 
-    # DB에 저장
-    new_post = DBDiscussion(
-        ticker=ticker,
-        agent_id=agent_id,
-        content=content,
-        sentiment=sentiment,
-        created_at=sim_time or datetime.now()
-    )
-    db.add(new_post)
-    db.commit()
+    return {
+        "ticker": ticker,
+        "agent_id": agent_id,
+        "content": content,
+        "sentiment": sentiment,
+        "created_at": sim_time or datetime.now()
+    }
     
     # 서버 로그 확인용 (선택)
     # print(f"💬 [{agent_type}] {agent_id}: {content}")
\ No newline at end of file
@@ -0,0 +1,37 @@
+import random
+import threading
+
+# ------------------------------------------------------------------
+# 에이전트별 난수 (Per-Agent RNG)
+# - seed()를 부르면 에이전트마다 (시드, agent_id)로 초기화한 random.Random을 따로 씀
+#   → 다른 에이전트가 먼저 끝나든 늦게 끝나든(스레드/태스크 완료 순서) 한 에이전트가 뽑는 난수열은 같음
+# - seed() 전에는 전역 random 모듈을 그대로 돌려줌 (서버 실행은 예전과 같음)
+# - 헤드리스 실행(scripts/fast_forward.py, 샤드 워커)이 --seed로 켬
+# ------------------------------------------------------------------
+
+
+class AgentRandom:
+    def __init__(self):
+        self.base_seed = None
+        self._rngs = {}
+        self._lock = threading.Lock()
+
+    def seed(self, base_seed):
+        """에이전트별 난수를 켭니다. (None이면 끄고 전역 random으로)"""
+        with self._lock:
+            self.base_seed = base_seed
+            self._rngs = {}
+
+    def get(self, agent_id: str):
+        """agent_id의 난수 생성기 (random 모듈과 같은 메서드: random/uniform/randint/choice ...)"""
+        if self.base_seed is None:
+            return random
+        rng = self._rngs.get(agent_id)
+        if rng is None:
+            with self._lock:
+                # 문자열 시드는 프로세스마다 같은 값 (hash()처럼 PYTHONHASHSEED를 타지 않음)
+                rng = self._rngs.setdefault(agent_id, random.Random(f"{self.base_seed}:{agent_id}"))
+        return rng
+
+
+agent_random = AgentRandom()
@@ -1,17 +1,25 @@
 import os
 import json
 import random
+import asyncio
 from openai import AsyncAzureOpenAI
 from dotenv import load_dotenv
 from models.domain_models import AgentState
 
 load_dotenv()
 
-client = AsyncAzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-)
+_client = None
+
+def get_client() -> AsyncAzureOpenAI:
+    """Azure 클라이언트는 처음 LLM을 부를 때 만듭니다. (오프라인 정책만 쓰는 헤드리스 실행은 키 없이도 import 가능)"""
+    global _client
+    if _client is None:
+        _client = AsyncAzureOpenAI(
+            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
+        )
+    return _client
 AGENT_MODEL = os.getenv("MODEL_AGENT", "gpt-4o-mini") 
 
 # [ASFM 논문 Appendix A.1 기반] 페르소나 정의
@@ -36,6 +44,18 @@ def get_agent_persona(agent_name):
         return "Aggressive Speculator (공격적 투기꾼)", \
                "모멘텀과 추세를 추종합니다. 오르는 말에 올라타는 것을 즐기며, 하이 리스크 하이 리턴을 추구합니다."
 
+def describe_position(current_price, portfolio_qty=0, avg_price=0, is_social_mode=False) -> str:
+    """보유 수익률을 프롬프트용 한 줄로 만듭니다."""
+    status_msg = "보유 주식 없음"
+    if portfolio_qty > 0 and avg_price > 0 and not is_social_mode:
+        roi = ((current_price - avg_price) / avg_price) * 100
+        roi_str = f"{roi:+.2f}%"
+        if roi > 0: status_msg = f"🟢 수익 중 ({roi_str})"
+        else: status_msg = f"🔴 손실 중 ({roi_str})"
+    elif is_social_mode:
+        status_msg = "전체 계좌 상황을 보며 커뮤니티 활동 중"
+    return status_msg
+
 # [AgentSociety 논문 핵심] 흐름(Stream)과 상호작용(Interaction)이 추가된 뇌
 async def agent_society_think(
     agent_name, 
@@ -54,14 +74,7 @@ async def agent_society_think(
     is_social_mode = (current_price <= 0)
 
     # 1. 자산 상태 분석
-    status_msg = "보유 주식 없음"
-    if portfolio_qty > 0 and avg_price > 0 and not is_social_mode:
-        roi = ((current_price - avg_price) / avg_price) * 100
-        roi_str = f"{roi:+.2f}%"
-        if roi > 0: status_msg = f"🟢 수익 중 ({roi_str})"
-        else: status_msg = f"🔴 손실 중 ({roi_str})"
-    elif is_social_mode:
-        status_msg = "전체 계좌 상황을 보며 커뮤니티 활동 중"
+    status_msg = describe_position(current_price, portfolio_qty, avg_price, is_social_mode)
 
     # 2. [Stream Memory] 기억 복원
     memory_context = "최근 거래 기록 없음."
@@ -113,8 +126,10 @@ async def agent_society_think(
     }}
     """
 
+    # 실패(마감/연결/429/JSON 깨짐/빈 응답)는 여기서 가짜 HOLD로 덮지 않음
+    # → LLM 스케줄러(core/llm_scheduler)가 에러로 세고 직전 결정/대체 정책으로 돌림 (자리표시 결정이 캐시/직전 결정에 남지 않게)
     try:
-        response = await client.chat.completions.create(
+        response = await get_client().chat.completions.create(
             model=AGENT_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -124,39 +139,32 @@ async def agent_society_think(
             response_format={"type": "json_object"},
             max_tokens=300
         )
-        
-        raw_content = response.choices[0].message.content
-        
-        # 🟢 1단계 방어막: 뇌정지 방지
-        if raw_content is None:
-            print(f"⚠️ [{agent_name}] LLM 응답 없음. 기본값 처리.")
-            decision = {
-                "thought_process": "시장이 조용하군요. 상황을 지켜보겠습니다.", 
-                "action": "HOLD", "quantity": 0, "price": int(current_price)
-            }
-        else:
-            decision = json.loads(raw_content.strip())
-            
-        # 🟢 2단계 방어막: JSON은 왔는데 'thought_process'가 없을 때 터지는 현상 방지
-        if "thought_process" not in decision:
-            decision["thought_process"] = "현재 관망 중입니다."
-
     except Exception as e:
         error_msg = str(e)
         if "content_filter" in error_msg or "ResponsibleAIPolicyViolation" in error_msg:
-            print(f"⚠️ [{agent_name} 검열 경고] 표현이 필터링 되었습니다. 기본 멘트 출력.")
-            decision = {
-                "thought_process": "흥미로운 장세네요. 신중하게 접근해야겠습니다.",
-                "action": "HOLD", "quantity": 0, "price": int(current_price)
-            }
-        else:
-            print(f"❌ [{agent_name}] 뇌정지 에러: {e}")
-            decision = {
-                "thought_process": "생각 중입니다...",
-                "action": "HOLD", "quantity": 0, "price": int(current_price)
-            }
-
-    # --- 🔥 정상 로직(매매 계산 등)은 try-except 밖에서 무조건 실행됩니다! ---
+            # 검열은 서비스 장애가 아니라 이 프롬프트의 결과 → 에러로 세지 않고 결정 없음(None)으로 대체 정책에 넘김
+            print(f"⚠️ [{agent_name} 검열 경고] 표현이 필터링 되었습니다. 대체 정책으로 넘깁니다.")
+            return None
+        raise
+
+    raw_content = response.choices[0].message.content
+    
+    # 🟢 1단계 방어막: 뇌정지 방지 (빈 응답도 실패로 넘김)
+    if raw_content is None:
+        raise ValueError(f"[{agent_name}] LLM 응답 없음")
+    decision = json.loads(raw_content.strip())
+    if not isinstance(decision, dict):
+        raise ValueError(f"[{agent_name}] LLM 응답이 JSON 객체가 아님")
+        
+    # 🟢 2단계 방어막: JSON은 왔는데 'thought_process'가 없을 때 터지는 현상 방지
+    if "thought_process" not in decision:
+        decision["thought_process"] = "현재 관망 중입니다."
+
+    # --- 🔥 정상 로직(매매 계산 등) ---
+    return finalize_decision(agent_name, decision, current_price, cash, portfolio_qty, is_social_mode)
+
+def finalize_decision(agent_name, decision: dict, current_price, cash, portfolio_qty=0, is_social_mode=False):
+    """LLM이 낸 결정의 수량/가격을 파싱하고 가격 캡·보유량 제한을 씌웁니다. (단건/배치 공용)"""
     try:
         action = str(decision.get("action", "HOLD")).upper()
         
@@ -205,4 +213,160 @@ async def agent_society_think(
 
     except Exception as e:
         print(f"❌ [{agent_name}] 로직 처리 중 최후 에러: {e}")
-        return {"action": "HOLD", "quantity": 0, "price": int(current_price), "thought_process": "에러 복구 관망"}
\ No newline at end of file
+        # error 표시: 의사결정 캐시가 이 자리표시 결정을 저장하지 않게
+        return {"action": "HOLD", "quantity": 0, "price": int(current_price), "thought_process": "에러 복구 관망", "error": True}
+# ------------------------------------------------------------------
+# 배치 프롬프트 (페르소나 × 종목마다 요청 1번)
+# - 페르소나는 4종뿐이라 시스템 프롬프트가 거의 같음 → 같은 페르소나/같은 종목 에이전트 K명을 한 요청에 묶음
+# - 에이전트별 상태는 한 줄로 압축, 응답은 {"decisions": [...]} 배열 (항목마다 agent 이름으로 매칭해서 검증)
+# - 항목이 빠지거나 깨지면 그 에이전트만 None → 호출자(LLM 스케줄러)가 직전 결정/오프라인 정책으로 대체
+# ------------------------------------------------------------------
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", 8))
+LLM_BATCH_WINDOW_SEC = float(os.getenv("LLM_BATCH_WINDOW_SEC", 0.05)) # 같은 묶음 요청이 더 들어오길 기다리는 시간
+BATCH_BASE_TOKENS = 500        # 시스템 프롬프트 + 공통 시장 정보 대략치
+BATCH_TOKENS_PER_AGENT = 180   # 에이전트 상태 한 줄 + 결정 1개 대략치
+
+async def agent_society_think_batch(agents: list, context_info, current_price, market_sentiment=None):
+    """
+    agents: agent_society_think 인자 dict 목록 (같은 페르소나, 같은 종목 = 같은 context_info/current_price)
+    반환: agents와 같은 순서의 결정 목록 (검증 실패한 항목은 None)
+    """
+    agent_type, strategy_prompt = get_agent_persona(agents[0]["agent_name"])
+
+    system_prompt = f"""
+    당신은 같은 성향({agent_type})을 가진 투자자 {len(agents)}명의 머릿속을 동시에 시뮬레이션합니다.
+    각 투자자는 특정 종목을 매매할지 따로따로 결정해야 합니다.
+    
+    [이들의 투자 철학]
+    {strategy_prompt}
+    
+    [행동 원칙]
+    1. **개인차:** 같은 성향이라도 각자의 현금/보유/직전 기억에 따라 다르게 행동하세요.
+    2. **감정 표현:** 기계적인 분석이 아니라, 사람처럼 기뻐하거나 한탄하거나 훈수를 두세요.
+    3. **JSON 형식:** 반드시 아래 지정된 JSON 형식으로만, 투자자마다 정확히 1개씩 응답해야 합니다.
+    """
+
+    lines = []
+    for a in agents:
+        memory = a.get("last_action_desc") or "없음"
+        status = describe_position(current_price, a.get("portfolio_qty", 0), a.get("avg_price", 0))
+        lines.append(f"- {a['agent_name']}: 현금 {int(a['cash']):,}원 / 보유 {a.get('portfolio_qty', 0)}주 "
+                     f"(평단 {int(a.get('avg_price', 0)):,}원, {status}) / 직전 기억: {memory}")
+    agent_lines = "\n    ".join(lines)
+
+    user_prompt = f"""
+    [시장 데이터]
+    - 종목 현재가: {int(current_price):,}원
+    - 뉴스: {context_info}
+    - 👥 [시장 분위기]: {market_sentiment or "시장 분위기 파악 불가."}
+    
+    [투자자 상태]
+    {agent_lines}
+    
+    {{
+        "decisions": [
+            {{
+                "agent": "투자자 이름 (위 목록 그대로)",
+                "thought_process": "그 투자자의 페르소나가 드러나는 커뮤니티 게시글 (딱 한 문장)",
+                "action": "BUY" 또는 "SELL" 또는 "HOLD",
+                "price": (희망 가격, 정수),
+                "quantity": (수량, 정수)
+            }}
+        ]
+    }}
+    """
+
+    response = await get_client().chat.completions.create(
+        model=AGENT_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        temperature=0.9,
+        response_format={"type": "json_object"},
+        max_tokens=120 * len(agents) + 100
+    )
+
+    raw_content = response.choices[0].message.content
+    try:
+        items = json.loads(raw_content.strip()).get("decisions", []) if raw_content else []
+    except (ValueError, AttributeError):
+        print(f"⚠️ [배치 {agent_type}] JSON 파싱 실패. {len(agents)}명 전원 대체 정책.")
+        items = []
+
+    by_name = {}
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, dict) and item.get("agent") and str(item.get("action", "")).upper() in ("BUY", "SELL", "HOLD"):
+            by_name.setdefault(str(item["agent"]), item)
+
+    decisions = []
+    for a in agents:
+        item = by_name.get(a["agent_name"])
+        if item is None:
+            decisions.append(None)
+            continue
+        item.pop("agent", None)
+        item.setdefault("thought_process", "현재 관망 중입니다.")
+        decisions.append(finalize_decision(a["agent_name"], item, current_price, a["cash"], a.get("portfolio_qty", 0)))
+    return decisions
+
+
+class BatchedSocietyThinker:
+    """
+    agent_society_think와 같은 인자로 부르면, 잠깐(LLM_BATCH_WINDOW_SEC) 모아서 같은 페르소나/종목끼리 한 번에 요청합니다.
+    limiter(LLMScheduler)가 있으면 묶음 요청 1번을 한도 1번으로 계산 (에이전트별 호출은 세지 않음)
+    수다 모드(current_price <= 0)는 묶지 않고 agent_society_think로 바로 보냄
+    """
+    self_limited = True # LLMScheduler.think가 에이전트별로 세마포어/버킷을 잡지 않도록 표시
+
+    def __init__(self, limiter=None, batch_size: int = LLM_BATCH_SIZE, window: float = LLM_BATCH_WINDOW_SEC):
+        self.limiter = limiter
+        self.batch_size = batch_size
+        self.window = window
+        self._pending = {} # (페르소나, 뉴스, 현재가, 분위기) -> [(kwargs, Future)]
+        self._timers = {}
+
+    async def __call__(self, **kwargs):
+        if kwargs["current_price"] <= 0:
+            if self.limiter is not None:
+                async with self.limiter.slot():
+                    return await agent_society_think(**kwargs)
+            return await agent_society_think(**kwargs)
+
+        loop = asyncio.get_running_loop()
+        key = (get_agent_persona(kwargs["agent_name"])[0], kwargs["context_info"],
+               int(kwargs["current_price"]), kwargs.get("market_sentiment"))
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((kwargs, future))
+        if len(batch) >= self.batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+        return await future
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None: timer.cancel()
+        batch = self._pending.pop(key, None)
+        if batch:
+            asyncio.create_task(self._send(key, batch))
+
+    async def _send(self, key, batch):
+        batch = [(kw, f) for kw, f in batch if not f.done()] # 마감이 지나 취소된 에이전트는 뺌
+        if not batch: return
+        agents = [kw for kw, _ in batch]
+        _, context_info, current_price, market_sentiment = key
+        try:
+            if self.limiter is not None:
+                tokens = BATCH_BASE_TOKENS + BATCH_TOKENS_PER_AGENT * len(agents)
+                async with self.limiter.slot(tokens):
+                    decisions = await agent_society_think_batch(agents, context_info, current_price, market_sentiment)
+            else:
+                decisions = await agent_society_think_batch(agents, context_info, current_price, market_sentiment)
+        except Exception as e:
+            for _, f in batch:
+                if not f.done(): f.set_exception(e)
+            return
+        for (_, f), decision in zip(batch, decisions):
+            if not f.done(): f.set_result(decision)
@@ -0,0 +1,131 @@
+import os
+import math
+import time
+import random
+import asyncio
+from collections import OrderedDict
+
+# ------------------------------------------------------------------
+# 의사결정 캐시 (양자화된 상태 → LLM 결정)
+# - 같은 페르소나가 같은 종목/같은 뉴스/같은 추세를 보고, 비슷한 수익률·보유량·현금이면 거의 같은 결정을 냄
+#   → 이런 상태를 구간(bucket)으로 묶은 키로 LLM 결정을 재사용
+# - LRU(최대 개수) + TTL(실제 초)로 오래된 결정은 버림
+# - 적중하면 수량에 약간의 랜덤 흔들림(jitter)을 줘서 전원이 똑같이 움직이지 않게 함
+# - 적중률(hit rate)을 세어두므로 구간 크기를 행동 다양성과 맞바꿔 조절할 수 있음
+# - 싱글 플라이트: 같은 키로 LLM에 묻는 중이면 뒤따라온 에이전트는 새로 묻지 않고 그 결과를 기다림
+# - 에러로 만든 자리표시 결정("error" 표시)이나 대체 결정은 저장하지 않음 (다음 에이전트가 가짜 결정을 물려받지 않게)
+# ------------------------------------------------------------------
+
+DECISION_CACHE_SIZE = int(os.getenv("DECISION_CACHE_SIZE", 5000))
+DECISION_CACHE_TTL_SEC = float(os.getenv("DECISION_CACHE_TTL_SEC", 300))
+DECISION_CACHE_JITTER = float(os.getenv("DECISION_CACHE_JITTER", 0.2))      # 수량 ±20%
+ROI_BUCKET_PCT = float(os.getenv("DECISION_CACHE_ROI_BUCKET_PCT", 5))       # 수익률 5% 단위
+SIZE_BUCKET_BASE = float(os.getenv("DECISION_CACHE_SIZE_BUCKET_BASE", 2))   # 보유량/현금은 로그 구간 (2배 단위)
+
+
+def _log_bucket(value: float, base: float = SIZE_BUCKET_BASE) -> int:
+    """0 → 0, 그 외에는 1 + floor(log_base(value)) (예: base 2면 1 / 2~3 / 4~7 / ...)"""
+    if value < 1: return 0
+    return 1 + int(math.log(value, base))
+
+
+def decision_key(persona: str, ticker: str, news_id, trend: str, current_price, cash, portfolio_qty=0, avg_price=0):
+    """캐시 키: (페르소나, 종목, 뉴스 id, 추세 문구, 수익률 구간, 보유량 구간, 매수 여력 구간)"""
+    roi_bucket = None
+    if portfolio_qty > 0 and avg_price > 0:
+        roi_bucket = math.floor((current_price - avg_price) / avg_price * 100 / ROI_BUCKET_PCT)
+    affordable = cash / current_price if current_price > 0 else 0 # 현금은 '몇 주 살 수 있나'로 구간화
+    return (persona, ticker, news_id, trend, roi_bucket, _log_bucket(portfolio_qty), _log_bucket(affordable))
+
+
+class DecisionCache:
+    def __init__(self, maxsize: int = DECISION_CACHE_SIZE, ttl: float = DECISION_CACHE_TTL_SEC, jitter: float = DECISION_CACHE_JITTER):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.jitter = jitter
+        self._entries = OrderedDict() # key -> (저장 시각, 결정, 저장 당시 가격)
+        self._inflight = {}           # key -> Future((결정, 가격) 또는 None) - 지금 LLM에 묻는 중인 키
+        self.hits = 0
+        self.shared = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, key, current_price):
+        """적중하면 수량을 흔든 결정 사본을, 아니면 None을 돌려줍니다. (가격은 저장 당시와의 비율로 옮김)"""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._adapt(entry[1], entry[2], current_price)
+
+    async def wait(self, key, current_price):
+        """
+        같은 키로 묻는 중인 요청이 있으면 끝날 때까지 기다렸다가 그 결정을 돌려줍니다.
+        진행 중인 요청이 없거나, 그 요청이 저장할 결정을 못 냈으면(마감/에러/대체) None → 호출자가 직접 물어봄
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            return None
+        result = await asyncio.shield(future) # 기다리던 쪽이 취소돼도 앞선 요청의 Future는 살려둠
+        if result is None:
+            return None
+        self.shared += 1
+        return self._adapt(result[0], result[1], current_price)
+
+    def begin(self, key):
+        """이 키로 LLM에 묻기 시작함을 표시합니다. (이미 누가 묻는 중이면 None - 표시 주인만 end()로 정리)"""
+        if key in self._inflight:
+            return None
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        return future
+
+    def end(self, key, token):
+        """begin()으로 받은 표시를 정리합니다. put()으로 결정이 안 들어왔으면 기다리던 쪽에 None을 넘김"""
+        if token is None:
+            return
+        if not token.done():
+            token.set_result(None)
+        if self._inflight.get(key) is token:
+            del self._inflight[key]
+
+    def _adapt(self, decision: dict, stored_price, current_price) -> dict:
+        decision = dict(decision)
+        try:
+            qty = int(float(decision.get("quantity", 0)))
+            if qty > 0 and self.jitter:
+                decision["quantity"] = max(1, round(qty * random.uniform(1 - self.jitter, 1 + self.jitter)))
+            if stored_price and current_price and decision.get("price"):
+                decision["price"] = int(float(decision["price"]) * current_price / stored_price)
+        except (TypeError, ValueError):
+            pass
+        return decision
+
+    def put(self, key, decision: dict, current_price):
+        """제때 나온 LLM 결정만 저장합니다. (None/에러 자리표시는 무시) 같은 키를 기다리는 에이전트에게도 바로 넘김"""
+        if not isinstance(decision, dict) or decision.get("error"):
+            return
+        future = self._inflight.get(key)
+        if future is not None and not future.done():
+            future.set_result((dict(decision), current_price))
+        self._entries[key] = (time.monotonic(), dict(decision), current_price)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "shared": self.shared,
+                "hit_rate": round(self.hit_rate, 3), "expired": self.expired, "evicted": self.evicted}
@@ -0,0 +1,141 @@
+import os
+import random
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger("DecisionPipeline")
+
+# ------------------------------------------------------------------
+# 비동기 의사결정 파이프라인 (틱 시계와 분리)
+# - 에이전트마다 자기 박자(cadence)대로 생각 차례가 돌아오고, 결정을 종목별 대기열에 넣음
+#   (에이전트마다 태스크를 띄우지 않고, 워커 N개(보통 LLM 동시 호출 수)가 차례가 된 에이전트 id를 큐에서 꺼내 생각)
+# - 틱은 LLM을 기다리지 않고 대기열에 쌓인 결정만 꺼내 주문으로 실행
+#   → 가상 시계는 LLM 속도와 상관없이 일정하게 흐르고, 시장 활발함은 LLM 처리량(스케줄러 한도)이 결정
+# - 생각이 실패하면(마감/에러/429) 아무것도 넣지 않음: 대체 정책/직전 결정을 대기열에 밀어 넣지 않음
+# - 너무 오래 묵은 결정(가격이 이미 바뀌었을 것)은 틱에서 버림
+# - 틱당 실행 개수는 틱 속도 조절기 예산(tick_pacer.agents)으로 자름 → 남은 결정은 다음 틱, 못 버티고 묵으면 버려져 적체로 잡힘
+# ------------------------------------------------------------------
+
+AGENT_THINK_MIN_SEC = float(os.getenv("AGENT_THINK_MIN_SEC", 5))   # 한 에이전트가 다시 생각하기까지 최소 (실제 초)
+AGENT_THINK_MAX_SEC = float(os.getenv("AGENT_THINK_MAX_SEC", 20))  # 최대
+DECISION_WORKERS = int(os.getenv("DECISION_WORKERS", 8))           # 동시에 생각하는 워커 수 (LLM 동시 호출 수 정도)
+DECISION_MAX_AGE_TICKS = 5   # 이보다 오래된 결정은 실행하지 않음
+MAX_PENDING_PER_TICKER = 100 # 종목별 대기열 길이 (넘치면 가장 오래된 결정부터 밀려남)
+
+
+class PendingDecision:
+    __slots__ = ("agent_id", "ticker", "decision", "tick")
+
+    def __init__(self, agent_id: str, ticker: str, decision: dict, tick: int):
+        self.agent_id = agent_id
+        self.ticker = ticker
+        self.decision = decision
+        self.tick = tick
+
+
+class DecisionPipeline:
+    def __init__(self, think, cadence=(AGENT_THINK_MIN_SEC, AGENT_THINK_MAX_SEC), workers: int = DECISION_WORKERS,
+                 max_age_ticks: int = DECISION_MAX_AGE_TICKS, max_pending: int = MAX_PENDING_PER_TICKER):
+        """think: async (agent_id, ticker, market) -> 결정 dict 또는 None (None이면 이번 차례는 건너뜀)"""
+        self.think = think
+        self.cadence = cadence
+        self.workers = workers
+        self.max_age_ticks = max_age_ticks
+        self.max_pending = max_pending
+        self.market = None # 가장 최근 틱의 MarketContext (에이전트는 항상 최신 것을 보고 생각)
+        self.tick = 0
+        self.queues = {}     # ticker -> deque[PendingDecision]
+        self.agents = set()  # 생각 차례를 돌리고 있는 에이전트
+        self._ready = None   # 생각 차례가 된 agent_id 큐 (이벤트 루프 안에서 처음 start()할 때 만듦)
+        self._timers = {}    # agent_id -> 다음 차례 예약 (call_later 핸들)
+        self._tasks = []     # 워커 태스크 (workers개)
+        self.dropped = 0     # 묵어서/넘쳐서 버린 결정 수 (누적)
+
+    def update_market(self, market, tick: int):
+        """틱 시작 때 호출: 에이전트들이 다음에 생각할 때 쓸 시장 정보를 교체합니다."""
+        self.market = market
+        self.tick = tick
+
+    def start(self, agent_ids):
+        """워커를 띄우고, 처음 보는 에이전트만 생각 차례에 올립니다. (매 틱 불러도 됨)"""
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+        for agent_id in agent_ids:
+            if agent_id not in self.agents:
+                self.agents.add(agent_id)
+                # 모두 같은 순간에 LLM을 부르지 않도록 첫 생각 시점을 흩뿌림
+                self._schedule(agent_id, random.uniform(0, self.cadence[1]))
+
+    def _schedule(self, agent_id: str, delay: float):
+        loop = asyncio.get_running_loop()
+        self._timers[agent_id] = loop.call_later(delay, self._ready.put_nowait, agent_id)
+
+    async def _worker(self):
+        while True:
+            agent_id = await self._ready.get()
+            try:
+                market = self.market
+                if market is not None and market.tickers:
+                    ticker = random.choice(list(market.tickers))
+                    decision = await self.think(agent_id, ticker, market)
+                    if decision is not None:
+                        self._push(PendingDecision(agent_id, ticker, decision, self.tick))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"🚨 [파이프라인] {agent_id} 생각 에러: {e}")
+            self._schedule(agent_id, random.uniform(*self.cadence)) # 다음 차례 (취소되면 다시 예약하지 않음)
+
+    def _push(self, pending: PendingDecision):
+        queue = self.queues.get(pending.ticker)
+        if queue is None:
+            queue = self.queues[pending.ticker] = deque(maxlen=self.max_pending)
+        if len(queue) == queue.maxlen:
+            self.dropped += 1
+        queue.append(pending)
+
+    def drain(self, limit: int = None) -> list:
+        """
+        대기열에서 실행할 결정을 꺼냅니다. (오래된 것은 버림)
+        limit: 이번 틱에 실행할 최대 개수 (틱 속도 조절기 예산) - 종목을 돌아가며 하나씩 꺼내고 나머지는 다음 틱으로
+        """
+        ready = []
+        oldest = self.tick - self.max_age_ticks
+        for queue in self.queues.values(): # 묵은 결정은 예산과 상관없이 버림
+            if any(p.tick < oldest for p in queue):
+                fresh = [p for p in queue if p.tick >= oldest]
+                self.dropped += len(queue) - len(fresh)
+                queue.clear()
+                queue.extend(fresh)
+        queues = [q for q in self.queues.values() if q]
+        while queues and (limit is None or len(ready) < limit):
+            for queue in queues:
+                if limit is not None and len(ready) >= limit: break
+                ready.append(queue.popleft())
+            queues = [q for q in queues if q]
+        return ready
+
+    @property
+    def pending(self) -> int:
+        return sum(len(q) for q in self.queues.values())
+
+    @property
+    def waiting(self) -> int:
+        """차례가 됐는데 빈 워커가 없어 기다리는 에이전트 수 (LLM 적체)"""
+        return self._ready.qsize() if self._ready is not None else 0
+
+    async def close(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._timers.clear()
+        self._tasks = []
+        self.agents.clear()
+        self._ready = None
+        self.queues.clear()
@@ -0,0 +1,299 @@
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+# ------------------------------------------------------------------
+# 주문/체결 저널 (Append-Only Journal)
+# - 호가창을 바꾸는 사건(등록/수량변경/삭제)과 체결, 시뮬레이션 시계를 이진 레코드로 이어붙임
+#   (발동 대기 중인 조건부 주문은 STOP, 단일가 접수 시작/마감은 AUCTION - 발동/취소/만료는 REMOVE)
+# - 레코드 = [길이 4B][종류 1B][CRC32 4B] + 본문  → 중간에 잘린 꼬리는 CRC로 걸러냄
+# - 체결(FILL)마다 순번을 붙이고, 정산 때 마지막 순번을 DB(sim_clock 행)에 같은 트랜잭션으로 저장
+#   → COMMIT 뒤 SETTLED 기록 전에 죽어도 재생 때 그 순번 이하 체결은 다시 반영하지 않음
+# - 그룹 커밋: 쓰기는 버퍼에만 쌓고, 백그라운드 스레드가 모아서 write + fsync 한 번
+# - 스냅샷: 현재 호가창 전체를 snapshot.bin으로 떠두고 저널 세그먼트를 새로 시작 → 재시작 시 재생 시간 제한
+# ------------------------------------------------------------------
+
+REST, RESIZE, REMOVE, FILL, CLOCK, SETTLED, META, STOP, AUCTION = range(1, 10)
+
+_HEADER = struct.Struct("<IBI")      # 본문 길이, 종류, CRC32
+_REST = struct.Struct("<qqiBBBqq")   # seq, 가격(틱), 수량, 매수/매도, TIF, 시장가, 만료시각, 접수시각
+_FILL = struct.Struct("<qqiq")       # 체결 순번, 가격, 수량, 체결시각
+_INT = struct.Struct("<q")           # 수량, 시각, 체결 순번 중 하나
+_META = struct.Struct("<Iq")         # 저널 세대, 다음 접수 순번
+_STOP = struct.Struct("<qqdiBBBBq")  # seq, 발동가(틱), 지정가(원, 없으면 -1), 수량, 매수/매도, 주문 종류, TIF, 상승 발동, 만료시각
+_STR = struct.Struct("<H")
+
+_EPOCH = datetime(1970, 1, 1)
+_SIDES = ("BUY", "SELL")
+_TIFS = ("DAY", "GTT", "IOC")
+_STOP_TYPES = ("STOP", "STOP_LIMIT", "TAKE_PROFIT")
+
+
+def _pack_time(dt) -> int:
+    return -1 if dt is None else (dt - _EPOCH) // timedelta(microseconds=1)
+
+def _unpack_time(us: int):
+    return None if us < 0 else _EPOCH + timedelta(microseconds=us)
+
+def _pack_str(*values) -> bytes:
+    out = b""
+    for value in values:
+        raw = str(value).encode("utf-8")
+        out += _STR.pack(len(raw)) + raw
+    return out
+
+def _unpack_str(buf: bytes, offset: int, count: int):
+    values = []
+    for _ in range(count):
+        (size,) = _STR.unpack_from(buf, offset)
+        offset += _STR.size
+        values.append(buf[offset:offset + size].decode("utf-8"))
+        offset += size
+    return values
+
+
+def encode(kind: int, payload: bytes) -> bytes:
+    return _HEADER.pack(len(payload), kind, zlib.crc32(payload)) + payload
+
+def encode_rest(ticker: str, agent_id: str, order) -> bytes:
+    tif = str(getattr(order.tif, "value", order.tif))
+    return encode(REST, _REST.pack(order.seq, order.price, order.quantity, _SIDES.index(order.side),
+                                   _TIFS.index(tif), int(order.market),
+                                   _pack_time(order.expire_at), _pack_time(order.timestamp))
+                  + _pack_str(order.order_id, agent_id, ticker))
+
+def encode_resize(order_id: str, qty: int) -> bytes:
+    return encode(RESIZE, _INT.pack(qty) + _pack_str(order_id))
+
+def encode_stop(ticker: str, order) -> bytes:
+    tif = str(getattr(order.tif, "value", order.tif))
+    order_type = str(getattr(order.order_type, "value", order.order_type))
+    return encode(STOP, _STOP.pack(order.seq, order.trigger, -1.0 if order.price is None else float(order.price),
+                                   order.quantity, _SIDES.index(order.side), _STOP_TYPES.index(order_type),
+                                   _TIFS.index(tif), int(order.rises), _pack_time(order.expire_at))
+                  + _pack_str(order.order_id, order.agent_id, ticker))
+
+def encode_auction(ticker: str, until) -> bytes:
+    """단일가 접수 시작(until=마감 시각) 또는 마감(until=None)"""
+    return encode(AUCTION, _INT.pack(_pack_time(until)) + _pack_str(ticker))
+
+def encode_remove(order_id: str) -> bytes:
+    return encode(REMOVE, _pack_str(order_id))
+
+def encode_fill(seq: int, ticker: str, buyer_id: str, seller_id: str, price: int, qty: int, sim_time) -> bytes:
+    return encode(FILL, _FILL.pack(seq, int(price), int(qty), _pack_time(sim_time)) + _pack_str(ticker, buyer_id, seller_id))
+
+def encode_clock(sim_time) -> bytes:
+    return encode(CLOCK, _INT.pack(_pack_time(sim_time)))
+
+def encode_settled(seq: int) -> bytes:
+    return encode(SETTLED, _INT.pack(seq))
+
+def encode_meta(generation: int, next_seq: int) -> bytes:
+    return encode(META, _META.pack(generation, next_seq))
+
+
+def decode(kind: int, payload: bytes) -> dict:
+    """레코드 본문을 dict로 풉니다. (재생용)"""
+    if kind == REST:
+        seq, price, qty, side, tif, market, expire_at, ts = _REST.unpack_from(payload)
+        order_id, agent_id, ticker = _unpack_str(payload, _REST.size, 3)
+        return {"seq": seq, "price": price, "quantity": qty, "side": _SIDES[side], "tif": _TIFS[tif],
+                "market": bool(market), "expire_at": _unpack_time(expire_at), "timestamp": _unpack_time(ts),
+                "order_id": order_id, "agent_id": agent_id, "ticker": ticker}
+    if kind == STOP:
+        seq, trigger, price, qty, side, order_type, tif, rises, expire_at = _STOP.unpack_from(payload)
+        order_id, agent_id, ticker = _unpack_str(payload, _STOP.size, 3)
+        return {"seq": seq, "trigger": trigger, "price": None if price < 0 else price, "quantity": qty,
+                "side": _SIDES[side], "order_type": _STOP_TYPES[order_type], "tif": _TIFS[tif], "rises": bool(rises),
+                "expire_at": _unpack_time(expire_at), "order_id": order_id, "agent_id": agent_id, "ticker": ticker}
+    if kind == AUCTION:
+        (until,) = _INT.unpack_from(payload)
+        return {"until": _unpack_time(until), "ticker": _unpack_str(payload, _INT.size, 1)[0]}
+    if kind == RESIZE:
+        (qty,) = _INT.unpack_from(payload)
+        return {"quantity": qty, "order_id": _unpack_str(payload, _INT.size, 1)[0]}
+    if kind == REMOVE:
+        return {"order_id": _unpack_str(payload, 0, 1)[0]}
+    if kind == FILL:
+        seq, price, qty, ts = _FILL.unpack_from(payload)
+        ticker, buyer_id, seller_id = _unpack_str(payload, _FILL.size, 3)
+        return {"seq": seq, "price": price, "quantity": qty, "timestamp": _unpack_time(ts),
+                "ticker": ticker, "buyer_id": buyer_id, "seller_id": seller_id}
+    if kind == CLOCK:
+        return {"sim_time": _unpack_time(_INT.unpack_from(payload)[0])}
+    if kind == SETTLED:
+        return {"seq": _INT.unpack_from(payload)[0]}
+    if kind == META:
+        gen, next_seq = _META.unpack_from(payload)
+        return {"generation": gen, "next_seq": next_seq}
+    return {}
+
+
+def read_records(path: str):
+    """
+    파일에서 (종류, dict, 끝 오프셋)을 차례로 꺼냅니다.
+    길이가 모자라거나 CRC가 안 맞는 레코드(쓰다 죽은 꼬리)를 만나면 거기서 멈춥니다.
+    """
+    with open(path, "rb") as f:
+        buf = f.read()
+    offset = 0
+    while offset + _HEADER.size <= len(buf):
+        size, kind, crc = _HEADER.unpack_from(buf, offset)
+        start = offset + _HEADER.size
+        payload = buf[start:start + size]
+        if len(payload) < size or zlib.crc32(payload) != crc:
+            break
+        offset = start + size
+        yield kind, decode(kind, payload), offset
+
+
+class OrderJournal:
+    """
+    디렉터리 하나에 snapshot.bin + journal-000001.log ... 를 관리합니다.
+    append()는 버퍼에만 넣고 바로 돌아오며, 실제 디스크 기록은 group_commit_ms마다 한 번(fsync 포함).
+    sync()를 부르면 그때까지 넣은 레코드가 디스크에 닿을 때까지 기다립니다.
+    """
+
+    SNAPSHOT = "snapshot.bin"
+
+    def __init__(self, directory: str, group_commit_ms: int = 20):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.group_commit_ms = group_commit_ms
+
+        self._buffer = []
+        self._cond = threading.Condition()   # 버퍼/카운터 보호 (fsync 중에도 append는 안 막힘)
+        self._io_lock = threading.Lock()      # 파일 쓰기/세그먼트 전환 보호
+        self._appended = 0  # 지금까지 append된 레코드 수
+        self._synced = 0    # 그중 fsync까지 끝난 수
+        self._flush_requested = False
+        self._closed = False
+
+        segments = self.segments()
+        self.generation = segments[-1][0] if segments else self._snapshot_generation()
+        self._file = None
+        self._thread = None
+
+    # --- 파일 목록 ---
+    def _segment_path(self, gen: int) -> str:
+        return os.path.join(self.directory, f"journal-{gen:06d}.log")
+
+    def segments(self):
+        found = []
+        for name in os.listdir(self.directory):
+            if name.startswith("journal-") and name.endswith(".log"):
+                found.append((int(name[8:-4]), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    def _snapshot_generation(self) -> int:
+        path = os.path.join(self.directory, self.SNAPSHOT)
+        if os.path.exists(path):
+            for kind, record, _ in read_records(path):
+                if kind == META:
+                    return record["generation"]
+        return 1
+
+    # --- 재생 ---
+    def replay(self):
+        """
+        스냅샷 → 그 뒤 세그먼트 순서로 레코드를 (종류, dict) 로 돌려줍니다.
+        마지막 세그먼트의 잘린 꼬리는 잘라내서 이어쓰기가 깨끗한 위치에서 시작되게 합니다.
+        """
+        start_gen = 1
+        snapshot = os.path.join(self.directory, self.SNAPSHOT)
+        if os.path.exists(snapshot):
+            for kind, record, _ in read_records(snapshot):
+                if kind == META:
+                    start_gen = record["generation"]
+                yield kind, record
+
+        segments = [s for s in self.segments() if s[0] >= start_gen]
+        for i, (gen, path) in enumerate(segments):
+            good = 0
+            for kind, record, offset in read_records(path):
+                good = offset
+                yield kind, record
+            if i == len(segments) - 1 and good < os.path.getsize(path):
+                with open(path, "r+b") as f:
+                    f.truncate(good)
+
+    # --- 쓰기 (그룹 커밋) ---
+    def open(self):
+        if self._file is None:
+            self._file = open(self._segment_path(self.generation), "ab")
+            self._thread = threading.Thread(target=self._writer, name="journal-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def append(self, record: bytes):
+        with self._cond:
+            self._buffer.append(record)
+            self._appended += 1
+
+    def sync(self, timeout: float = None):
+        """지금까지 append한 레코드가 fsync될 때까지 기다립니다. (다음 그룹 커밋을 앞당김)"""
+        with self._cond:
+            target = self._appended
+            self._flush_requested = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._synced >= target or self._closed, timeout)
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._flush_requested, self.group_commit_ms / 1000)
+                self._flush_requested = False
+                closed = self._closed
+            self._commit()
+            if closed:
+                return
+
+    def _commit(self):
+        """버퍼에 쌓인 레코드를 한 번의 write + fsync로 내립니다."""
+        with self._io_lock:
+            with self._cond:
+                batch, self._buffer = self._buffer, []
+                target = self._appended
+            if batch:
+                self._file.write(b"".join(batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+        with self._cond:
+            self._synced = max(self._synced, target)
+            self._cond.notify_all()
+
+    def rotate(self, snapshot_records):
+        """
+        스냅샷을 떠서 저널을 새 세대로 넘깁니다. (호출자가 호가창을 못 바꾸게 잠근 상태여야 함)
+        순서: 새 세그먼트로 전환 → 스냅샷 임시파일 fsync → rename → 옛 세그먼트 삭제
+        어느 단계에서 죽어도 (옛 스냅샷 + 남은 세그먼트) 또는 (새 스냅샷 + 새 세그먼트)로 복구됩니다.
+        """
+        self._commit()
+        with self._io_lock:
+            self._file.close()
+            self.generation += 1
+            self._file = open(self._segment_path(self.generation), "ab")
+
+        tmp = os.path.join(self.directory, self.SNAPSHOT + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(b"".join(snapshot_records(self.generation)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.directory, self.SNAPSHOT))
+
+        for gen, path in self.segments():
+            if gen < self.generation:
+                os.remove(path)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+        if self._file:
+            self._file.close()
+            self._file = None
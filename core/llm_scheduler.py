@@ -0,0 +1,186 @@
+import os
+import time
+import asyncio
+import logging
+import contextlib
+
+from core.tick_profiler import tick_profiler
+
+logger = logging.getLogger("LLMScheduler")
+
+# ------------------------------------------------------------------
+# LLM 호출 스케줄러 (동시 호출 수 / 분당 요청·토큰 / 마감 시간 제한)
+# - 동시에 날아가는 호출은 세마포어로 제한, 분당 요청(RPM)·토큰(TPM)은 토큰 버킷으로 제한
+# - 호출마다 asyncio.wait_for로 마감 시간, 틱마다 전체 예산(tick budget)도 둠
+# - 마감을 넘기거나 429/에러가 나면 그 에이전트의 직전 결정을 재사용하고, 없으면 값싼 대체 정책으로
+#   → Azure 응답 하나가 느려도 틱이 같이 늘어지지 않고, 429 폭풍 때도 전원이 랜덤 매매로 빠지지 않음
+# ------------------------------------------------------------------
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+LLM_RPM = int(os.getenv("LLM_RPM", 300))
+LLM_TPM = int(os.getenv("LLM_TPM", 200_000))
+LLM_TOKENS_PER_CALL = int(os.getenv("LLM_TOKENS_PER_CALL", 900)) # 프롬프트 + max_tokens(300) 대략치
+LLM_CALL_TIMEOUT_SEC = float(os.getenv("LLM_CALL_TIMEOUT_SEC", 8))
+LLM_TICK_BUDGET_SEC = float(os.getenv("LLM_TICK_BUDGET_SEC", 10))
+LLM_RATE_LIMIT_COOLDOWN_SEC = 5.0 # 429를 받으면 이 시간 동안은 호출하지 않고 바로 대체 정책
+
+
+class TokenBucket:
+    """분당 rate_per_min만큼 채워지는 버킷. 기다려야 하는 시간이 마감보다 길면 기다리지 않고 실패."""
+
+    def __init__(self, rate_per_min: float, capacity: float = None):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity or rate_per_min
+        self.tokens = self.capacity
+        self.updated = None
+
+    def _refill(self, now: float):
+        if self.updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """amount만큼 꺼내려면 몇 초 기다려야 하는지 (0이면 바로 가능)"""
+        self._refill(now)
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+def _is_rate_limited(e: Exception) -> bool:
+    return getattr(e, "status_code", None) == 429 or "RateLimit" in type(e).__name__
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, rpm: int = LLM_RPM, tpm: int = LLM_TPM,
+                 call_timeout: float = LLM_CALL_TIMEOUT_SEC, tick_budget: float = LLM_TICK_BUDGET_SEC,
+                 tokens_per_call: int = LLM_TOKENS_PER_CALL):
+        self.max_concurrency = max_concurrency
+        self.call_timeout = call_timeout
+        self.tick_budget = tick_budget
+        self.tokens_per_call = tokens_per_call
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.last_decisions = {} # (agent_id, ticker) -> 마지막으로 LLM이 낸 결정
+        self.tick_deadline = None
+        self.cooldown_until = 0.0
+        self.stats = {"calls": 0, "timeouts": 0, "rate_limited": 0, "errors": 0, "reused": 0, "fallback": 0}
+        self._semaphore = None # 이벤트 루프 안에서 처음 쓸 때 만듦 (루프마다 새로 생기는 헤드리스 실행 대비)
+        self._bucket_lock = None
+
+    def start_tick(self, budget: bool = True):
+        """틱 시작 때 호출: 틱 예산 마감을 새로 잡고 통계를 초기화합니다. (budget=False면 호출별 마감만)"""
+        self.tick_deadline = asyncio.get_running_loop().time() + self.tick_budget if budget else None
+        self.stats = dict.fromkeys(self.stats, 0)
+
+    def _ensure_primitives(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._bucket_lock = asyncio.Lock()
+
+    def _deadline(self, now: float) -> float:
+        deadline = now + self.call_timeout
+        if self.tick_deadline is not None:
+            deadline = min(deadline, self.tick_deadline)
+        return deadline
+
+    async def _reserve(self, deadline: float, tokens: int = None) -> bool:
+        """RPM/TPM 버킷에서 1회분을 꺼냅니다. 마감 안에 못 꺼내면 False."""
+        tokens = tokens or self.tokens_per_call
+        loop = asyncio.get_running_loop()
+        async with self._bucket_lock:
+            now = loop.time()
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if now + wait >= deadline:
+                return False
+            if wait > 0:
+                await asyncio.sleep(wait)
+                now = loop.time()
+                self.requests.wait_time(1, now) # 기다린 만큼 다시 채우기
+                self.tokens.wait_time(tokens, now)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            return True
+
+    async def think(self, policy, key, fallback=None, on_decision=None, **kwargs):
+        """
+        policy(**kwargs)를 제한 안에서 호출합니다. (policy: agent_society_think와 같은 인자의 코루틴 함수)
+        key: 직전 결정을 기억할 키 (보통 (agent_id, ticker))
+        fallback: 마감/에러 때 직전 결정도 없으면 대신 부를 값싼 정책 (같은 인자, None이면 None 반환)
+        on_decision: policy가 제때 낸 결정에만 불리는 콜백 (대체 결정은 제외, 의사결정 캐시 저장용)
+        """
+        if policy is fallback: # 값싼 정책을 바로 쓰는 실행 (헤드리스 오프라인 모드)은 제한 없이 호출
+            return await policy(**kwargs)
+        self._ensure_primitives()
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        deadline = self._deadline(now)
+
+        if now < self.cooldown_until or now >= deadline:
+            return await self._fallback(key, fallback, kwargs)
+
+        try:
+            # 세마포어 대기 + 버킷 대기 + 실제 호출 전부가 마감 안에 끝나야 함
+            decision = await asyncio.wait_for(self._call(policy, deadline, kwargs), timeout=deadline - now)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            decision = None
+        except Exception as e:
+            if _is_rate_limited(e):
+                self.stats["rate_limited"] += 1
+                self.cooldown_until = loop.time() + LLM_RATE_LIMIT_COOLDOWN_SEC
+                logger.warning(f"⏳ LLM 429 → {LLM_RATE_LIMIT_COOLDOWN_SEC:.0f}초간 대체 정책 사용")
+            else:
+                self.stats["errors"] += 1
+                logger.error(f"🚨 LLM 호출 실패 ({key}): {e}")
+            decision = None
+
+        if decision is None:
+            return await self._fallback(key, fallback, kwargs)
+        if key is not None:
+            self.last_decisions[key] = decision
+        if on_decision is not None:
+            on_decision(decision)
+        return decision
+
+    @contextlib.asynccontextmanager
+    async def slot(self, tokens: int = None):
+        """
+        한도 안에서 LLM 요청 1번을 보낼 자리를 잡습니다. (배치 요청처럼 스스로 요청을 모아 보내는 쪽에서 사용)
+        호출 마감 안에 분당 한도가 안 나면 asyncio.TimeoutError
+        """
+        self._ensure_primitives()
+        async with self._semaphore:
+            deadline = self._deadline(asyncio.get_running_loop().time())
+            if not await self._reserve(deadline, tokens or self.tokens_per_call):
+                raise asyncio.TimeoutError("LLM 분당 한도 초과")
+            self.stats["calls"] += 1
+            started = time.perf_counter()
+            try:
+                yield
+            finally:
+                tick_profiler.observe("llm.latency_ms", (time.perf_counter() - started) * 1000)
+
+    async def _call(self, policy, deadline, kwargs):
+        if getattr(policy, "self_limited", False): # 배치 정책: 묶음 요청마다 slot()으로 한도를 잡음
+            return await policy(**kwargs)
+        async with self._semaphore:
+            if not await self._reserve(deadline):
+                return None # 분당 한도 때문에 마감 안에 못 보냄
+            self.stats["calls"] += 1
+            started = time.perf_counter()
+            try:
+                return await policy(**kwargs)
+            finally:
+                tick_profiler.observe("llm.latency_ms", (time.perf_counter() - started) * 1000)
+
+    async def _fallback(self, key, fallback, kwargs):
+        last = self.last_decisions.get(key)
+        if last is not None:
+            self.stats["reused"] += 1
+            return dict(last)
+        if fallback is None:
+            return None
+        self.stats["fallback"] += 1
+        return await fallback(**kwargs)
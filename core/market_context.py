@@ -0,0 +1,144 @@
+import threading
+from collections import deque
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from database import DBCompany, DBNews, DBTrade
+
+# ------------------------------------------------------------------
+# 틱 공용 시장 정보 (MarketContext)
+# - 틱 시작 때 종목별 현재가 / 추세 / 최신 뉴스 / 호재·악재 분류를 한 번만 계산
+# - 에이전트 매매 태스크는 이걸 나눠 쓰므로 DB 조회 수가 에이전트 수가 아니라 종목 수에 비례
+# - 거래 기록은 틱 끝에 일괄 정산되므로, 틱 도중에 추세가 바뀌는 일은 없음
+# - 추세용 최근 체결가는 DB trades를 매 틱 다시 읽지 않고, 체결 때 정산 장부가 채우는 RecentPrices에서 꺼냄
+#   (trades 테이블이 아무리 커져도 틱당 비용은 종목 수에만 비례 - DB는 처음 본 종목을 채울 때만 종목당 1번)
+# ------------------------------------------------------------------
+
+TREND_WINDOW = 20 # 추세 판단에 쓰는 최근 체결 수
+
+GOOD_KEYWORDS = ["호재", "상승", "돌파", "계약", "성공", "출시", "인수", "흑자", "성장", "수주", "개발", "혁신", "M&A", "체결"]
+BAD_KEYWORDS = ["악재", "하락", "쇼크", "횡령", "소송", "결함", "위반", "붕괴", "적자", "포기", "실패", "우려", "매각", "논란"]
+
+def classify_trend(newest_price, oldest_price) -> str:
+    """최근 체결 구간의 처음/마지막 가격으로 추세 문구를 정합니다."""
+    if newest_price is None: return "정보 없음 (탐색 단계)"
+    if newest_price > oldest_price * 1.02: return "🔥 급등세 (매수세 강함)"
+    elif newest_price > oldest_price: return "📈 완만한 상승"
+    elif newest_price < oldest_price * 0.98: return "😱 급락세 (투매 발생)"
+    elif newest_price < oldest_price: return "📉 하락세"
+    else: return "⚖️ 보합세 (눈치보기)"
+
+def impact_multiplier(impact_score) -> int:
+    """뉴스 강도에 따른 매매 수량 배수"""
+    if not impact_score: return 1
+    if int(impact_score) >= 80: return 10
+    if int(impact_score) >= 60: return 5
+    return 1
+
+
+class RecentPrices:
+    """종목별 최근 체결가 window개 (오래된 것 → 최근 순). 체결은 매칭 워커 스레드에서 들어오므로 잠금으로 보호"""
+
+    def __init__(self, window: int = TREND_WINDOW):
+        self.window = window
+        self._prices = {}    # ticker -> deque(maxlen=window)
+        self._seeded = set() # DB의 과거 체결로 앞부분을 채운 종목
+        self._lock = threading.Lock()
+
+    def add(self, ticker: str, price):
+        with self._lock:
+            prices = self._prices.get(ticker)
+            if prices is None:
+                prices = self._prices[ticker] = deque(maxlen=self.window)
+            prices.append(price)
+
+    def seed(self, ticker: str, older):
+        """DB에 남은 과거 체결가(오래된 것 → 최근 순)를 앞에 붙입니다. (이 프로세스에서 난 체결이 항상 더 최근)"""
+        with self._lock:
+            prices = deque(older, maxlen=self.window)
+            prices.extend(self._prices.get(ticker, ()))
+            self._prices[ticker] = prices
+            self._seeded.add(ticker)
+
+    def unseeded(self, tickers) -> list:
+        with self._lock:
+            return [t for t in tickers if t not in self._seeded]
+
+    def ends(self, ticker: str):
+        """(가장 최근 가격, 구간 첫 가격) - 체결이 없으면 (None, None)"""
+        with self._lock:
+            prices = self._prices.get(ticker)
+            return (prices[-1], prices[0]) if prices else (None, None)
+
+
+class TickerContext:
+    """한 종목의 틱 시작 시점 정보"""
+    __slots__ = ("ticker", "name", "price", "trend", "news_id", "news_text", "impact_score", "is_good_news", "is_bad_news")
+
+    def __init__(self, ticker: str, name: str, price: float, trend: str, news_text: str, impact_score=None, news_id=None):
+        self.ticker = ticker
+        self.name = name
+        self.price = price # 틱 안에서 체결이 나면 run_agent_trade가 마지막 체결가로 갱신
+        self.trend = trend
+        self.news_id = news_id # 의사결정 캐시 키용 (뉴스가 바뀌면 캐시도 새로)
+        self.news_text = news_text
+        self.impact_score = impact_score
+        self.is_good_news = any(kw in news_text for kw in GOOD_KEYWORDS)
+        self.is_bad_news = any(kw in news_text for kw in BAD_KEYWORDS)
+
+    @property
+    def impact_multiplier(self) -> int:
+        return impact_multiplier(self.impact_score)
+
+
+class MarketContext:
+    """틱 하나 동안 모든 에이전트가 공유하는 종목별 정보 묶음"""
+
+    def __init__(self, tickers: dict):
+        self.tickers = tickers # ticker -> TickerContext
+
+    def __getitem__(self, ticker: str) -> TickerContext:
+        return self.tickers[ticker]
+
+    def get(self, ticker: str):
+        return self.tickers.get(ticker)
+
+    @property
+    def prices(self) -> dict:
+        return {t: c.price for t, c in self.tickers.items()}
+
+    @classmethod
+    def build(cls, db: Session, companies=None, recent: RecentPrices = None):
+        """
+        companies: 이미 읽어둔 DBCompany 목록 (없으면 여기서 조회)
+        recent: 체결 때 채워지는 최근 체결가 (보통 정산 장부의 recent_prices). 없으면 DB에서 종목별로 읽음
+        쿼리는 기업 / 종목별 최신 뉴스 2번 + 처음 보는 종목만 종목당 최근 체결 1번
+        """
+        if companies is None:
+            companies = db.query(DBCompany).all()
+        tickers = [c.ticker for c in companies]
+
+        # 종목별 최신 뉴스 1건
+        latest_ids = select(func.max(DBNews.id)).where(DBNews.ticker.in_(tickers)).group_by(DBNews.ticker)
+        news = {n.ticker: n for n in db.query(DBNews.id, DBNews.ticker, DBNews.content, DBNews.impact_score)
+                                       .filter(DBNews.id.in_(latest_ids)).all()}
+
+        # 종목별 최근 체결 TREND_WINDOW건: 처음 보는 종목만 DB에서 (종목당 LIMIT, 테이블 크기와 무관하게 일정)
+        if recent is None:
+            recent = RecentPrices()
+        for ticker in recent.unseeded(tickers):
+            rows = db.query(DBTrade.price).filter(DBTrade.ticker == ticker) \
+                     .order_by(DBTrade.timestamp.desc()).limit(recent.window).all()
+            recent.seed(ticker, [r.price for r in reversed(rows)])
+
+        contexts = {}
+        for c in companies:
+            n = news.get(c.ticker)
+            newest, oldest = recent.ends(c.ticker)
+            contexts[c.ticker] = TickerContext(
+                ticker=c.ticker, name=c.name, price=c.current_price,
+                trend=classify_trend(newest, oldest),
+                news_text=(n.content if n and n.content else "특이사항 없음"),
+                impact_score=(n.impact_score if n else None),
+                news_id=(n.id if n else None)
+            )
+        return cls(contexts)
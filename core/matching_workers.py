@@ -0,0 +1,86 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from database import SessionLocal
+from models.domain_models import Order
+from core.tick_profiler import tick_profiler
+
+# ------------------------------------------------------------------
+# 종목별 매칭 워커 (Per-Ticker Matching Workers)
+# - 종목마다 asyncio.Queue 1개 + 워커 코루틴 1개
+#   → 같은 종목 주문은 들어온 순서대로, 다른 종목끼리는 동시에 매칭
+# - 실제 매칭(동기 SQLAlchemy 포함)은 스레드 풀에서 돌려 이벤트 루프(FastAPI)를 막지 않음
+# - 결과는 Future로 호출자에게 돌려줌
+# - inline=True면 워커/스레드 없이 부른 자리에서 바로 매칭 (헤드리스 재현 실행용: 완료 순서가 실행마다 같음)
+# ------------------------------------------------------------------
+
+class TickerWorkerPool:
+    def __init__(self, engine, max_workers: int = None, inline: bool = False):
+        self.engine = engine
+        self.inline = inline
+        self._queues = {}   # ticker -> asyncio.Queue
+        self._workers = {}  # ticker -> asyncio.Task
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="matching")
+
+    async def submit(self, order: Order, sim_time: datetime = None) -> dict:
+        """주문을 해당 종목 워커에 넣고, 매칭 결과가 나올 때까지 기다립니다."""
+        return await self.call(order.ticker, self.engine.place_order, order, sim_time)
+
+    async def place(self, agent_id: str, ticker: str, side, quantity: int, **kwargs) -> dict:
+        """pydantic Order 없이 값만으로 주문합니다. (engine.submit 경로, kwargs: price/order_type/time_in_force/expire_at/sim_time)"""
+        return await self.call(ticker, self.engine.submit, agent_id, ticker, side, quantity, **kwargs)
+
+    async def call(self, ticker: str, fn, *args, **kwargs):
+        """
+        fn(db, *args)를 해당 종목 워커 순서에 맞춰 스레드 풀에서 실행합니다.
+        (주문 외에 취소/호가 교체처럼 호가창을 건드리는 작업도 같은 줄에 세우기 위함)
+        """
+        if kwargs:
+            fn = functools.partial(fn, **kwargs)
+        if self.inline:
+            return self._run(fn, args)
+        future = asyncio.get_running_loop().create_future()
+        self._queue(ticker).put_nowait((fn, args, future))
+        return await future
+
+    async def settle(self) -> int:
+        """틱 끝 일괄 정산도 스레드 풀에서 실행합니다."""
+        if self.inline:
+            return self._run(self.engine.settle, (), "settlement")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._run, self.engine.settle, (), "settlement")
+
+    def _queue(self, ticker: str) -> asyncio.Queue:
+        queue = self._queues.get(ticker)
+        if queue is None:
+            queue = asyncio.Queue()
+            self._queues[ticker] = queue
+            self._workers[ticker] = asyncio.create_task(self._worker(queue))
+        return queue
+
+    async def _worker(self, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            fn, args, future = await queue.get()
+            try:
+                result = await loop.run_in_executor(self._executor, self._run, fn, args)
+                if not future.done(): future.set_result(result)
+            except Exception as e:
+                if not future.done(): future.set_exception(e)
+            finally:
+                queue.task_done()
+
+    @staticmethod
+    def _run(fn, args, phase="matching"):
+        # 스레드에서 도는 시간/쿼리도 틱 프로파일러에 단계별로 집계
+        with tick_profiler.phase(phase), SessionLocal() as db:
+            return fn(db, *args)
+
+    async def close(self):
+        for task in self._workers.values():
+            task.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._queues.clear()
+        self._workers.clear()
+        self._executor.shutdown(wait=False)
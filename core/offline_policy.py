@@ -0,0 +1,63 @@
+from core.agent_random import agent_random
+from core.agent_society_brain import get_agent_persona
+from models.domain_models import AgentState
+
+# ------------------------------------------------------------------
+# 오프라인 의사결정 정책 (LLM 없이 돌아가는 규칙 기반 뇌)
+# - agent_society_think와 같은 인자/같은 모양의 dict를 돌려주므로 그대로 갈아끼울 수 있음
+# - 페르소나(가치/기관/역발상/투기)와 심리(공포/탐욕), 추세 문구만 보고 결정
+# - 난수는 에이전트별 생성기(core/agent_random) → agent_random.seed(...)로 실행 전체를 재현할 수 있음
+# ------------------------------------------------------------------
+
+def _trend_score(market_sentiment) -> int:
+    text = market_sentiment or ""
+    if "급등" in text: return 2
+    if "상승" in text: return 1
+    if "급락" in text: return -2
+    if "하락" in text: return -1
+    return 0
+
+async def offline_think(
+    agent_name,
+    agent_state: AgentState,
+    context_info,
+    current_price,
+    cash,
+    portfolio_qty=0,
+    avg_price=0,
+    last_action_desc=None,
+    market_sentiment=None
+):
+    if current_price <= 0: # 커뮤니티 수다 모드
+        return {"thought_process": "시장 분위기를 지켜보는 중입니다.", "action": "HOLD", "price": 0, "quantity": 0}
+
+    agent_type, _ = get_agent_persona(agent_name)
+    trend = _trend_score(market_sentiment)
+
+    # 성향별로 추세를 따라가거나(투기) 거스르거나(역발상), 가치/기관은 수익률 기준으로 움직임
+    if "Speculator" in agent_type:
+        bias = trend
+    elif "Contrarian" in agent_type:
+        bias = -trend
+    else:
+        roi = (current_price - avg_price) / avg_price if portfolio_qty > 0 and avg_price > 0 else 0
+        bias = -1 if roi > 0.05 else (1 if roi < -0.05 else 0)
+    bias += (agent_state.greed_index - agent_state.fear_index)
+
+    rng = agent_random.get(agent_name)
+    buy_prob = min(0.9, max(0.1, 0.5 + 0.15 * bias))
+    action = "BUY" if rng.random() < buy_prob else "SELL"
+    if action == "SELL" and portfolio_qty <= 0:
+        action = "BUY"
+
+    if action == "BUY":
+        quantity = max(1, int(cash * 0.1 // max(current_price, 1) * rng.random())) # 현금의 최대 10%
+        price = int(current_price * rng.uniform(0.99, 1.01))
+    else:
+        quantity = max(1, int(portfolio_qty * rng.uniform(0.1, 0.5)))
+        price = int(current_price * rng.uniform(0.99, 1.01))
+
+    return {
+        "thought_process": f"[오프라인] {agent_type} 규칙대로 {action} 합니다.",
+        "action": action, "price": price, "quantity": quantity
+    }
@@ -0,0 +1,296 @@
+import bisect
+import threading
+from collections import OrderedDict
+
+# ------------------------------------------------------------------
+# 가격대별 호가창 (Price-Level Order Book)
+# - 가격 → FIFO 큐(PriceLevel) 딕셔너리 + 정렬된 가격 키 배열
+# - 같은 가격 안에서는 먼저 들어온 주문이 먼저 체결 (가격-시간 우선순위)
+# - 최우선 호가 조회 O(1), 주문 등록/취소 O(log n) (가격 탐색은 bisect)
+# - 호가창에 올라가는 주문은 BookOrder(__slots__) 하나로만 존재 (가격은 정수 틱, 에이전트는 정수 핸들)
+# ------------------------------------------------------------------
+
+PRICE_TICK = 1 # 호가 단위 (원)
+
+def to_ticks(price) -> int:
+    return int(round(float(price) / PRICE_TICK))
+
+def from_ticks(ticks: int) -> int:
+    return ticks * PRICE_TICK
+
+
+class AgentRegistry:
+    """에이전트 ID(문자열) <-> 정수 핸들 변환표 (주문마다 문자열을 들고 다니지 않도록)"""
+
+    def __init__(self):
+        self._handles = {}
+        self.names = []
+        self._lock = threading.Lock()
+
+    def handle(self, agent_id: str) -> int:
+        handle = self._handles.get(agent_id)
+        if handle is None:
+            with self._lock:
+                handle = self._handles.get(agent_id)
+                if handle is None:
+                    handle = len(self.names)
+                    self.names.append(agent_id)
+                    self._handles[agent_id] = handle
+        return handle
+
+    def find(self, agent_id: str):
+        return self._handles.get(agent_id)
+
+    def name(self, handle: int) -> str:
+        return self.names[handle]
+
+
+class BookOrder:
+    """
+    엔진 내부 주문 레코드 (고정 레이아웃).
+    pydantic Order는 API 경계에서만 쓰고, 호가창/매칭은 이 객체만 다룹니다.
+    """
+    __slots__ = ("seq", "order_id", "agent", "side", "price", "quantity", "tif", "expire_at", "timestamp", "market")
+
+    def __init__(self, seq, order_id, agent, side, price, quantity, tif, expire_at=None, timestamp=None, market=False):
+        self.seq = seq
+        self.order_id = order_id
+        self.agent = agent          # AgentRegistry 핸들 (int)
+        self.side = side            # "BUY" / "SELL"
+        self.price = price          # 정수 틱
+        self.quantity = quantity
+        self.tif = tif
+        self.expire_at = expire_at
+        self.timestamp = timestamp
+        self.market = market
+
+    def to_dict(self, registry: AgentRegistry) -> dict:
+        return {
+            "order_id": self.order_id, "agent_id": registry.name(self.agent),
+            "price": from_ticks(self.price), "quantity": self.quantity,
+            "side": self.side, "timestamp": self.timestamp,
+        }
+
+
+class PriceLevel:
+    """
+    한 가격대에 쌓인 주문들 (먼저 들어온 순서대로 체결).
+    total_qty는 등록/체결/취소/정정 때마다 같이 갱신되는 L2 잔량 합계입니다.
+    """
+    __slots__ = ("price", "orders", "total_qty")
+
+    def __init__(self, price: int):
+        self.price = price
+        self.orders = OrderedDict()  # seq -> 주문 (삽입 순서 = 시간 우선순위)
+        self.total_qty = 0
+
+    def __len__(self):
+        return len(self.orders)
+
+    def __iter__(self):
+        return iter(self.orders.values())
+
+    def head(self):
+        return next(iter(self.orders.values()))
+
+    def append(self, order: BookOrder):
+        self.orders[order.seq] = order
+        self.total_qty += order.quantity
+
+    def pop_head(self):
+        order = self.orders.popitem(last=False)[1]
+        self.total_qty -= order.quantity
+        return order
+
+    def remove(self, order: BookOrder):
+        if self.orders.pop(order.seq, None) is None:
+            return False
+        self.total_qty -= order.quantity
+        return True
+
+    def resize(self, order: BookOrder, quantity: int):
+        """자리(시간 우선순위)는 그대로 두고 수량만 바꿉니다. (부분 체결, 수량 정정)"""
+        self.total_qty += quantity - order.quantity
+        order.quantity = quantity
+
+
+class BookSide:
+    """
+    매수(BUY) 또는 매도(SELL) 한쪽 호가.
+    _keys는 '우선순위 키' 오름차순이라 맨 끝이 항상 최우선 호가입니다.
+    (매수: 키 = 가격, 매도: 키 = -가격 → 최우선 호가를 꺼낼 때 pop()이 O(1))
+    """
+
+    def __init__(self, side: str):
+        self.side = side
+        self.levels = {}   # price -> PriceLevel
+        self._keys = []
+
+    def _key(self, price: int) -> int:
+        return price if self.side == "BUY" else -price
+
+    def __len__(self):
+        return sum(len(level) for level in self.levels.values())
+
+    def __bool__(self):
+        return bool(self._keys)
+
+    def __iter__(self):
+        """우선순위 순서대로 주문을 하나씩 돌려줍니다."""
+        for key in reversed(self._keys):
+            yield from self.levels[key if self.side == "BUY" else -key]
+
+    def best_level(self):
+        if not self._keys:
+            return None
+        key = self._keys[-1]
+        return self.levels[key if self.side == "BUY" else -key]
+
+    def best_price(self):
+        level = self.best_level()
+        return level.price if level else None
+
+    def top_levels(self, k: int) -> list:
+        """최우선 호가부터 k개 가격대의 (가격 틱, 잔량 합계, 주문 수). 호가창 깊이와 무관하게 O(k)"""
+        levels = []
+        for key in self._keys[:-k - 1:-1] if k > 0 else ():
+            level = self.levels[key if self.side == "BUY" else -key]
+            levels.append((level.price, level.total_qty, len(level)))
+        return levels
+
+    def add(self, order: BookOrder):
+        price = order.price
+        level = self.levels.get(price)
+        if level is None:
+            level = PriceLevel(price)
+            self.levels[price] = level
+            bisect.insort(self._keys, self._key(price))
+        level.append(order)
+        return level
+
+    def remove(self, order: BookOrder) -> bool:
+        """대기 중인 주문 하나를 빼냅니다. (취소/정정용)"""
+        level = self.levels.get(order.price)
+        return level is not None and self.discard(level, order)
+
+    def discard(self, level: PriceLevel, order: BookOrder) -> bool:
+        """주문 인덱스가 들고 있는 가격대에서 바로 빼냅니다. (가격대 탐색 없이 O(1), 빈 가격대 정리만 O(log n))"""
+        if not level.remove(order):
+            return False
+        if not level and self.levels.get(level.price) is level:
+            self._drop_level(level.price)
+        return True
+
+    def pop_head(self):
+        """최우선 호가의 맨 앞 주문을 꺼냅니다. (전량 체결 시)"""
+        level = self.best_level()
+        order = level.pop_head()
+        if not level:
+            self._keys.pop()
+            del self.levels[level.price]
+        return order
+
+    def _drop_level(self, price: int):
+        del self.levels[price]
+        key = self._key(price)
+        idx = bisect.bisect_left(self._keys, key)
+        if idx < len(self._keys) and self._keys[idx] == key:
+            del self._keys[idx]
+
+
+class StopOrder:
+    """
+    발동 대기 중인 조건부 주문 (호가창에는 없음).
+    rises=True면 가격이 trigger 이상으로 오를 때, False면 trigger 이하로 내릴 때 발동.
+    """
+    __slots__ = ("seq", "order_id", "agent_id", "side", "trigger", "price", "quantity", "order_type", "tif", "expire_at", "rises")
+
+    def __init__(self, seq, order_id, agent_id, side, trigger, price, quantity, order_type, tif, expire_at, rises):
+        self.seq = seq
+        self.order_id = order_id
+        self.agent_id = agent_id
+        self.side = side
+        self.trigger = trigger      # 정수 틱
+        self.price = price          # 발동 후 지정가 (STOP_LIMIT만, 원 단위)
+        self.quantity = quantity
+        self.order_type = order_type
+        self.tif = tif
+        self.expire_at = expire_at
+        self.rises = rises
+
+
+class TriggerBook:
+    """
+    종목 하나의 조건부 주문 인덱스.
+    상승 발동/하락 발동 각각 (trigger, seq) 오름차순 배열이라,
+    체결가 하나로 발동 범위를 bisect로 잘라내기만 하면 됨 (대기 중인 조건부 주문 전체를 훑지 않음).
+    """
+
+    def __init__(self):
+        self._rise = []   # 체결가 >= trigger 면 발동 → 앞쪽부터 잘라냄
+        self._fall = []   # 체결가 <= trigger 면 발동 → 뒤쪽부터 잘라냄
+        self.orders = {}  # seq -> StopOrder
+
+    def __len__(self):
+        return len(self.orders)
+
+    def add(self, order: StopOrder):
+        bisect.insort(self._rise if order.rises else self._fall, (order.trigger, order.seq))
+        self.orders[order.seq] = order
+
+    def remove(self, order: StopOrder) -> bool:
+        if self.orders.pop(order.seq, None) is None:
+            return False
+        keys = self._rise if order.rises else self._fall
+        idx = bisect.bisect_left(keys, (order.trigger, order.seq))
+        if idx < len(keys) and keys[idx] == (order.trigger, order.seq):
+            del keys[idx]
+        return True
+
+    def pop_triggered(self, low: int, high: int) -> list:
+        """체결가가 [low, high](틱) 구간을 지나갔을 때 발동하는 주문을 꺼내 접수 순서대로 돌려줍니다."""
+        i = bisect.bisect_right(self._rise, (high, float("inf")))
+        j = bisect.bisect_left(self._fall, (low, -1))
+        fired = self._rise[:i] + self._fall[j:]
+        if not fired:
+            return []
+        del self._rise[:i]
+        del self._fall[j:]
+        return sorted((self.orders.pop(seq) for _, seq in fired), key=lambda o: o.seq)
+
+
+class OrderBook:
+    """
+    종목 하나의 호가창.
+    기존 코드처럼 book['BUY'] / book.get('SELL', []) 로 읽으면
+    우선순위 순으로 정렬된 주문 dict 리스트(읽기 전용 스냅샷)를 돌려줍니다.
+    """
+
+    def __init__(self, ticker: str, registry: AgentRegistry = None):
+        self.ticker = ticker
+        self.registry = registry or AgentRegistry()
+        self.bids = BookSide("BUY")
+        self.asks = BookSide("SELL")
+
+    def side(self, side) -> BookSide:
+        return self.bids if str(getattr(side, "value", side)) == "BUY" else self.asks
+
+    def opposite(self, side) -> BookSide:
+        return self.asks if str(getattr(side, "value", side)) == "BUY" else self.bids
+
+    # --- 호환용 읽기 뷰 (main.py, routers/trade.py) ---
+    def __getitem__(self, side):
+        if side not in ("BUY", "SELL"):
+            raise KeyError(side)
+        return [o.to_dict(self.registry) for o in self.side(side)]
+
+    def get(self, side, default=None):
+        if side not in ("BUY", "SELL"):
+            return default
+        return self[side]
+
+    def keys(self):
+        return ["BUY", "SELL"]
+
+    def items(self):
+        return [(side, self[side]) for side in self.keys()]
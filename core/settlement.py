@@ -0,0 +1,235 @@
+from datetime import datetime
+import threading
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from database import DBAgent, DBCompany, DBTrade, DBSimClock
+from core.journal import encode_fill, encode_settled
+from core.sim_clock import CLOCK_ROW_ID
+from core.market_context import RecentPrices
+
+# ------------------------------------------------------------------
+# 체결 정산 (Settlement)
+# - 체결이 날 때마다 DB에 쓰지 않고, 메모리 장부(AgentLedger)에 먼저 반영
+# - 틱(또는 매칭 사이클)이 끝날 때 잔고/포트폴리오/거래기록을 한 트랜잭션으로 일괄 저장
+# - 저널이 붙어 있으면 체결마다 순번을 매기고, 정산한 마지막 순번(settled_seq)도 같은 트랜잭션으로 저장
+#   → 재생 때 이 순번 이하 체결은 건너뜀 (COMMIT과 SETTLED 기록 사이에 죽어도 두 번 반영되지 않음)
+# - 매수 체결 때 평균 매입 단가(psychology["avg_price_{ticker}"])도 갱신해 잔고와 같이 저장
+# ------------------------------------------------------------------
+
+class AgentLedger:
+    """에이전트 한 명의 인메모리 장부 (현금 + 보유 주식 + 심리/최근 생각)"""
+    __slots__ = ("row_id", "agent_id", "cash", "portfolio", "psychology", "dirty")
+
+    def __init__(self, row_id: int, agent_id: str, cash: float, portfolio: dict, psychology: dict = None):
+        self.row_id = row_id
+        self.agent_id = agent_id
+        self.cash = float(cash or 0)
+        self.portfolio = dict(portfolio or {})
+        self.psychology = dict(psychology or {})
+        self.dirty = False
+
+
+class SettlementBatch:
+    def __init__(self):
+        self.ledgers = {}        # agent_id -> AgentLedger (load_agents 때마다 정산 대기분이 없는 장부는 DB 값으로 새로 읽음)
+        self.pending_trades = [] # 아직 DB에 안 들어간 거래 기록
+        self.last_prices = {}    # ticker -> 마지막 체결가
+        self.recent_prices = RecentPrices() # 종목별 최근 체결가 (다음 틱 MarketContext 추세용, trades 테이블을 다시 안 읽음)
+        self.changed = set()     # 마지막 take_changed() 이후 체결로 잔고가 바뀐 에이전트 (벡터 군중 배열 갱신용)
+        # 종목별 워커 스레드가 동시에 체결을 넣으므로 장부/대기열은 잠금으로 보호
+        self._lock = threading.RLock()
+        # 저널(OrderJournal)이 붙어 있으면 체결/정산완료 표시를 같은 잠금 안에서 기록 → 재생 때 미정산 체결만 골라냄
+        self.journal = None
+        self.fill_seq = 0 # 마지막 체결 순번 (pending_trades는 항상 fill_seq까지 이어지는 마지막 len개)
+
+    def load(self, db: Session, agent_ids, chunk: int = 5000, refresh: bool = True):
+        """
+        에이전트를 IN 절로 장부에 올립니다. (수만 명이면 chunk명씩 나눠서 - DB 바인드 변수 한도)
+        refresh=True면 이미 올라온 장부도 정산 대기분(dirty)이 없으면 DB 값으로 다시 읽음
+        → 실행 중에 DB 행을 바꿔도(init_agents 초기화, 수동 수정 등) 다음 flush가 옛 장부로 덮어쓰지 않음
+        """
+        with self._lock:
+            targets = [a for a in set(agent_ids)
+                       if a not in self.ledgers or (refresh and not self.ledgers[a].dirty)]
+        for start in range(0, len(targets), chunk):
+            rows = db.query(DBAgent.id, DBAgent.agent_id, DBAgent.cash_balance, DBAgent.portfolio, DBAgent.psychology) \
+                     .filter(DBAgent.agent_id.in_(targets[start:start + chunk])).all()
+            with self._lock:
+                for row in rows:
+                    self._reload_locked(row)
+
+    def _reload_locked(self, row):
+        l = self.ledgers.get(row.agent_id)
+        if l is None:
+            self.ledgers[row.agent_id] = AgentLedger(row.id, row.agent_id, row.cash_balance, row.portfolio, row.psychology)
+            return
+        if l.dirty: return # 읽는 사이 체결이 들어옴 → 메모리 쪽이 최신
+        fresh = AgentLedger(row.id, row.agent_id, row.cash_balance, row.portfolio, row.psychology)
+        if (fresh.cash, fresh.portfolio, fresh.psychology) != (l.cash, l.portfolio, l.psychology):
+            l.cash, l.portfolio, l.psychology = fresh.cash, fresh.portfolio, fresh.psychology
+            self.changed.add(l.agent_id) # 벡터 군중 배열도 다시 읽게
+
+    def ledger(self, db: Session, agent_id: str):
+        if agent_id not in self.ledgers:
+            self.load(db, [agent_id], refresh=False)
+        return self.ledgers.get(agent_id)
+
+    def view(self, agent_id: str):
+        """
+        장부 사본 (cash, portfolio, psychology) - 워커 스레드가 체결을 넣는 중에도 안전하게 읽기용.
+        장부에 없으면 None (load를 먼저 불러야 함)
+        """
+        with self._lock:
+            l = self.ledgers.get(agent_id)
+            if l is None: return None
+            return l.cash, dict(l.portfolio), dict(l.psychology)
+
+    def take_changed(self) -> set:
+        """지난번 호출 이후 체결로 잔고/보유량이 바뀐 에이전트 id를 꺼냅니다."""
+        with self._lock:
+            changed, self.changed = self.changed, set()
+        return changed
+
+    def remember(self, agent_id: str, **values):
+        """의사결정 결과(최근 생각 등)를 심리 필드에 적어두고 틱 끝 flush 때 같이 저장합니다."""
+        with self._lock:
+            l = self.ledgers.get(agent_id)
+            if l is None: return False
+            l.psychology.update(values)
+            l.dirty = True
+        return True
+
+    def apply_fill(self, db: Session, ticker: str, buyer_id: str, seller_id: str, price: int, qty: int, sim_time: datetime = None):
+        """체결 1건을 메모리 장부에만 반영합니다. (DB 쓰기는 flush에서)"""
+        buyer = self.ledger(db, buyer_id)
+        seller = self.ledger(db, seller_id)
+        if not buyer or not seller: return False # 에러 방지
+
+        with self._lock:
+            self._apply_locked(ticker, buyer, seller, price, qty, sim_time)
+        return True
+
+    def _apply_locked(self, ticker, buyer: AgentLedger, seller: AgentLedger, price, qty, sim_time):
+        total_amt = price * qty
+
+        # 1. 구매자 처리 (돈 차감, 주식 증가)
+        if buyer.cash >= total_amt:
+            held = buyer.portfolio.get(ticker, 0)
+            buyer.cash -= total_amt
+            buyer.portfolio[ticker] = held + qty
+            # 평균 매입 단가 (심리 필드 avg_price_{ticker}) - 수익률 판단/캐시 키/군중 배열이 읽음
+            key = f"avg_price_{ticker}"
+            avg = buyer.psychology.get(key) or price # 단가가 없던 기존 보유분은 이번 체결가로 간주
+            buyer.psychology[key] = (avg * held + total_amt) / (held + qty)
+            buyer.dirty = True
+
+        # 2. 판매자 처리 (돈 증가, 주식 차감)
+        # (판매자는 이미 호가창 올릴 때 주식 있다고 가정하지만 한번 더 체크)
+        if seller.portfolio.get(ticker, 0) >= qty:
+            seller.cash += total_amt
+            seller.portfolio[ticker] -= qty
+            if seller.portfolio[ticker] <= 0: # 다 팔면 평단도 지움 (파는 것으로는 평단이 바뀌지 않음)
+                del seller.portfolio[ticker]
+                seller.psychology.pop(f"avg_price_{ticker}", None)
+            seller.dirty = True
+
+        self.changed.add(buyer.agent_id)
+        self.changed.add(seller.agent_id)
+
+        # 3. 주가 (현재가 = 최근 체결가) & 4. 거래 기록
+        self.fill_seq += 1
+        if self.journal is not None:
+            self.journal.append(encode_fill(self.fill_seq, ticker, buyer.agent_id, seller.agent_id, price, qty, sim_time))
+        self.last_prices[ticker] = float(price)
+        self.recent_prices.add(ticker, float(price))
+        self.pending_trades.append({
+            "ticker": ticker, "price": price, "quantity": qty,
+            "buyer_id": buyer.agent_id, "seller_id": seller.agent_id,
+            "timestamp": sim_time or datetime.now()
+        })
+
+    def flush(self, db: Session) -> int:
+        """
+        쌓인 변경분을 한 트랜잭션으로 저장합니다.
+        체결/에이전트 수와 상관없이 UPDATE(에이전트) 1회 + INSERT(거래) 1회 + UPDATE(기업) 1회 + COMMIT 1회.
+        """
+        with self._lock:
+            return self._flush_locked(db)
+
+    def _flush_locked(self, db: Session) -> int:
+        dirty = [l for l in self.ledgers.values() if l.dirty]
+        if not self.pending_trades and not self.last_prices and not dirty:
+            return 0
+
+        payload = self._payload_locked(dirty)
+        try:
+            write_settlement(db, payload)
+            if self.journal is not None:
+                mark_settled(db, self.fill_seq)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        if self.journal is not None:
+            self.journal.append(encode_settled(self.fill_seq))
+        self._clear_locked(dirty)
+        return len(payload["trades"])
+
+    def collect(self) -> dict:
+        """
+        DB에 쓰지 않고 변경분만 꺼내 비웁니다. (프로세스 간 전달용 dict: agents / trades / prices)
+        다른 프로세스(정산 writer)가 write_settlement로 저장하는 샤드 모드에서 사용
+        """
+        with self._lock:
+            dirty = [l for l in self.ledgers.values() if l.dirty]
+            payload = self._payload_locked(dirty)
+            self._clear_locked(dirty)
+        return payload
+
+    def pending_fills(self):
+        """아직 DB에 못 들어간 체결을 (순번, 거래 기록)으로 꺼냅니다. (저널 스냅샷용 - 잠금은 호출자가)"""
+        first = self.fill_seq - len(self.pending_trades) + 1
+        return list(enumerate(self.pending_trades, first))
+
+    def _payload_locked(self, dirty) -> dict:
+        return {
+            "agents": [{"id": l.row_id, "cash_balance": l.cash,
+                        "portfolio": dict(l.portfolio), "psychology": dict(l.psychology)} for l in dirty],
+            "trades": self.pending_trades,
+            "prices": self.last_prices,
+        }
+
+    def _clear_locked(self, dirty):
+        for l in dirty: l.dirty = False
+        self.pending_trades = []
+        self.last_prices = {}
+
+
+def write_settlement(db: Session, payload: dict):
+    """정산분 1묶음을 UPDATE(에이전트) 1회 + INSERT(거래) 1회 + UPDATE(기업) 1회로 씁니다. (COMMIT은 호출자가)"""
+    if payload["agents"]:
+        db.bulk_update_mappings(DBAgent, payload["agents"])
+    if payload["trades"]:
+        db.bulk_insert_mappings(DBTrade, payload["trades"])
+    if payload["prices"]:
+        db.bulk_update_mappings(DBCompany, [
+            {"ticker": t, "current_price": p} for t, p in payload["prices"].items()
+        ])
+
+
+def mark_settled(db: Session, seq: int):
+    """정산한 마지막 저널 체결 순번을 sim_clock 행에 적습니다. (정산과 같은 트랜잭션 - COMMIT은 호출자가)"""
+    updated = db.query(DBSimClock).filter(DBSimClock.id == CLOCK_ROW_ID) \
+                .update({DBSimClock.settled_seq: seq}, synchronize_session=False)
+    if not updated:
+        db.add(DBSimClock(id=CLOCK_ROW_ID, settled_seq=seq))
+
+
+def settled_seq(db: Session) -> int:
+    """DB에 정산 완료된 마지막 저널 체결 순번 (기록이 없으면 0)"""
+    try:
+        return db.query(DBSimClock.settled_seq).filter(DBSimClock.id == CLOCK_ROW_ID).scalar() or 0
+    except SQLAlchemyError:
+        db.rollback() # 테이블/컬럼이 아직 없는 경우
+        return 0
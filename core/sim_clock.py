@@ -0,0 +1,68 @@
+import os
+from datetime import datetime
+from sqlalchemy import desc
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from database import DBSimClock, DBTrade
+
+# ------------------------------------------------------------------
+# 시뮬레이션 시계 서비스 (Sim Clock)
+# - 시뮬레이션 루프가 매 틱 가상 시각을 publish → API는 now()로 읽음
+# - 같은 프로세스면 메모리 값을 그대로 (DB 조회 없음)
+# - 시뮬레이션이 다른 프로세스면 sim_clock 테이블의 하트비트 행 1개를 기본키로 읽음
+# - 둘 다 없을 때만 예전처럼 마지막 거래 시각 → 그것도 없으면 오늘 09:00
+#   (거래가 없는 시간에도 시계가 멈추지 않고, 핫 API에서 trades 전체 정렬이 사라짐)
+# - SIM_MODE=external: 시뮬레이션은 별도 프로세스(scripts/sharded_simulation.py)가 돌림
+#   → API 프로세스는 시뮬레이션 루프를 띄우지 않고(main.py lifespan), now()는 항상 하트비트 행을 읽음
+# ------------------------------------------------------------------
+
+CLOCK_ROW_ID = 1
+SIM_CLOCK_HEARTBEAT = os.getenv("SIM_CLOCK_HEARTBEAT", "1") == "1" # 0이면 DB 하트비트를 안 씀 (단일 프로세스 전용)
+SIM_MODE = os.getenv("SIM_MODE", "inprocess") # inprocess: API 프로세스 안에서 시뮬레이션 / external: 별도 프로세스
+if SIM_MODE not in ("inprocess", "external"):
+    raise ValueError(f"SIM_MODE는 inprocess 또는 external이어야 합니다: {SIM_MODE!r}")
+
+
+class SimClock:
+    def __init__(self, heartbeat: bool = SIM_CLOCK_HEARTBEAT, external: bool = SIM_MODE == "external"):
+        self.heartbeat = heartbeat
+        self.external = external # True면 이 프로세스의 메모리 값은 무시하고 하트비트만 읽음
+        self.current = None # 이 프로세스에서 시뮬레이션이 돌면 마지막으로 publish된 가상 시각
+
+    def publish(self, sim_time: datetime, db: Session = None):
+        """시뮬레이션 루프가 틱마다 호출합니다. db를 주면 하트비트 행도 갱신 (UPDATE 1번, 없으면 INSERT)"""
+        self.current = sim_time
+        if db is None or not self.heartbeat:
+            return
+        try:
+            updated = db.query(DBSimClock).filter(DBSimClock.id == CLOCK_ROW_ID) \
+                        .update({DBSimClock.sim_time: sim_time, DBSimClock.updated_at: datetime.now()}, synchronize_session=False)
+            if not updated:
+                db.add(DBSimClock(id=CLOCK_ROW_ID, sim_time=sim_time, updated_at=datetime.now()))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    def now(self, db: Session) -> datetime:
+        """API용 현재 가상 시각"""
+        if self.current is not None and not self.external:
+            return self.current
+        stored = self.stored(db)
+        if stored is not None:
+            return stored
+        last_trade = db.query(DBTrade.timestamp).order_by(desc(DBTrade.timestamp)).limit(1).scalar()
+        if last_trade:
+            return last_trade
+        return datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+
+    def stored(self, db: Session):
+        """하트비트 행에 남은 가상 시각 (없으면 None) - 재시작 때 시계를 이어가는 데도 씀"""
+        try:
+            return db.query(DBSimClock.sim_time).filter(DBSimClock.id == CLOCK_ROW_ID).scalar()
+        except SQLAlchemyError:
+            db.rollback() # init_db 전이라 테이블이 아직 없는 경우
+            return None
+
+
+sim_clock = SimClock()
@@ -0,0 +1,248 @@
+import os
+import zlib
+import queue
+import asyncio
+import logging
+import multiprocessing as mp
+from sqlalchemy.orm import Session
+from database import SessionLocal, DBAgent, DBCompany, DBDiscussion
+from core.settlement import write_settlement
+from core.sim_clock import sim_clock
+
+logger = logging.getLogger("SimShards")
+
+# ------------------------------------------------------------------
+# 섹터별 멀티 프로세스 시뮬레이션 (Sharded Simulation)
+# - 감독(supervisor) 프로세스가 섹터(DBCompany.sector)마다 워커 프로세스를 하나씩 띄움
+#   → 워커는 자기 섹터 종목의 호가창과, 해시로 나눠 받은 에이전트만 들고 run_tick을 돌림 (코어 수만큼 처리량 확장)
+# - 정산(+체결 후 종토방 글/간판)은 워커가 DB에 직접 쓰지 않고 큐로 감독 프로세스에 보냄
+#   → 감독이 유일한 writer (틱당 1트랜잭션, 프로세스끼리 DB 쓰기 잠금을 다투지 않음)
+# - 가상 시계는 Barrier로 맞춤: 감독이 틱 t 정산을 커밋하고 시계를 publish해야 모든 워커가 t+1로 넘어감
+# - 마켓 메이커처럼 모든 샤드가 같이 쓰는 계정은 절댓값 대신 현금 변화량 + 자기 종목 보유량만 보내서 합침
+# - 샤드 모드는 저널(MARKET_JOURNAL_DIR)과 비동기 파이프라인을 쓰지 않음
+# ------------------------------------------------------------------
+
+SIM_SHARD_BARRIER_TIMEOUT_SEC = float(os.getenv("SIM_SHARD_BARRIER_TIMEOUT_SEC", 120)) # 한 틱을 이보다 오래 못 끝내면 중단
+UNSECTORED = "기타"
+
+
+class ShardSpec:
+    """워커 하나가 맡는 종목 묶음 + 에이전트 해시 구간"""
+    __slots__ = ("name", "index", "count", "tickers")
+
+    def __init__(self, name: str, index: int, count: int, tickers):
+        self.name = name
+        self.index = index
+        self.count = count
+        self.tickers = frozenset(tickers)
+
+    def owns_agent(self, agent_id: str) -> bool:
+        # 프로세스마다 달라지는 hash() 대신 crc32 → 모든 워커가 같은 배정을 봄
+        return zlib.crc32(agent_id.encode("utf-8")) % self.count == self.index
+
+
+def plan_shards(db: Session, max_shards: int = None) -> list:
+    """섹터별로 종목을 묶습니다. 섹터가 max_shards보다 많으면 종목 수가 적은 샤드부터 채워 합침."""
+    sectors = {}
+    for ticker, sector in db.query(DBCompany.ticker, DBCompany.sector).order_by(DBCompany.ticker).all():
+        sectors.setdefault(sector or UNSECTORED, []).append(ticker)
+    groups = [([name], tickers) for name, tickers in sorted(sectors.items())]
+    if max_shards and len(groups) > max_shards:
+        merged = [([], []) for _ in range(max_shards)]
+        for names, tickers in sorted(groups, key=lambda g: -len(g[1])):
+            target = min(merged, key=lambda g: len(g[1]))
+            target[0].extend(names)
+            target[1].extend(tickers)
+        groups = [g for g in merged if g[1]]
+    return [ShardSpec("+".join(names), i, len(groups), tickers) for i, (names, tickers) in enumerate(groups)]
+
+
+def write_tick(db: Session, payloads):
+    """
+    한 틱 동안 모든 샤드가 보낸 정산분을 합쳐 한 번에 씁니다. (COMMIT은 호출자가)
+    공용 계정(shared)은 DB 값에 현금 변화량을 더하고, 보유량은 샤드별 자기 종목만 덮어씀
+    """
+    merged = {"agents": [], "trades": [], "prices": {}}
+    shared, posts, signs = {}, [], []
+    for p in payloads:
+        merged["agents"].extend(p["agents"])
+        merged["trades"].extend(p["trades"])
+        merged["prices"].update(p["prices"])
+        posts.extend(p["posts"])
+        signs.extend(p["signs"].values())
+        for agent_id, change in p["shared"].items():
+            shared.setdefault(agent_id, []).append(change)
+
+    if shared:
+        for row in db.query(DBAgent.id, DBAgent.agent_id, DBAgent.cash_balance, DBAgent.portfolio) \
+                     .filter(DBAgent.agent_id.in_(list(shared))).all():
+            cash, portfolio = float(row.cash_balance or 0), dict(row.portfolio or {})
+            for change in shared[row.agent_id]:
+                cash += change["cash_delta"]
+                portfolio.update(change["portfolio"])
+            merged["agents"].append({"id": row.id, "cash_balance": cash,
+                                     "portfolio": {t: q for t, q in portfolio.items() if q > 0}})
+    write_settlement(db, merged)
+    if posts:
+        db.bulk_insert_mappings(DBDiscussion, posts)
+    if signs:
+        db.bulk_update_mappings(DBCompany, signs)
+    return len(merged["trades"])
+
+
+class ShardSettlementSink:
+    """워커 쪽: 틱 끝에 정산 장부를 비워 감독 프로세스 큐로 보냅니다. (main_simulation.settlement_sink로 꽂음)"""
+
+    def __init__(self, spec: ShardSpec, ledger, out_queue, shared_ids):
+        self.spec = spec
+        self.ledger = ledger
+        self.out_queue = out_queue
+        # 공용 계정: 장부에 올라온 시점의 현금을 기준으로 변화량만 보냄
+        self.last_cash = {}
+        for agent_id in shared_ids:
+            view = ledger.view(agent_id)
+            if view is not None: self.last_cash[agent_id] = view[0]
+
+    def __call__(self, sim_time, tick: int, posts=(), signs=None) -> int:
+        payload = self.ledger.collect()
+        dirty_rows = {row["id"] for row in payload["agents"]}
+        shared, shared_rows = {}, set()
+        for agent_id, last in self.last_cash.items():
+            row_id = self.ledger.ledgers[agent_id].row_id
+            shared_rows.add(row_id)
+            if row_id not in dirty_rows: continue # 이번 틱에 체결이 없었음
+            cash, portfolio, _ = self.ledger.view(agent_id)
+            shared[agent_id] = {"cash_delta": cash - last, "portfolio": {t: portfolio.get(t, 0) for t in self.spec.tickers}}
+            self.last_cash[agent_id] = cash
+        payload["agents"] = [row for row in payload["agents"] if row["id"] not in shared_rows]
+        payload.update(shard=self.spec.name, tick=tick, sim_time=sim_time, shared=shared, posts=list(posts), signs=signs or {})
+        self.out_queue.put(payload)
+        return len(payload["trades"])
+
+
+def shard_worker(spec: ShardSpec, start_time, ticks, out_queue, barrier, options: dict):
+    """워커 프로세스 진입점 (spawn). 이 프로세스에서 main_simulation을 처음 import → 자기만의 엔진/장부"""
+    os.environ.pop("MARKET_JOURNAL_DIR", None)
+    try:
+        asyncio.run(_run_shard(spec, start_time, ticks, out_queue, barrier, options))
+    except Exception as e:
+        logger.error(f"🚨 [샤드 {spec.name}] 중단: {e}")
+        barrier.abort() # 감독/다른 워커가 Barrier에서 무한히 기다리지 않게
+        raise
+
+async def _run_shard(spec: ShardSpec, start_time, ticks, out_queue, barrier, options: dict):
+    import random
+    import main_simulation as sim
+    from core.offline_policy import offline_think
+
+    if options.get("seed") is not None:
+        random.seed(options["seed"] * 1000 + spec.index)
+        sim.agent_random.seed(options["seed"]) # 에이전트별 난수는 샤드 배정과 상관없이 같음
+    if options.get("policy") == "offline":
+        sim.decision_policy = offline_think
+        sim.ENABLE_CHATTER = False
+        sim.decision_cache = None
+    if options.get("crowd") is not None:
+        sim.CROWD_PARTICIPATION = options["crowd"]
+    if not options.get("verbose"):
+        sim.logger.setLevel(logging.WARNING)
+
+    sim.shard = spec
+    sim_clock.heartbeat = False # 시계 하트비트는 감독 프로세스만 씀
+    with SessionLocal() as db:
+        sim.market_engine.load_agents(db, [sim.MM_ID])
+    sim.settlement_sink = ShardSettlementSink(spec, sim.ledger, out_queue, [sim.MM_ID])
+
+    sim_time, tick = start_time, 0
+    try:
+        while ticks is None or tick < ticks:
+            sim_time = sim.advance_clock(sim_time)
+            tick += 1
+            await sim.run_tick(sim_time, tick)
+            # 감독이 이번 틱 정산을 커밋할 때까지 대기 (종목 워커 스레드는 계속 돌 수 있게 스레드에서 기다림)
+            await asyncio.to_thread(barrier.wait, SIM_SHARD_BARRIER_TIMEOUT_SEC)
+    finally:
+        await sim.matching_pool.close()
+
+
+class SimSupervisor:
+    def __init__(self, max_shards: int = None, ticks: int = None, options: dict = None):
+        """ticks: 돌릴 틱 수 (None이면 계속) / options: 워커에 넘길 설정 (policy, crowd, seed, verbose)"""
+        self.max_shards = max_shards
+        self.ticks = ticks
+        self.options = options or {}
+        self.shards = []
+        self.processes = []
+        self.stats = {"ticks": 0, "trades": 0, "by_shard": {}}
+        self.sim_time = None
+        self._ctx = mp.get_context("spawn") # 스레드/이벤트 루프를 가진 부모를 fork하지 않음
+        self._queue = None
+        self._barrier = None
+        self._completed = False
+
+    def start(self):
+        """샤드 계획 → 마켓 메이커 계정 준비 → 워커 프로세스 기동"""
+        import main_simulation as sim
+        with SessionLocal() as db:
+            self.shards = plan_shards(db, self.max_shards)
+            sim.ensure_market_maker(db, [t for s in self.shards for t in sorted(s.tickers)]) # 워커끼리 동시에 만들지 않게 미리
+        self.sim_time = sim.get_latest_sim_time()
+
+        self._queue = self._ctx.Queue()
+        self._barrier = self._ctx.Barrier(len(self.shards) + 1)
+        for spec in self.shards:
+            proc = self._ctx.Process(target=shard_worker, name=f"sim-shard-{spec.index}", daemon=True,
+                                     args=(spec, self.sim_time, self.ticks, self._queue, self._barrier, self.options))
+            proc.start()
+            self.processes.append(proc)
+            logger.info(f"🧩 [샤드 {spec.index}] {spec.name}: {len(spec.tickers)}종목 (pid {proc.pid})")
+
+    def run(self) -> dict:
+        """유일한 정산 writer: 틱마다 모든 샤드의 정산분을 모아 한 트랜잭션으로 쓰고 시계를 publish한 뒤 Barrier를 엶"""
+        tick = 0
+        try:
+            while self.ticks is None or tick < self.ticks:
+                tick += 1
+                payloads = self._collect(tick)
+                with SessionLocal() as db:
+                    try:
+                        trades = write_tick(db, payloads)
+                        db.commit()
+                    except Exception:
+                        db.rollback()
+                        raise
+                    self.sim_time = payloads[0]["sim_time"]
+                    sim_clock.publish(self.sim_time, db)
+                self.stats["ticks"] = tick
+                self.stats["trades"] += trades
+                for p in payloads:
+                    self.stats["by_shard"][p["shard"]] = self.stats["by_shard"].get(p["shard"], 0) + len(p["trades"])
+                self._barrier.wait(SIM_SHARD_BARRIER_TIMEOUT_SEC)
+            self._completed = True
+        finally:
+            self.stop()
+        return self.stats
+
+    def _collect(self, tick: int) -> list:
+        got = {}
+        while len(got) < len(self.shards):
+            try:
+                payload = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                dead = [p.name for p in self.processes if not p.is_alive()]
+                if dead or self._barrier.broken:
+                    raise RuntimeError(f"샤드 워커 중단: {dead or 'barrier broken'}")
+                continue
+            if payload["tick"] != tick:
+                raise RuntimeError(f"샤드 {payload['shard']} 틱 어긋남: {payload['tick']} != {tick}")
+            got[payload["shard"]] = payload
+        return list(got.values())
+
+    def stop(self):
+        """정해진 틱을 다 돌았으면 워커가 스스로 끝나기를 기다리고, 아니면 Barrier를 깨서 멈춤"""
+        if self._barrier is not None and not self._completed:
+            self._barrier.abort()
+        for p in self.processes:
+            p.join(timeout=10)
+            if p.is_alive(): p.terminate()
+        self.processes = []
@@ -1,124 +1,667 @@
 from sqlalchemy.orm import Session
-from database import DBCompany, DBAgent, DBTrade
-from models.domain_models import Order, OrderSide
+from models.domain_models import Order, OrderType, TimeInForce
+from core.order_book import OrderBook, BookOrder, AgentRegistry, StopOrder, TriggerBook, to_ticks, from_ticks
+from core.settlement import SettlementBatch, settled_seq
+from core.timer_wheel import TimerWheel
+from core import journal as jr
 from datetime import datetime
+import bisect
+import itertools
+import threading
+
+CONDITIONAL_TYPES = (OrderType.STOP, OrderType.STOP_LIMIT, OrderType.TAKE_PROFIT)
 
 class MarketEngine:
-    def __init__(self):
+    def __init__(self, auto_settle: bool = True, market_protection_pct: float = 0.05):
         # 인메모리 호가창 (DB에는 느려서 못 담음)
-        # 구조: {'IT008': {'BUY': [], 'SELL': []}}
+        # 구조: {'IT008': OrderBook} - 가격대별 FIFO 큐 (book['BUY']로 읽으면 우선순위 순 리스트)
         self.order_books = {}
+        self._seq = itertools.count(1) # 접수 순번 (같은 가격이면 먼저 온 주문이 우선)
+        self.agents = AgentRegistry()  # 에이전트 ID <-> 정수 핸들 (호가창 주문은 핸들만 들고 있음)
+
+        # 종목별 잠금: 종목별 매칭 워커(스레드)와 API 직접 호출이 같은 호가창을 동시에 건드리지 않도록
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+        # 주문 인덱스: order_id -> (ticker, side, 가격대, 주문) → 취소/정정 시 호가창을 뒤지지 않음
+        # 에이전트별 대기 주문: 에이전트 핸들 -> {order_id, ...} → 에이전트 일괄 취소용
+        self.order_index = {}
+        self.agent_orders = {}
+
+        # 주문 만료: GTT는 시뮬레이션 시간 기준 타이머 휠, DAY는 장 마감 때 일괄 취소
+        self.expiry_wheel = TimerWheel()
+        self.day_orders = set()
+
+        # 시장가 보호 범위: 도착 시점 최우선 반대 호가에서 ±5%까지만 훑고 나머지는 취소
+        self.market_protection_pct = market_protection_pct
+
+        # 단일가 매매(콜 옥션): ticker -> 마감 시각. 이 동안은 주문을 쌓기만 하고 마감 때 가격 하나로 한 번에 체결
+        # IOC/시장가는 옥션 동안 대기했다가 마감 체결 후 남은 수량을 취소
+        self.auctions = {}
+        self.auction_ioc = {} # ticker -> {order_id, ...}
+
+        # 조건부 주문(STOP/STOP_LIMIT/TAKE_PROFIT): 종목별 발동가 정렬 인덱스 + order_id -> (ticker, StopOrder)
+        # 체결이 나면 이번에 지나간 가격 구간(_trade_range)에 걸린 것만 꺼내 접수 (대기 주문 전체를 훑지 않음)
+        self.trigger_books = {}
+        self.stop_index = {}
+        self.last_trade = {}   # ticker -> 마지막 체결가 (틱)
+        self._trade_range = {} # ticker -> (최저, 최고) 아직 발동 검사 안 한 체결가 구간
+        self._firing = set()   # 발동 처리 중인 종목 (연쇄 발동은 바깥 루프가 이어서 처리)
+
+        # 체결 정산: 체결은 메모리 장부에만 반영하고 settle()에서 한 번에 DB 저장
+        # auto_settle=True면 place_order 한 번(매칭 사이클)마다, False면 호출자가 틱 끝에 settle() 호출
+        self.settlement = SettlementBatch()
+        self.auto_settle = auto_settle
+
+        # 주문/체결 저널 (attach_journal로 붙였을 때만 기록) - 재시작하면 호가창과 시계를 여기서 복구
+        self.journal = None
+        self._journal_clock = None
+
+    def _get_book(self, ticker: str) -> OrderBook:
+        book = self.order_books.get(ticker)
+        if book is None:
+            book = OrderBook(ticker, self.agents)
+            self.order_books[ticker] = book
+        return book
+
+    def _lock(self, ticker: str) -> threading.RLock:
+        lock = self._locks.get(ticker)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._locks.setdefault(ticker, threading.RLock())
+        return lock
 
     def place_order(self, db: Session, order: Order, sim_time: datetime = None):
         """
         주문을 받아서 호가창(Order Book)에 등록하고, 매칭을 시도합니다.
         sim_time: 시뮬레이션 상의 현재 시간 (None이면 현실 시간 사용)
+        (pydantic Order는 API 경계용 - 내부에서는 submit()으로 바로 풀어서 넘깁니다)
         """
-        ticker = order.ticker
-        if ticker not in self.order_books:
-            self.order_books[ticker] = {'BUY': [], 'SELL': []}
+        return self.submit(db, order.agent_id, order.ticker, order.side, order.quantity, order.price,
+                           order.order_type, order.time_in_force, order.expire_at, order.order_id, sim_time,
+                           order.trigger_price)
 
-        # 1. 유효성 검사 (돈/주식 있는지)
-        agent = db.query(DBAgent).filter(DBAgent.agent_id == order.agent_id).first()
+    def submit(self, db: Session, agent_id: str, ticker: str, side, quantity: int, price: float = None,
+               order_type=OrderType.LIMIT, time_in_force=TimeInForce.DAY, expire_at: datetime = None,
+               order_id: str = None, sim_time: datetime = None, trigger_price: float = None):
+        """
+        검증된 값으로 바로 주문을 넣는 내부 경로. (시뮬레이션 루프처럼 pydantic 객체가 필요 없는 곳에서 사용)
+        order_id를 안 주면 엔진이 접수 순번으로 만듭니다.
+        """
+        with self._lock(ticker):
+            result = self._place_locked(db, agent_id, ticker, str(getattr(side, "value", side)), int(quantity), price,
+                                        order_type, time_in_force, expire_at, order_id, sim_time, trigger_price)
+        if self.auto_settle:
+            self.settle(db)
+        return result
+
+    def submit_many(self, db: Session, ticker: str, orders, sim_time: datetime = None,
+                    time_in_force=TimeInForce.IOC) -> dict:
+        """
+        한 종목에 지정가 주문 여러 건을 잠금 한 번 안에서 연달아 넣습니다. (벡터화 군중처럼 주문이 많은 곳에서 사용)
+        orders: [(agent_id, side, quantity, price), ...] - 기본은 IOC (군중 주문이 호가창에 쌓이지 않도록)
+        반환: {"orders": 넣은 건수, "filled_qty": 체결 수량 합계, "last_price": 마지막 체결가}
+        """
+        filled, last_price = 0, None
+        with self._lock(ticker):
+            for agent_id, side, quantity, price in orders:
+                result = self._place_locked(db, agent_id, ticker, str(getattr(side, "value", side)), int(quantity), price,
+                                            OrderType.LIMIT, time_in_force, None, None, sim_time)
+                filled += result.get("filled_qty", 0)
+                last_price = result.get("last_price") or last_price
+        if self.auto_settle:
+            self.settle(db)
+        return {"orders": len(orders), "filled_qty": filled, "last_price": last_price}
+
+    def _place_locked(self, db: Session, agent_id, ticker, side, quantity, price, order_type, time_in_force, expire_at, order_id, sim_time, trigger_price=None):
+        book = self._get_book(ticker)
+
+        # 1. 유효성 검사 (돈/주식 있는지) - 정산 장부 캐시에 있으면 DB 조회 생략
+        agent = self.settlement.ledger(db, agent_id)
         if not agent: return {"status": "FAIL", "msg": "에이전트 없음"}
         
         # (간단한 검증: 주문 넣을 때 자산 가압류는 안 하고, 체결될 때 다시 체크함 - 현실은 가압류가 맞지만 시뮬레이션 편의상)
+        is_conditional = order_type in CONDITIONAL_TYPES
+        if is_conditional and not trigger_price:
+            return {"status": "FAIL", "msg": "조건부 주문은 발동 가격(trigger_price)이 필요합니다"}
+        if order_type == OrderType.STOP_LIMIT and not price:
+            return {"status": "FAIL", "msg": "STOP_LIMIT 주문은 지정가(price)가 필요합니다"}
         
-        # 2. 주문서 작성 (가격을 AI가 정한 가격으로)
-        # 지정가 주문으로 간주합니다.
-        new_order = {
-            "agent_id": order.agent_id,
-            "price": int(order.price) if order.price else 0, # 시장가면 0이지만 여기선 다 지정가로 옴
-            "quantity": order.quantity,
-            "side": order.side,
-            "timestamp": sim_time or datetime.now() # [수정] 가상 시간 적용
-        }
-
-        # 3. 호가창에 등록
-        book = self.order_books[ticker]
-        if order.side == OrderSide.BUY:
-            book['BUY'].append(new_order)
-            # 매수: 비싼 가격 부른 사람이 우선순위 (내림차순 정렬)
-            book['BUY'].sort(key=lambda x: x['price'], reverse=True)
+        # 2. 주문서 작성 (지정가는 AI/유저가 정한 가격, 시장가는 보호 범위 끝 가격)
+        seq = next(self._seq)
+        order_id = str(order_id) if order_id is not None else f"E{seq}"
+        if is_conditional:
+            rises = (side == "BUY") == (order_type != OrderType.TAKE_PROFIT) # 매수 손절/매도 익절은 오를 때 발동
+            return self._park_stop(db, ticker, StopOrder(seq, order_id, agent_id, side, to_ticks(trigger_price), price, quantity,
+                                                         order_type, time_in_force, expire_at, rises), sim_time)
+        is_market = order_type == OrderType.MARKET
+        if is_market:
+            limit_price = self._market_limit(book, side, price)
+            if limit_price is None:
+                return {"status": "CANCELLED", "msg": "반대편 호가 없음 (시장가 취소)", "order_id": order_id,
+                        "fills": [], "filled_qty": 0, "cancelled_qty": quantity}
         else:
-            book['SELL'].append(new_order)
-            # 매도: 싼 가격 부른 사람이 우선순위 (오름차순 정렬)
-            book['SELL'].sort(key=lambda x: x['price'])
+            limit_price = to_ticks(price) if price else 0
+
+        # 시장가는 남은 수량을 절대 호가창에 남기지 않음
+        new_order = BookOrder(seq, order_id, self.agents.handle(agent_id), side, limit_price, quantity,
+                              TimeInForce.IOC if is_market else time_in_force, expire_at,
+                              sim_time or datetime.now(), is_market) # [수정] 가상 시간 적용
+
+        # 3. 호가창에 등록 (매수: 비싼 가격 우선, 매도: 싼 가격 우선 - 가격대 안에서는 도착 순서)
+        self._rest(book, new_order)
 
         # 4. 매칭 엔진 가동 (거래 성사 확인)
-        return self._match_orders(db, ticker, sim_time)
+        result = self._match_orders(db, ticker, sim_time)
+        result["order_id"] = order_id
+
+        # 5. IOC: 체결되고 남은 수량은 호가창에 남기지 않고 바로 취소 (단일가 접수 중이면 마감 체결까지 대기)
+        if new_order.tif == TimeInForce.IOC and ticker in self.auctions:
+            self.auction_ioc.setdefault(ticker, set()).add(order_id)
+        elif new_order.tif == TimeInForce.IOC and self._cancel_locked(order_id):
+            result["cancelled_qty"] = new_order.quantity
+            if result["status"] == "PENDING":
+                result.update(status="CANCELLED", msg="즉시 체결 물량 없음 (IOC 취소)")
+        return result
+
+    def _market_limit(self, book: OrderBook, side: str, price=None):
+        """
+        시장가 주문이 훑을 수 있는 가격 한도 (틱).
+        - price를 같이 주면 그 가격이 한도 (시장성 지정가처럼 동작)
+        - 아니면 최우선 반대 호가 ± 보호 범위
+        """
+        best = book.opposite(side).best_price()
+        if best is None:
+            return None
+        band = max(1, int(best * self.market_protection_pct))
+        limit = best + band if side == "BUY" else best - band
+        if price:
+            limit = min(limit, to_ticks(price)) if side == "BUY" else max(limit, to_ticks(price))
+        return limit
+
+    def _rest(self, book: OrderBook, order: BookOrder):
+        """호가창에 올리고 주문 인덱스에 등록합니다."""
+        level = book.side(order.side).add(order)
+        self.order_index[order.order_id] = (book.ticker, order.side, level, order)
+        if self.journal is not None:
+            self.journal.append(jr.encode_rest(book.ticker, self.agents.name(order.agent), order))
+        self._track(order.order_id, order.agent, order.tif, order.expire_at)
+
+    def _forget(self, order: BookOrder):
+        """전량 체결/취소된 주문을 인덱스에서 지웁니다."""
+        if self.journal is not None:
+            self.journal.append(jr.encode_remove(order.order_id))
+        self.order_index.pop(order.order_id, None)
+        self._untrack(order.order_id, order.agent, order.tif, order.expire_at)
+
+    def _track(self, order_id: str, agent: int, tif, expire_at):
+        """에이전트별 목록 + 만료 관리(GTT는 타이머 휠, DAY는 장 마감 목록)에 등록"""
+        self.agent_orders.setdefault(agent, set()).add(order_id)
+        if tif == TimeInForce.GTT and expire_at:
+            self.expiry_wheel.schedule(order_id, expire_at)
+        elif tif != TimeInForce.IOC:
+            self.day_orders.add(order_id)
+
+    def _untrack(self, order_id: str, agent: int, tif, expire_at):
+        self.day_orders.discard(order_id)
+        if tif == TimeInForce.GTT and expire_at:
+            self.expiry_wheel.cancel(order_id, expire_at)
+        ids = self.agent_orders.get(agent)
+        if ids is not None:
+            ids.discard(order_id)
+            if not ids: del self.agent_orders[agent]
+
+    # --- 조건부 주문 (STOP / STOP_LIMIT / TAKE_PROFIT) ---
+    def _park_stop(self, db: Session, ticker: str, order: StopOrder, sim_time: datetime = None):
+        """발동 인덱스에 올려두고, 이미 마지막 체결가가 발동 조건을 넘었으면 바로 발동합니다."""
+        self._index_stop(ticker, order)
+
+        result = {"status": "PENDING", "msg": "조건부 주문 접수 (발동 대기)", "order_id": order.order_id, "fills": [], "filled_qty": 0}
+        last = self.last_trade.get(ticker)
+        if last is not None:
+            self._note_trades(ticker, last, last)
+            result["triggered"] = self._fire_triggers(db, ticker, sim_time)
+        return result
+
+    def _index_stop(self, ticker: str, order: StopOrder):
+        """발동 인덱스/주문 인덱스에 등록합니다. (재생 때도 이 경로 - 발동 검사는 안 함)"""
+        self.trigger_books.setdefault(ticker, TriggerBook()).add(order)
+        self.stop_index[order.order_id] = (ticker, order)
+        if self.journal is not None:
+            self.journal.append(jr.encode_stop(ticker, order))
+        # 발동 후 IOC가 되는 건 시장가 쪽이고, 대기 중에는 DAY처럼 장 마감 때 정리
+        self._track(order.order_id, self.agents.handle(order.agent_id), order.tif, order.expire_at)
+
+    def _unindex_stop(self, order: StopOrder):
+        """발동/취소/만료된 조건부 주문을 인덱스에서 지웁니다. (발동 인덱스에서 빼는 건 호출자가)"""
+        if self.journal is not None:
+            self.journal.append(jr.encode_remove(order.order_id))
+        self.stop_index.pop(order.order_id, None)
+        self._untrack(order.order_id, self.agents.handle(order.agent_id), order.tif, order.expire_at)
+
+    def _drop_stop(self, order_id: str) -> bool:
+        entry = self.stop_index.get(order_id)
+        if entry is None:
+            return False
+        ticker, order = entry
+        self.trigger_books[ticker].remove(order)
+        self._unindex_stop(order)
+        return True
+
+    def _note_trades(self, ticker: str, low: int, high: int):
+        """아직 발동 검사 안 한 체결가 구간을 넓힙니다. (연쇄 발동 중에 난 체결도 같이 모음)"""
+        prev = self._trade_range.get(ticker)
+        self._trade_range[ticker] = (low, high) if prev is None else (min(prev[0], low), max(prev[1], high))
+
+    def _fire_triggers(self, db: Session, ticker: str, sim_time: datetime = None) -> int:
+        """
+        체결가가 지나간 구간에 걸린 조건부 주문만 꺼내 시장가(STOP/TAKE_PROFIT) 또는 지정가(STOP_LIMIT)로 접수합니다.
+        발동 주문의 체결이 또 다른 조건을 건드리면(연쇄) 재귀 대신 이 루프가 새 구간을 이어서 처리합니다.
+        """
+        triggers = self.trigger_books.get(ticker)
+        if not triggers:
+            self._trade_range.pop(ticker, None)
+            return 0
+        if ticker in self._firing:
+            return 0
+
+        fired = 0
+        self._firing.add(ticker)
+        try:
+            while True:
+                traded = self._trade_range.pop(ticker, None)
+                if traded is None:
+                    break
+                for stop in triggers.pop_triggered(*traded):
+                    self._unindex_stop(stop)
+                    is_limit = stop.order_type == OrderType.STOP_LIMIT
+                    self._place_locked(db, stop.agent_id, ticker, stop.side, stop.quantity,
+                                       stop.price if is_limit else None, OrderType.LIMIT if is_limit else OrderType.MARKET,
+                                       stop.tif, stop.expire_at, stop.order_id, sim_time)
+                    fired += 1
+        finally:
+            self._firing.discard(ticker)
+        return fired
+
+    def _ticker_of(self, order_id: str):
+        entry = self.order_index.get(order_id) or self.stop_index.get(order_id)
+        return entry[0] if entry else None
+
+    def _resize(self, level, order: BookOrder, quantity: int):
+        """자리 유지한 채 수량만 변경 (부분 체결/수량 정정). 0이 되면 뒤따르는 삭제 기록으로 충분해서 저널에 안 남김"""
+        level.resize(order, quantity)
+        if self.journal is not None and quantity > 0:
+            self.journal.append(jr.encode_resize(order.order_id, quantity))
+
+    def cancel_order(self, order_id) -> bool:
+        """대기 중인 주문(조건부 포함)을 취소합니다. (인덱스로 바로 찾아서 O(1), 빈 가격대 정리만 O(log n))"""
+        ticker = self._ticker_of(str(order_id))
+        if ticker is None:
+            return False
+        with self._lock(ticker):
+            return self._cancel_locked(str(order_id))
+
+    def _cancel_locked(self, order_id: str) -> bool:
+        entry = self.order_index.get(order_id)
+        if entry is None:
+            return self._drop_stop(order_id) # 발동 대기 중인 조건부 주문이거나, 그 사이 체결됨
+        ticker, side, level, order = entry
+        self.order_books[ticker].side(side).discard(level, order)
+        self._forget(order)
+        return True
+
+    def cancel_agent_orders(self, agent_id: str, ticker: str = None) -> int:
+        """특정 에이전트의 대기 주문을 한 번에 취소합니다. (ticker를 주면 그 종목만)"""
+        cancelled = 0
+        for order_id in list(self.agent_orders.get(self.agents.find(agent_id), ())):
+            order_ticker = self._ticker_of(order_id)
+            if order_ticker is None or (ticker and order_ticker != ticker):
+                continue
+            with self._lock(order_ticker):
+                cancelled += self._cancel_locked(order_id)
+        return cancelled
+
+    def expire_orders(self, sim_time: datetime) -> int:
+        """시뮬레이션 시간이 지나 만료된 GTT 주문만 골라 취소합니다. (매 틱 호출)"""
+        return sum(self.cancel_order(order_id) for order_id in self.expiry_wheel.advance(sim_time))
+
+    def clear_day_orders(self) -> int:
+        """장 마감(19:00) 때 당일(DAY) 주문을 한 번에 취소합니다."""
+        return sum(self.cancel_order(order_id) for order_id in list(self.day_orders))
+
+    def replace_quotes(self, db: Session, ticker: str, bids, asks, agent_id: str = "MARKET_MAKER", sim_time: datetime = None):
+        """
+        마켓 메이커 전용: 한 종목의 호가 사다리를 통째로 교체합니다.
+        bids/asks: [(가격, 수량), ...]
+        - 주문마다 DB 검증/pydantic 생성 없이 바로 호가창에 올림
+        - 같은 가격에 이미 걸린 호가는 수량을 줄일 때만 자리 유지 (늘리면 취소 후 맨 뒤로), 사라진 가격은 취소
+        - 새 호가가 반대편과 가격이 맞을 때만 매칭 실행
+        """
+        ts = sim_time or datetime.now()
+        handle = self.agents.handle(agent_id)
+        with self._lock(ticker):
+            book = self._get_book(ticker)
+            current = {}
+            for order_id in list(self.agent_orders.get(handle, ())):
+                entry = self.order_index.get(order_id)
+                if entry and entry[0] == ticker:
+                    current.setdefault((entry[1], entry[3].price), []).append(entry)
 
-    def _match_orders(self, db: Session, ticker: str, sim_time: datetime = None):
+            for side, ladder in (("BUY", bids), ("SELL", asks)):
+                for price, qty in ladder:
+                    price, qty = to_ticks(price), int(qty)
+                    if qty <= 0: continue
+                    same_price = current.get((side, price))
+                    if same_price:
+                        _, _, level, order = same_price.pop(0)
+                        if qty <= order.quantity:
+                            self._resize(level, order, qty)
+                            continue
+                        self._cancel_locked(order.order_id) # 늘리면 amend_order처럼 맨 뒤로 다시 줄 섬
+                    seq = next(self._seq)
+                    self._rest(book, BookOrder(seq, f"{agent_id}-{seq}", handle, side, price, qty, TimeInForce.DAY, None, ts))
+
+            for entries in current.values():
+                for entry in entries:
+                    self._cancel_locked(entry[3].order_id)
+
+            crossed = book.bids and book.asks and book.bids.best_price() >= book.asks.best_price()
+            if not crossed:
+                return {"status": "PENDING", "msg": "호가 교체 완료"}
+            result = self._match_orders(db, ticker, sim_time)
+
+        if self.auto_settle:
+            self.settle(db)
+        return result
+
+    def amend_order(self, db: Session, order_id, quantity: int = None, price: float = None, sim_time: datetime = None):
+        """
+        대기 주문 정정.
+        - 수량만 줄이면 자리(시간 우선순위) 유지
+        - 가격 변경이나 수량 증가는 맨 뒤로 다시 줄 서고, 가격이 맞으면 바로 매칭
+        """
+        entry = self.order_index.get(str(order_id))
+        if entry is None:
+            return {"status": "FAIL", "msg": "정정할 주문 없음"}
+        ticker = entry[0]
+        with self._lock(ticker):
+            entry = self.order_index.get(str(order_id))
+            if entry is None:
+                return {"status": "FAIL", "msg": "정정할 주문 없음"}
+            _, side, level, order = entry
+            new_qty = order.quantity if quantity is None else int(quantity)
+            new_price = order.price if price is None else to_ticks(price)
+
+            if new_qty <= 0:
+                self._cancel_locked(order.order_id)
+                return {"status": "CANCELLED", "msg": "수량 0으로 정정되어 취소됨", "order_id": order.order_id}
+
+            if new_price == order.price and new_qty <= order.quantity:
+                self._resize(level, order, new_qty)
+                return {"status": "PENDING", "msg": "주문 정정됨 (순서 유지)", "order_id": order.order_id}
+
+            book = self.order_books[ticker]
+            book.side(side).discard(level, order)
+            self._forget(order)
+            order.seq, order.price, order.quantity = next(self._seq), new_price, new_qty
+            order.timestamp = sim_time or datetime.now()
+            self._rest(book, order)
+            result = self._match_orders(db, ticker, sim_time)
+            result["order_id"] = order.order_id
+
+        if self.auto_settle:
+            self.settle(db)
+        return result
+
+    def top_levels(self, ticker: str, k: int = 5) -> dict:
+        """
+        L2 호가 요약: 매수/매도 각각 최우선 k개 가격대의 잔량 합계와 주문 수.
+        가격대별 합계는 등록/체결/취소 때마다 갱신되므로 호가창 깊이와 상관없이 O(k)입니다.
+        """
+        book = self.order_books.get(ticker)
+        if book is None:
+            return {"bids": [], "asks": []}
+        with self._lock(ticker):
+            bids, asks = book.bids.top_levels(k), book.asks.top_levels(k)
+        to_row = lambda lv: {"price": from_ticks(lv[0]), "volume": lv[1], "orders": lv[2]}
+        return {"bids": [to_row(lv) for lv in bids], "asks": [to_row(lv) for lv in asks]}
+
+    # --- 단일가 매매 (Call Auction) ---
+    def start_auction(self, ticker: str, until: datetime):
+        """until(시뮬레이션 시각)까지 해당 종목을 단일가 접수 모드로 바꿉니다. (이미 옥션 중이면 마감만 늦춤)"""
+        with self._lock(ticker):
+            self.auctions[ticker] = max(until, self.auctions.get(ticker, until))
+            if self.journal is not None:
+                self.journal.append(jr.encode_auction(ticker, self.auctions[ticker]))
+
+    def due_auctions(self, sim_time: datetime) -> list:
+        """마감 시각이 된 옥션 종목 목록"""
+        return [t for t, until in list(self.auctions.items()) if until <= sim_time]
+
+    def run_auction(self, db: Session, ticker: str, sim_time: datetime = None, reference_price: float = None):
+        """
+        단일가 체결: 체결량이 최대가 되는 가격 하나를 찾아, 그 가격에 교차하는 주문을 가격-시간 우선순위대로 전부 체결.
+        동률이면 매수/매도 잔량 차이가 작은 가격, 그래도 같으면 기준가(reference_price)에 가까운 가격.
+        """
+        with self._lock(ticker):
+            if self.auctions.pop(ticker, None) is not None and self.journal is not None:
+                self.journal.append(jr.encode_auction(ticker, None))
+            book = self._get_book(ticker)
+            price = self._uncross_price(book, to_ticks(reference_price) if reference_price else None)
+            result = self._match_orders(db, ticker, sim_time, price) if price is not None else \
+                     {"status": "PENDING", "msg": "단일가 체결 물량 없음", "fills": [], "filled_qty": 0}
+            result["auction_price"] = from_ticks(price) if price is not None else None
+
+            # 옥션 동안 모아둔 IOC/시장가 주문 중 남은 수량 취소
+            result["cancelled"] = sum(self._cancel_locked(oid) for oid in self.auction_ioc.pop(ticker, ()))
+
+        if self.auto_settle:
+            self.settle(db)
+        return result
+
+    @staticmethod
+    def _uncross_price(book: OrderBook, reference: int = None):
+        """가격대별 잔량 합계(total_qty)로 누적 수요/공급을 만들어 체결량 최대 가격(틱)을 고릅니다. O(L log L)"""
+        if not book.bids or not book.asks or book.bids.best_price() < book.asks.best_price():
+            return None
+        bid_prices = sorted(book.bids.levels)  # 오름차순
+        ask_prices = sorted(book.asks.levels)
+        # demand[i] = bid_prices[i] 이상 매수 잔량, supply[i] = ask_prices[i] 이하 매도 잔량
+        demand = list(itertools.accumulate(book.bids.levels[p].total_qty for p in reversed(bid_prices)))[::-1]
+        supply = list(itertools.accumulate(book.asks.levels[p].total_qty for p in ask_prices))
+        if reference is None:
+            reference = (book.bids.best_price() + book.asks.best_price()) // 2
+
+        best, best_rank = None, None
+        for price in sorted(set(bid_prices) | set(ask_prices)):
+            i = bisect.bisect_left(bid_prices, price)
+            j = bisect.bisect_right(ask_prices, price) - 1
+            buy_qty = demand[i] if i < len(demand) else 0
+            sell_qty = supply[j] if j >= 0 else 0
+            volume = min(buy_qty, sell_qty)
+            if volume <= 0:
+                continue
+            rank = (-volume, abs(buy_qty - sell_qty), abs(price - reference))
+            if best_rank is None or rank < best_rank:
+                best, best_rank = price, rank
+        return best
+
+    def load_agents(self, db: Session, agent_ids, refresh: bool = True) -> int:
+        """
+        에이전트 여러 명을 정산 장부에 한 번에 올립니다. (틱 시작 때 호출, 장부에 올라온 인원 반환)
+        refresh=False면 이미 올라온 에이전트는 다시 읽지 않음 (장부에 있기만 하면 되는 경우)
+        """
+        self.settlement.load(db, agent_ids, refresh=refresh)
+        return sum(1 for a in agent_ids if a in self.settlement.ledgers)
+
+    def settle(self, db: Session) -> int:
+        """메모리에 쌓인 체결분을 한 트랜잭션으로 DB에 반영합니다. (저장한 거래 건수 반환)"""
+        saved = self.settlement.flush(db)
+        if self.journal is not None:
+            self.journal.sync() # 틱 단위 그룹 커밋: 여기까지의 저널 레코드를 디스크에 확정
+        return saved
+
+    # --- 저널 (재시작 복구) ---
+    def attach_journal(self, journal: jr.OrderJournal, db: Session):
+        """
+        저널을 재생해 호가창/접수 순번을 복구한 뒤, 이후 변경분을 기록하도록 붙입니다.
+        마지막 정산 표시 뒤의 체결(DB에 못 들어간 것)은 정산 장부에 다시 넣어 다음 settle()에서 저장됩니다.
+        단, DB에 정산 순번(settled_seq)이 그보다 앞서 있으면(COMMIT 뒤 SETTLED 기록 전에 죽음) 그 순번까지는 건너뜀
+        반환값: 저널에 남은 마지막 시뮬레이션 시각 (없으면 None)
+        """
+        next_seq, unsettled, last_fill = 1, [], 0
+        for kind, rec in journal.replay():
+            if kind == jr.REST:
+                order = BookOrder(rec["seq"], rec["order_id"], self.agents.handle(rec["agent_id"]), rec["side"],
+                                  rec["price"], rec["quantity"], TimeInForce(rec["tif"]), rec["expire_at"],
+                                  rec["timestamp"], rec["market"])
+                self._rest(self._get_book(rec["ticker"]), order)
+                if order.tif == TimeInForce.IOC and rec["ticker"] in self.auctions:
+                    self.auction_ioc.setdefault(rec["ticker"], set()).add(order.order_id) # 옥션 마감 때 취소할 IOC/시장가
+                next_seq = max(next_seq, rec["seq"] + 1)
+            elif kind == jr.STOP:
+                self._index_stop(rec["ticker"], StopOrder(rec["seq"], rec["order_id"], rec["agent_id"], rec["side"], rec["trigger"],
+                                                          rec["price"], rec["quantity"], OrderType(rec["order_type"]),
+                                                          TimeInForce(rec["tif"]), rec["expire_at"], rec["rises"]))
+                next_seq = max(next_seq, rec["seq"] + 1)
+            elif kind == jr.AUCTION:
+                if rec["until"] is not None:
+                    self.auctions[rec["ticker"]] = rec["until"]
+                else:
+                    self.auctions.pop(rec["ticker"], None)
+                    self.auction_ioc.pop(rec["ticker"], None)
+            elif kind == jr.RESIZE:
+                entry = self.order_index.get(rec["order_id"])
+                if entry: entry[2].resize(entry[3], rec["quantity"])
+            elif kind == jr.REMOVE:
+                self._cancel_locked(rec["order_id"])
+            elif kind == jr.FILL:
+                unsettled.append(rec)
+                last_fill = max(last_fill, rec["seq"])
+            elif kind == jr.SETTLED:
+                unsettled = []
+                last_fill = max(last_fill, rec["seq"])
+            elif kind == jr.CLOCK:
+                self._journal_clock = rec["sim_time"]
+            elif kind == jr.META:
+                next_seq = max(next_seq, rec["next_seq"])
+
+        self._seq = itertools.count(next_seq)
+        settled = settled_seq(db)
+        self.settlement.fill_seq = settled
+        for f in unsettled:
+            if f["seq"] <= settled: continue # 이미 DB에 들어간 체결
+            self.settlement.apply_fill(db, f["ticker"], f["buyer_id"], f["seller_id"], f["price"], f["quantity"], f["timestamp"])
+        self.settlement.fill_seq = max(self.settlement.fill_seq, last_fill, settled) # 재시작 뒤 순번이 되돌아가지 않게
+
+        self.journal = journal.open()
+        self.settlement.journal = journal
+        return self._journal_clock
+
+    def journal_clock(self, sim_time: datetime):
+        """시뮬레이션 시계를 저널에 남깁니다. (매 틱)"""
+        self._journal_clock = sim_time
+        if self.journal is not None:
+            self.journal.append(jr.encode_clock(sim_time))
+
+    def snapshot(self):
+        """
+        현재 호가창 전체를 스냅샷으로 떠서 저널을 새로 시작합니다. (재시작 때 재생할 분량을 제한)
+        틱 사이(워커가 놀고 있을 때) 호출하는 것을 전제로, 모든 종목 잠금을 잡고 진행합니다.
+        """
+        if self.journal is None:
+            return
+        locks = [self._lock(t) for t in sorted(self.order_books)]
+        for lock in locks: lock.acquire()
+        try:
+            with self.settlement._lock:
+                self.journal.rotate(self._snapshot_records)
+        finally:
+            for lock in reversed(locks): lock.release()
+
+    def _snapshot_records(self, generation: int):
+        records = [jr.encode_meta(generation, next(self._seq))]
+        if self._journal_clock:
+            records.append(jr.encode_clock(self._journal_clock))
+        for ticker, until in self.auctions.items(): # 호가보다 먼저 → 재생 때 옥션 중 IOC가 다시 auction_ioc로 모임
+            records.append(jr.encode_auction(ticker, until))
+        for ticker, book in self.order_books.items():
+            for side in (book.bids, book.asks):
+                for order in side: # 가격대 우선순위 + 가격대 안 도착 순서 그대로 → 재생해도 같은 줄
+                    records.append(jr.encode_rest(ticker, self.agents.name(order.agent), order))
+        for ticker, order in sorted(self.stop_index.values(), key=lambda e: e[1].seq): # 발동 대기 조건부 주문 (접수 순)
+            records.append(jr.encode_stop(ticker, order))
+        for seq, t in self.settlement.pending_fills(): # 아직 DB에 못 들어간 체결
+            records.append(jr.encode_fill(seq, t["ticker"], t["buyer_id"], t["seller_id"], t["price"], t["quantity"], t["timestamp"]))
+        return records
+
+    def _match_orders(self, db: Session, ticker: str, sim_time: datetime = None, auction_price: int = None):
+        """
+        연속 매매: 교차하는 동안 체결. auction_price(틱)를 주면 단일가 체결 - 그 가격에 교차하는 주문만 전부 그 가격으로 체결.
+        옥션 접수 중인 종목은 (마감 전까지) 매칭하지 않습니다.
+        """
+        if auction_price is None and ticker in self.auctions:
+            return {"status": "PENDING", "msg": "단일가 접수 중 (마감 때 일괄 체결)", "fills": [], "filled_qty": 0}
         book = self.order_books[ticker]
         logs = []
+        fills = {} # 가격대별 체결 수량 (가격 -> 수량)
+        last_price = None
+        low = high = None # 이번 매칭에서 지나간 체결가 구간 (틱) → 조건부 주문 발동 검사용
         
         # 매칭 반복: (가장 비싼 매수 호가) >= (가장 싼 매도 호가) 일 때 거래 성사
-        while book['BUY'] and book['SELL']:
-            best_buy = book['BUY'][0]   # 최고가 매수 주문
-            best_sell = book['SELL'][0] # 최저가 매도 주문
-            
+        while book.bids and book.asks:
+            buy_level = book.bids.best_level()
+            sell_level = book.asks.best_level()
+
             # 가격이 안 맞으면 거래 안 됨 (스프레드 존재)
-            if best_buy['price'] < best_sell['price']:
+            if buy_level.price < sell_level.price:
+                break
+            if auction_price is not None and (buy_level.price < auction_price or sell_level.price > auction_price):
                 break
+
+            best_buy = buy_level.head()   # 최고가 매수 주문 (같은 가격이면 먼저 온 주문)
+            best_sell = sell_level.head() # 최저가 매도 주문
             
             # --- 거래 체결! ---
             # 체결 가격은 먼저 주문 낸 사람 기준(Maker) 혹은 중간값 등 규칙이 있지만,
             # 여기서는 '매도자가 부른 가격(체결 가능 최저가)'으로 즉시 체결시킴
-            trade_price = best_sell['price'] 
-            trade_qty = min(best_buy['quantity'], best_sell['quantity'])
+            # 단, 시장가 매도는 보호 한도 가격이 아니라 걸려 있던 매수 호가에 체결
+            # 단일가 체결이면 모든 체결이 같은 가격
+            if auction_price is not None:
+                trade_ticks = auction_price
+            else:
+                trade_ticks = best_buy.price if best_sell.market else best_sell.price
+            trade_price = from_ticks(trade_ticks)
+            low = trade_ticks if low is None else min(low, trade_ticks)
+            high = trade_ticks if high is None else max(high, trade_ticks)
+            trade_qty = min(best_buy.quantity, best_sell.quantity)
             
-            # DB 업데이트 (돈/주식 교환)
-            # [수정] sim_time 전달
+            # 장부 업데이트 (돈/주식 교환) - DB 저장은 settle()에서
             self._execute_trade(db, ticker, best_buy, best_sell, trade_price, trade_qty, sim_time)
+            last_price = trade_price
+            fills[trade_price] = fills.get(trade_price, 0) + trade_qty
             
             logs.append(f"✅ 체결! {trade_price}원 ({trade_qty}주)")
             
-            # 수량 차감 및 주문 삭제
-            best_buy['quantity'] -= trade_qty
-            best_sell['quantity'] -= trade_qty
+            # 수량 차감 및 주문 삭제 (가격대 잔량 합계도 같이 갱신)
+            self._resize(buy_level, best_buy, best_buy.quantity - trade_qty)
+            self._resize(sell_level, best_sell, best_sell.quantity - trade_qty)
             
-            if best_buy['quantity'] <= 0: book['BUY'].pop(0)
-            if best_sell['quantity'] <= 0: book['SELL'].pop(0)
+            if best_buy.quantity <= 0: self._forget(book.bids.pop_head())
+            if best_sell.quantity <= 0: self._forget(book.asks.pop_head())
 
+        fill_list = [{"price": p, "quantity": q} for p, q in fills.items()]
         if logs:
-            return {"status": "SUCCESS", "msg": ", ".join(logs)}
+            result = {"status": "SUCCESS", "msg": ", ".join(logs), "trades": len(logs), "last_price": last_price,
+                      "fills": fill_list, "filled_qty": sum(fills.values())}
+            # 체결가가 움직였으니 그 구간에 걸린 조건부 주문 발동
+            self.last_trade[ticker] = to_ticks(last_price)
+            self._note_trades(ticker, low, high)
+            result["triggered"] = self._fire_triggers(db, ticker, sim_time)
+            return result
         else:
-            return {"status": "PENDING", "msg": "주문 접수됨 (체결 대기 중)"}
+            return {"status": "PENDING", "msg": "주문 접수됨 (체결 대기 중)", "fills": [], "filled_qty": 0}
 
-    def _execute_trade(self, db: Session, ticker, buy_order, sell_order, price, qty, sim_time=None):
-        # 구매자/판매자 DB 로드
-        buyer = db.query(DBAgent).filter(DBAgent.agent_id == buy_order['agent_id']).first()
-        seller = db.query(DBAgent).filter(DBAgent.agent_id == sell_order['agent_id']).first()
-        company = db.query(DBCompany).filter(DBCompany.ticker == ticker).first()
-        
-        if not buyer or not seller: return # 에러 방지
-        
-        total_amt = price * qty
-        
-        # 1. 구매자 처리 (돈 차감, 주식 증가)
-        if buyer.cash_balance >= total_amt:
-            buyer.cash_balance -= total_amt
-            port = dict(buyer.portfolio)
-            port[ticker] = port.get(ticker, 0) + qty
-            buyer.portfolio = port
-            
-        # 2. 판매자 처리 (돈 증가, 주식 차감)
-        # (판매자는 이미 호가창 올릴 때 주식 있다고 가정하지만 한번 더 체크)
-        if seller.portfolio.get(ticker, 0) >= qty:
-            seller.cash_balance += total_amt
-            port = dict(seller.portfolio)
-            port[ticker] -= qty
-            if port[ticker] <= 0: del port[ticker]
-            seller.portfolio = port
-            
-        # 3. 주가 업데이트 (현재가 = 최근 체결가)
-        company.current_price = float(price)
-        
-        # 4. 거래 기록
-        trade = DBTrade(
-            ticker=ticker, price=price, quantity=qty,
-            buyer_id=buyer.agent_id, seller_id=seller.agent_id,
-            timestamp=sim_time or datetime.now()
-        )
-        db.add(trade)
-        db.commit()
\ No newline at end of file
+    def _execute_trade(self, db: Session, ticker, buy_order: BookOrder, sell_order: BookOrder, price, qty, sim_time=None):
+        # 구매자/판매자 장부에 반영 (DB 쓰기는 settle()에서 한꺼번에)
+        self.settlement.apply_fill(db, ticker, self.agents.name(buy_order.agent), self.agents.name(sell_order.agent), price, qty, sim_time)
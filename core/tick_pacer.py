@@ -0,0 +1,99 @@
+import os
+import threading
+
+# ------------------------------------------------------------------
+# 틱 속도 조절기 (Adaptive Tick Pacing)
+# - 목표: 실제 1초당 가상 N분 (1틱 = 가상 1분 → 틱 주기 = 1/N초)
+# - 매 틱 측정값(틱 처리 시간, 이벤트 루프 지연, LLM 적체)을 보고
+#   · 쉬는 시간 = 틱 주기 - 처리 시간 - 지난번 늦게 깨어난 만큼
+#   · 이번 틱에 움직일 에이전트 수 = 과부하면 곱으로 줄이고(×0.8), 여유 있으면 조금씩(+2) 늘림 (AIMD)
+#   → 예전처럼 "30명 → 5명", "1초 → 3~5초"를 손으로 고치지 않아도 목표 속도에 맞춰짐
+#   (시작값은 예전에 손으로 맞춘 5명 - 처음 몇 틱부터 과부하로 시작하지 않게, 여유 있으면 알아서 늘림)
+# - 비동기 파이프라인 모드(ASYNC_DECISIONS)에서는 "틱당 실행할 쌓인 결정 수" 예산으로 씀
+# - 목표 속도/에이전트 범위는 관리자 API로 실행 중에 바꿀 수 있음
+# ------------------------------------------------------------------
+
+SIM_MINUTES_PER_SEC = float(os.getenv("SIM_MINUTES_PER_SEC", 1.0))   # 목표 속도 (실제 1초당 가상 분)
+PACER_INITIAL_AGENTS = int(os.getenv("PACER_INITIAL_AGENTS", 5))     # 틱당 움직이는 에이전트 수 시작값
+PACER_MIN_AGENTS = int(os.getenv("PACER_MIN_AGENTS", 5))
+PACER_MAX_AGENTS = int(os.getenv("PACER_MAX_AGENTS", 100))
+PACER_HIGH_LOAD = 0.8      # 틱 처리 시간이 주기의 이 비율을 넘으면 과부하
+PACER_LOW_LOAD = 0.5       # 이 비율 아래면 여유 → 에이전트를 늘림
+PACER_MAX_LAG_SEC = 0.2    # 이벤트 루프가 이만큼 늦게 깨어나면 과부하 (API 응답도 같이 밀리고 있다는 뜻)
+PACER_DECREASE = 0.8
+PACER_INCREASE = 2
+PACER_EMA_ALPHA = 0.3      # 측정값 평활 (튀는 틱 하나에 휘둘리지 않게)
+
+
+class TickPacer:
+    def __init__(self, rate: float = SIM_MINUTES_PER_SEC, agents: int = PACER_INITIAL_AGENTS,
+                 min_agents: int = PACER_MIN_AGENTS, max_agents: int = PACER_MAX_AGENTS):
+        self.rate = rate
+        self.min_agents = min_agents
+        self.max_agents = max_agents
+        self.agents = max(min_agents, min(max_agents, agents))
+        self.tick_sec = None   # 틱 처리 시간 EMA
+        self.loop_sec = None   # 실제 틱 간격(처리 + 쉼) EMA → 달성 속도
+        self.lag_sec = 0.0     # 마지막으로 측정한 이벤트 루프 지연
+        self.backlog = 0       # 마지막 틱의 LLM 적체 (마감 초과 + 429 + 파이프라인 대기 결정)
+        self.overloaded = False
+        self._lock = threading.Lock() # 관리자 API(스레드풀)에서 설정을 바꿈
+
+    @property
+    def period(self) -> float:
+        """목표 틱 주기 (초)"""
+        return 1.0 / self.rate
+
+    def configure(self, rate: float = None, min_agents: int = None, max_agents: int = None):
+        """실행 중에 목표 속도/에이전트 범위를 바꿉니다. (다음 틱부터 적용)"""
+        if rate is not None and rate <= 0:
+            raise ValueError("rate는 0보다 커야 합니다.")
+        lo = self.min_agents if min_agents is None else min_agents
+        hi = self.max_agents if max_agents is None else max_agents
+        if lo < 1 or hi < lo:
+            raise ValueError("에이전트 범위가 잘못되었습니다. (1 <= min_agents <= max_agents)")
+        with self._lock:
+            if rate is not None: self.rate = rate
+            self.min_agents, self.max_agents = lo, hi
+            self.agents = max(lo, min(hi, self.agents))
+
+    def observe(self, tick_sec: float, lag_sec: float = 0.0, backlog: int = 0) -> float:
+        """
+        틱 하나가 끝난 뒤 호출: 측정값으로 에이전트 수를 조정하고, 다음 틱까지 쉴 시간(초)을 돌려줍니다.
+        tick_sec: run_tick 처리 시간 / lag_sec: 지난번 sleep이 요청보다 늦게 깨어난 시간 / backlog: LLM 적체 수
+        """
+        with self._lock:
+            ema = lambda prev, x: x if prev is None else prev + PACER_EMA_ALPHA * (x - prev)
+            self.tick_sec = ema(self.tick_sec, tick_sec)
+            self.lag_sec = lag_sec
+            self.backlog = backlog
+            period = self.period
+
+            self.overloaded = self.tick_sec > period * PACER_HIGH_LOAD or lag_sec > PACER_MAX_LAG_SEC or backlog > 0
+            if self.overloaded:
+                self.agents = max(self.min_agents, int(self.agents * PACER_DECREASE))
+            elif self.tick_sec < period * PACER_LOW_LOAD:
+                self.agents = min(self.max_agents, self.agents + PACER_INCREASE)
+            # 늦게 깨어난 만큼은 다음 쉼에서 빼서 평균 속도를 맞춤
+            return max(0.0, period - tick_sec - lag_sec)
+
+    def record_interval(self, interval_sec: float):
+        """틱 시작 사이의 실제 간격 (달성 속도 계산용)"""
+        with self._lock:
+            self.loop_sec = interval_sec if self.loop_sec is None else self.loop_sec + PACER_EMA_ALPHA * (interval_sec - self.loop_sec)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "target_sim_minutes_per_sec": self.rate,
+                "achieved_sim_minutes_per_sec": round(1.0 / self.loop_sec, 3) if self.loop_sec else None,
+                "period_ms": round(self.period * 1000, 1),
+                "tick_ms": round(self.tick_sec * 1000, 1) if self.tick_sec is not None else None,
+                "loop_lag_ms": round(self.lag_sec * 1000, 1),
+                "llm_backlog": self.backlog,
+                "overloaded": self.overloaded,
+                "agents": self.agents, "min_agents": self.min_agents, "max_agents": self.max_agents,
+            }
+
+
+tick_pacer = TickPacer()
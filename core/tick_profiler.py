@@ -0,0 +1,195 @@
+import os
+import io
+import time
+import pstats
+import cProfile
+import tempfile
+import threading
+import contextlib
+import contextvars
+from collections import deque
+from datetime import datetime
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:
+    PyinstrumentProfiler = None # 선택 설치 (없으면 cProfile만)
+
+# ------------------------------------------------------------------
+# 틱 단계별 프로파일러 (Tick Profiler)
+# - 단계(phase)마다 실제 소요 시간, DB 쿼리 수(SQLAlchemy 커서 이벤트), LLM 호출 수/지연을 기록
+# - 최근 N틱을 굴러가는 창(rolling window)에 모아 p50/p95/p99를 계산 → 관리자 API로 노출
+# - 지금 어떤 단계인지는 contextvar로 전달: 동시에 도는 에이전트 태스크/종목 워커 스레드도 각자 단계로 집계
+#   (단계는 겹칠 수 있음: 바깥 단계는 벽시계 시간, 동시 태스크 안의 단계는 태스크 시간의 합)
+# - 요청하면 다음 N틱 동안 cProfile(또는 pyinstrument) 트레이스를 떠서 파일로 저장
+# ------------------------------------------------------------------
+
+TICK_PROFILE = os.getenv("TICK_PROFILE", "1") == "1"                    # 0이면 단계 기록을 끔
+TICK_PROFILE_WINDOW = int(os.getenv("TICK_PROFILE_WINDOW", 600))        # 백분위를 계산할 최근 틱 수 (가상 10시간)
+TICK_TRACE_DIR = os.getenv("TICK_TRACE_DIR", tempfile.gettempdir())     # 트레이스 파일 저장 폴더
+TRACE_TOP_FUNCTIONS = 30                                                # 트레이스 요약에 보여줄 함수 수
+
+_phase = contextvars.ContextVar("tick_phase", default="other")
+
+
+class RollingHistogram:
+    """최근 window개 값만 들고 있다가 요청할 때 정렬해서 백분위를 계산 (틱당 1번 쌓이므로 충분히 쌈)"""
+    __slots__ = ("values",)
+
+    def __init__(self, window: int):
+        self.values = deque(maxlen=window)
+
+    def add(self, value: float):
+        self.values.append(value)
+
+    def summary(self) -> dict:
+        if not self.values:
+            return {"count": 0}
+        ordered = sorted(self.values)
+        n = len(ordered)
+        pick = lambda q: ordered[min(n - 1, int(q * n))]
+        return {"count": n, "mean": round(sum(ordered) / n, 3), "p50": round(pick(0.50), 3),
+                "p95": round(pick(0.95), 3), "p99": round(pick(0.99), 3), "max": round(ordered[-1], 3)}
+
+
+class TickProfiler:
+    def __init__(self, window: int = TICK_PROFILE_WINDOW, enabled: bool = TICK_PROFILE):
+        self.window = window
+        self.enabled = enabled
+        self.histograms = {} # 이름 -> RollingHistogram (phase.*_ms / db.* / llm.* / tick_ms)
+        self.ticks = 0
+        self.last_tick = {}  # 마지막 틱의 원시 값 (관리자 API용)
+        self._lock = threading.Lock() # 종목 워커 스레드에서도 기록함
+        self._phase_ms = {}
+        self._queries = {}
+        self._tick_started = None
+        self._attached = set()
+        # 트레이스 (다음 N틱)
+        self._trace_pending = None # (틱 수, 도구)
+        self._trace = None         # (프로파일러, 도구, 남은 틱, 전체 틱)
+        self.last_trace = None
+
+    # ---------------- 기록 ----------------
+    def attach_db(self, engine):
+        """SQLAlchemy 엔진의 커서 실행마다 현재 단계의 쿼리 수를 1 올립니다. (엔진당 한 번)"""
+        from sqlalchemy import event
+        if id(engine) in self._attached: return
+        self._attached.add(id(engine))
+        event.listen(engine, "before_cursor_execute", self._on_query)
+
+    def _on_query(self, conn, cursor, statement, parameters, context, executemany):
+        if not self.enabled: return
+        name = _phase.get()
+        with self._lock:
+            self._queries[name] = self._queries.get(name, 0) + 1
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """이 블록 안의 시간과 DB 쿼리를 name 단계로 집계합니다. (async 함수 안에서 await를 감싸도 됨)"""
+        if not self.enabled:
+            yield
+            return
+        token = _phase.set(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            _phase.reset(token)
+            with self._lock:
+                self._phase_ms[name] = self._phase_ms.get(name, 0.0) + elapsed
+
+    def observe(self, name: str, value: float):
+        """틱과 상관없는 개별 관측값 (예: LLM 호출 1번의 지연 ms)"""
+        if not self.enabled: return
+        with self._lock:
+            self._histogram(name).add(value)
+
+    def _histogram(self, name: str) -> RollingHistogram:
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = RollingHistogram(self.window)
+        return hist
+
+    def start_tick(self):
+        with self._lock:
+            self._phase_ms = {}
+            self._queries = {}
+        self._tick_started = time.perf_counter()
+        self._start_trace()
+
+    def end_tick(self, counts: dict = None):
+        """틱 끝: 단계 시간/쿼리 수/추가 카운트(counts, 예: LLM 호출 수)를 히스토그램에 넣습니다."""
+        self._finish_trace_tick()
+        if not self.enabled or self._tick_started is None: return
+        total = (time.perf_counter() - self._tick_started) * 1000
+        with self._lock:
+            phase_ms, queries = self._phase_ms, self._queries
+            self._phase_ms, self._queries = {}, {}
+            self._histogram("tick_ms").add(total)
+            for name, ms in phase_ms.items():
+                self._histogram(f"phase.{name}_ms").add(ms)
+            for name, n in queries.items():
+                self._histogram(f"db.{name}").add(n)
+            self._histogram("db.total").add(sum(queries.values()))
+            for name, value in (counts or {}).items():
+                self._histogram(name).add(value)
+            self.ticks += 1
+            self.last_tick = {"tick_ms": round(total, 3), "phase_ms": {k: round(v, 3) for k, v in phase_ms.items()},
+                              "db_queries": queries, **(counts or {})}
+        self._tick_started = None
+
+    def summary(self) -> dict:
+        with self._lock:
+            histograms = {name: hist.summary() for name, hist in sorted(self.histograms.items())}
+            last_tick = dict(self.last_tick)
+        return {"enabled": self.enabled, "ticks": self.ticks, "window": self.window,
+                "last_tick": last_tick, "histograms": histograms,
+                "trace": {"pending": self._trace_pending, "remaining_ticks": self._trace[2] if self._trace else 0}}
+
+    # ---------------- 트레이스 ----------------
+    def request_trace(self, ticks: int, tool: str = "cprofile"):
+        """다음 틱부터 ticks틱 동안 트레이스를 뜹니다. (tool: cprofile | pyinstrument)"""
+        if ticks < 1:
+            raise ValueError("ticks는 1 이상이어야 합니다.")
+        if tool not in ("cprofile", "pyinstrument"):
+            raise ValueError(f"지원하지 않는 프로파일러: {tool}")
+        if tool == "pyinstrument" and PyinstrumentProfiler is None:
+            raise ValueError("pyinstrument가 설치되어 있지 않습니다. (pip install pyinstrument)")
+        if self._trace is not None or self._trace_pending is not None:
+            raise ValueError("이미 트레이스가 예약/진행 중입니다.")
+        self._trace_pending = (ticks, tool)
+
+    def _start_trace(self):
+        if self._trace_pending is None or self._trace is not None: return
+        ticks, tool = self._trace_pending
+        self._trace_pending = None
+        profiler = cProfile.Profile() if tool == "cprofile" else PyinstrumentProfiler(async_mode="disabled")
+        if tool == "cprofile": profiler.enable()
+        else: profiler.start()
+        self._trace = [profiler, tool, ticks, ticks]
+
+    def _finish_trace_tick(self):
+        if self._trace is None: return
+        self._trace[2] -= 1
+        if self._trace[2] > 0: return
+        profiler, tool, _, ticks = self._trace
+        self._trace = None
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if tool == "cprofile":
+            profiler.disable()
+            path = os.path.join(TICK_TRACE_DIR, f"tick_trace_{stamp}.prof")
+            profiler.dump_stats(path)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(TRACE_TOP_FUNCTIONS)
+            report = out.getvalue()
+        else:
+            profiler.stop()
+            path = os.path.join(TICK_TRACE_DIR, f"tick_trace_{stamp}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            report = profiler.output_text(unicode=True)
+        self.last_trace = {"tool": tool, "ticks": ticks, "path": path, "finished_at": stamp, "report": report}
+
+
+tick_profiler = TickProfiler()
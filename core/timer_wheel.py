@@ -0,0 +1,51 @@
+import threading
+from datetime import datetime
+
+# ------------------------------------------------------------------
+# 해시드 타이머 휠 (Hashed Timer Wheel)
+# - 시뮬레이션 시간 1분 = 1칸. 만료 시각의 분(minute) % 칸 수 로 버킷을 정함
+# - advance(now)는 지난번 이후 지나간 칸만 훑으므로, 매 틱 '실제로 만료되는 주문'만 건드림
+# - 한 바퀴(slots분)보다 먼 만료는 같은 칸에 남아 있다가 시각이 되었을 때 꺼내짐
+# ------------------------------------------------------------------
+
+class TimerWheel:
+    def __init__(self, slots: int = 1024):
+        self.slots = [dict() for _ in range(slots)]  # 각 칸: key -> 만료 분(minute)
+        self.current = None # 마지막으로 처리한 분
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _minute(when: datetime) -> int:
+        return int(when.timestamp() // 60)
+
+    def schedule(self, key, when: datetime):
+        minute = self._minute(when)
+        with self._lock:
+            if self.current is not None and minute <= self.current:
+                minute = self.current + 1 # 이미 지난 시각이면 다음 advance에서 바로 만료
+            self.slots[minute % len(self.slots)][key] = minute
+
+    def cancel(self, key, when: datetime):
+        minute = self._minute(when)
+        with self._lock:
+            if self.current is not None and minute <= self.current:
+                minute = self.current + 1
+            self.slots[minute % len(self.slots)].pop(key, None)
+
+    def advance(self, now: datetime) -> list:
+        """now까지 만료된 key 목록을 꺼내 돌려줍니다."""
+        now_minute = self._minute(now)
+        expired = []
+        with self._lock:
+            if self.current is None:
+                self.current = now_minute - len(self.slots) # 첫 호출이면 모든 칸을 한 번 훑음
+            # 한 바퀴 이상 건너뛰면(장 마감 후 다음날 점프 등) 모든 칸을 한 번씩만 훑으면 충분
+            start = max(self.current + 1, now_minute - len(self.slots) + 1)
+            for minute in range(start, now_minute + 1):
+                bucket = self.slots[minute % len(self.slots)]
+                due = [k for k, m in bucket.items() if m <= now_minute]
+                for k in due:
+                    del bucket[k]
+                expired.extend(due)
+            self.current = max(self.current, now_minute)
+        return expired
@@ -0,0 +1,140 @@
+import numpy as np
+from core.agent_society_brain import get_agent_persona
+from core.market_context import MarketContext
+
+# ------------------------------------------------------------------
+# 벡터화된 규칙 기반 군중 (Vectorized Crowd)
+# - LLM을 안 쓰는 대다수 에이전트의 심리(안전/사회/공포/탐욕), 현금, 보유량, 평단을 NumPy 배열로 보관
+# - 매 틱 종목별 공용 시장 정보(MarketContext)로 전원의 매수/매도 의도·가격·수량을 배열 연산 한 번에 계산
+#   (core/offline_policy.offline_think와 같은 규칙을 벡터로 옮긴 것 + 호재/악재 반응)
+# - LLM 인지는 소수 표본에만 쓰고 나머지는 여기서 → 틱당 5만 명 이상도 시뮬레이션 가능
+# ------------------------------------------------------------------
+
+VALUE, INSTITUTION, CONTRARIAN, SPECULATOR = 0, 1, 2, 3
+PSYCH_FIELDS = ("safety_needs", "social_needs", "fear_index", "greed_index")
+NEWS_BIAS = 2.0 # 호재/악재 뉴스가 매수 성향에 더하는 값
+
+def _persona_code(agent_id: str) -> int:
+    agent_type = get_agent_persona(agent_id)[0]
+    if "Value" in agent_type: return VALUE
+    if "Institutional" in agent_type: return INSTITUTION
+    if "Contrarian" in agent_type: return CONTRARIAN
+    return SPECULATOR
+
+def _trend_score(label: str) -> int:
+    if "급등" in label: return 2
+    if "상승" in label: return 1
+    if "급락" in label: return -2
+    if "하락" in label: return -1
+    return 0
+
+
+class CrowdOrders:
+    """한 틱 동안 군중이 낼 주문 묶음 (행 하나 = 주문 하나)"""
+    __slots__ = ("agent", "ticker", "buy", "quantity", "price")
+
+    def __init__(self, agent, ticker, buy, quantity, price):
+        self.agent = agent       # 에이전트 행 번호
+        self.ticker = ticker     # 종목 열 번호
+        self.buy = buy           # True면 매수
+        self.quantity = quantity
+        self.price = price       # 지정가 (정수 원)
+
+    def __len__(self):
+        return len(self.agent)
+
+
+class VectorPopulation:
+    def __init__(self, agent_ids: list, tickers: list, rng: np.random.Generator = None):
+        self.agent_ids = list(agent_ids)
+        self.row_of = {a: i for i, a in enumerate(self.agent_ids)}
+        self.tickers = list(tickers)
+        self.rng = rng or np.random.default_rng()
+        n, m = len(self.agent_ids), len(self.tickers)
+        self.persona = np.array([_persona_code(a) for a in self.agent_ids], dtype=np.int8)
+        self.psych = np.full((n, len(PSYCH_FIELDS)), 0.5)
+        self.psych[:, 2:] = 0.0 # 공포/탐욕 기본값 (AgentState와 동일)
+        self.cash = np.zeros(n)
+        self.positions = np.zeros((n, m), dtype=np.int64)
+        self.avg_price = np.zeros((n, m))
+
+    def refresh(self, ledger, agent_rows=None):
+        """
+        정산 장부(SettlementBatch)에서 현금/보유량/심리를 배열로 옮깁니다. (틱 시작 때, 장부는 load_agents로 미리 올려둠)
+        agent_rows: 새로 읽을 행 번호 목록 (None이면 전원)
+        """
+        col = {t: j for j, t in enumerate(self.tickers)}
+        rows = range(len(self.agent_ids)) if agent_rows is None else agent_rows
+        for i in rows:
+            view = ledger.view(self.agent_ids[i])
+            if view is None: continue
+            cash, portfolio, psychology = view
+            self.cash[i] = cash
+            self.positions[i] = 0
+            self.avg_price[i] = 0
+            for ticker, qty in portfolio.items():
+                j = col.get(ticker)
+                if j is None: continue
+                self.positions[i, j] = qty
+                self.avg_price[i, j] = psychology.get(f"avg_price_{ticker}", 0) or 0
+            for k, field in enumerate(PSYCH_FIELDS):
+                value = psychology.get(field)
+                if value is not None: self.psych[i, k] = value
+
+    def refresh_changed(self, ledger):
+        """지난 틱에 체결이 난 에이전트 행만 다시 읽습니다. (전원 재로딩 없이 배열 동기화)"""
+        rows = [self.row_of[a] for a in ledger.take_changed() if a in self.row_of]
+        if rows: self.refresh(ledger, rows)
+        return len(rows)
+
+    def decide(self, market: MarketContext, participation: float, exclude=()) -> CrowdOrders:
+        """
+        이번 틱에 참여하는 에이전트(확률 participation)의 주문을 배열 연산으로 한 번에 계산합니다.
+        exclude: 이번 틱에 LLM으로 따로 생각하는 에이전트 id (군중 주문에서 뺌)
+        """
+        rng = self.rng
+        n, m = len(self.agent_ids), len(self.tickers)
+        ctxs = [market.get(t) for t in self.tickers]
+        price = np.array([c.price if c else 0.0 for c in ctxs])
+        trend = np.array([_trend_score(c.trend) if c else 0 for c in ctxs], dtype=np.float64)
+        news = np.array([(NEWS_BIAS if c.is_good_news else -NEWS_BIAS if c.is_bad_news else 0.0) if c else 0.0 for c in ctxs])
+
+        active = rng.random(n) < participation
+        skip = [self.row_of[a] for a in exclude if a in self.row_of]
+        if skip: active[skip] = False
+        agents = np.flatnonzero(active)
+        cols = rng.integers(0, m, size=len(agents))
+        p = price[cols]
+        live = p > 0
+        agents, cols, p = agents[live], cols[live], p[live]
+
+        qty_held = self.positions[agents, cols]
+        avg = self.avg_price[agents, cols]
+        roi = np.where((qty_held > 0) & (avg > 0), (p - avg) / np.where(avg > 0, avg, 1), 0.0)
+
+        # 성향별 편향: 투기꾼은 추세 추종, 역발상은 반대, 가치/기관은 수익률 기준 (익절/물타기)
+        persona = self.persona[agents]
+        t = trend[cols]
+        bias = np.select([persona == SPECULATOR, persona == CONTRARIAN],
+                         [t, -t],
+                         np.where(roi > 0.05, -1.0, np.where(roi < -0.05, 1.0, 0.0)))
+        bias += self.psych[agents, 3] - self.psych[agents, 2] + news[cols]
+
+        buy_prob = np.clip(0.5 + 0.15 * bias, 0.1, 0.9)
+        buy = (rng.random(len(agents)) < buy_prob) | (qty_held <= 0)
+
+        buy_qty = np.floor(self.cash[agents] * 0.1 / p * rng.random(len(agents)))   # 현금의 최대 10%
+        sell_qty = np.floor(qty_held * rng.uniform(0.1, 0.5, len(agents)))
+        quantity = np.where(buy, buy_qty, np.maximum(sell_qty, np.minimum(qty_held, 1))).astype(np.int64)
+        limit = (p * rng.uniform(0.99, 1.01, len(agents))).astype(np.int64)
+
+        keep = (quantity > 0) & (limit > 0)
+        return CrowdOrders(agents[keep], cols[keep], buy[keep], quantity[keep], limit[keep])
+
+    def by_ticker(self, orders: CrowdOrders) -> dict:
+        """{ticker: [(agent_id, side, quantity, price), ...]} - 종목 워커에 한 번에 넘기기 위한 묶음"""
+        grouped = {}
+        for i, j, b, q, px in zip(orders.agent.tolist(), orders.ticker.tolist(), orders.buy.tolist(),
+                                   orders.quantity.tolist(), orders.price.tolist()):
+            grouped.setdefault(self.tickers[j], []).append((self.agent_ids[i], "BUY" if b else "SELL", q, px))
+        return grouped
@@ -2,7 +2,7 @@ import os
 from datetime import datetime
 from dotenv import load_dotenv
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON, text
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Float, DateTime, JSON, text
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 # 1. 환경변수 및 엔진 설정
@@ -88,6 +88,14 @@ class DBDiscussion(Base):
     sentiment = Column(String)
     created_at = Column(DateTime, default=datetime.now)
 
+class DBSimClock(Base):
+    """시뮬레이션 가상 시계 하트비트 (행 1개: 시뮬레이션이 다른 프로세스에서 돌 때 API가 읽음)"""
+    __tablename__ = "sim_clock"
+    id = Column(Integer, primary_key=True)
+    sim_time = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.now)
+    settled_seq = Column(BigInteger, default=0) # DB에 정산 완료된 마지막 저널 체결 순번 (정산과 같은 트랜잭션으로 갱신)
+
 # ==========================================
 # 📂 2. 진호 님 시스템 모델 (aiosqlite 대체!)
 # ==========================================
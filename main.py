@@ -6,7 +6,6 @@ import asyncio
 from datetime import datetime
 from pydantic import BaseModel
 from urllib.parse import unquote
-from collections import defaultdict
 from sqlalchemy import or_, text
 from sqlalchemy.orm import Session
 import os
@@ -19,8 +18,9 @@ from database import engine as db_engine, init_db, SessionLocal, get_db, DBCompa
 # 모듈 자체를 import하고, 엔진 이름은 sim_engine으로 바꿉니다.
 import main_simulation
 from main_simulation import market_engine as sim_engine, run_simulation_loop
+from core.sim_clock import SIM_MODE
 
-from routers import trade, social, news
+from routers import trade, social, news, admin
 from team_api import router as team_router
 from core.mentor_brain import chat_with_mentor
 
@@ -157,6 +157,9 @@ async def lifespan(app: FastAPI):
                 conn.execute(text("ALTER TABLE news ADD COLUMN IF NOT EXISTS impact_score INTEGER"))
                 conn.execute(text("ALTER TABLE news ADD COLUMN IF NOT EXISTS source VARCHAR(100)"))
                 conn.execute(text("ALTER TABLE news ADD COLUMN IF NOT EXISTS published_at TIMESTAMP"))
+
+                # 3. sim_clock 테이블: 저널 재생 때 이미 정산된 체결을 건너뛰기 위한 순번
+                conn.execute(text("ALTER TABLE sim_clock ADD COLUMN IF NOT EXISTS settled_seq BIGINT DEFAULT 0"))
                 
                 conn.commit()
                 print("🛠️ [강제 수리] news 테이블의 누락된 모든 컬럼을 완벽하게 생성했습니다!")
@@ -165,9 +168,13 @@ async def lifespan(app: FastAPI):
     seed_database() 
     
     # 이제 main_simulation 모듈을 정상적으로 인식합니다.
-    main_simulation.running = True
-    asyncio.create_task(run_simulation_loop())
-    print("🚀 [시스템] 시뮬레이션과 서버가 정상 가동됩니다!")
+    # SIM_MODE=external이면 시뮬레이션은 별도 프로세스(scripts/sharded_simulation.py)가 돌리고 여기서는 API만 띄움
+    if SIM_MODE == "external":
+        print("🚀 [시스템] 서버만 가동합니다! (시뮬레이션은 외부 프로세스, 시계는 DB 하트비트)")
+    else:
+        main_simulation.running = True
+        asyncio.create_task(run_simulation_loop())
+        print("🚀 [시스템] 시뮬레이션과 서버가 정상 가동됩니다!")
     
     yield 
 
@@ -188,6 +195,7 @@ app.add_middleware(
 app.include_router(trade.router)
 app.include_router(social.router, prefix="/api/social", tags=["Social & Ranking"])
 app.include_router(news.router)
+app.include_router(admin.router)
 app.include_router(team_router, prefix="/team", tags=["Team API"])
 
 @app.get("/api/market-data")
@@ -341,18 +349,10 @@ async def get_stock_orderbook(ticker: str, db: Session = Depends(get_db)):
 
     actual_ticker = company.ticker
     current_price = int(company.current_price)
-    book = sim_engine.order_books.get(actual_ticker, {"SELL": [], "BUY": []})
-
-    ask_summary = defaultdict(int)
-    for o in book.get("SELL", []):
-        ask_summary[int(o["price"])] += o["quantity"]
-        
-    bid_summary = defaultdict(int)
-    for o in book.get("BUY", []):
-        bid_summary[int(o["price"])] += o["quantity"]
-
-    asks = [{"price": p, "volume": v} for p, v in sorted(ask_summary.items())][:5]
-    bids = [{"price": p, "volume": v} for p, v in sorted(bid_summary.items(), reverse=True)][:5]
+    # 엔진이 가격대별 잔량을 실시간으로 집계해 두므로 상위 5호가만 바로 꺼냅니다.
+    depth = sim_engine.top_levels(actual_ticker, 5)
+    asks = [{"price": lv["price"], "volume": lv["volume"]} for lv in depth["asks"]]
+    bids = [{"price": lv["price"], "volume": lv["volume"]} for lv in depth["bids"]]
 
     return {
         "ticker": actual_ticker, "current_price": current_price, "asks": asks, "bids": bids
@@ -4,11 +4,24 @@ import random
 from datetime import datetime, timedelta 
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, asc
-from database import SessionLocal, DBAgent, DBNews, DBCompany, DBTrade, DBDiscussion
+from database import engine as db_engine, SessionLocal, DBAgent, DBNews, DBCompany, DBTrade, DBDiscussion
 from core.team_market_engine import MarketEngine
-from community_manager import post_comment 
-from models.domain_models import Order, OrderSide, OrderType, AgentState
-from core.agent_society_brain import agent_society_think
+from core.matching_workers import TickerWorkerPool
+from core.journal import OrderJournal
+from core.market_context import MarketContext
+from core.sim_clock import sim_clock
+from community_manager import compose_comment
+from models.domain_models import OrderSide, OrderType, TimeInForce, AgentState
+from core.agent_society_brain import agent_society_think, BatchedSocietyThinker, finalize_decision, get_agent_persona
+from core.offline_policy import offline_think
+from core.llm_scheduler import LLMScheduler
+from core.decision_pipeline import DecisionPipeline
+from core.decision_cache import DecisionCache, decision_key
+from core.vector_population import VectorPopulation
+from core.tick_profiler import tick_profiler
+from core.tick_pacer import tick_pacer
+from core.agent_random import agent_random
+import numpy as np
 import os
 
 # ------------------------------------------------------------------
@@ -21,7 +34,47 @@ logger = logging.getLogger("GlobalMarket")
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("httpcore").setLevel(logging.WARNING)
 
-market_engine = MarketEngine()
+# 체결은 메모리 장부에 모아두었다가 틱이 끝날 때 한 번에 DB에 정산합니다.
+market_engine = MarketEngine(auto_settle=False)
+# 에이전트 인메모리 테이블 (현금/보유 주식/심리): 틱 시작 때 한 번에 불러오고, 틱 끝 정산 때 바뀐 행만 일괄 저장
+ledger = market_engine.settlement
+# AI 주문이 체결 안 되고 남으면 이 시간(시뮬레이션 분)이 지나면 자동 취소됩니다.
+AI_ORDER_TTL_MINUTES = 30
+# 종목별 매칭 워커: 에이전트 주문은 여기로 보내면 종목끼리 병렬로, 이벤트 루프 밖(스레드)에서 매칭됩니다.
+matching_pool = TickerWorkerPool(market_engine)
+# 주문/체결 저널 폴더 (설정하면 재시작 때 호가창과 가상 시계를 복구) / 스냅샷 주기 (틱)
+JOURNAL_DIR = os.getenv("MARKET_JOURNAL_DIR")
+SNAPSHOT_EVERY_TICKS = 60
+# 단일가 매매 구간 (시뮬레이션 분): 09:00 장 시작, 그리고 충격 뉴스(impact_score >= 80) 직후
+OPEN_AUCTION_MINUTES = 3
+NEWS_AUCTION_MINUTES = 2
+NEWS_AUCTION_IMPACT = 80
+# LLM 호출 제한 (동시 호출 수 / 분당 요청·토큰 / 호출·틱 마감). 마감을 넘긴 에이전트는 직전 결정 → 오프라인 정책으로 대체
+llm_scheduler = LLMScheduler()
+# 에이전트 의사결정 함수 (agent_society_think와 같은 인자) / 커뮤니티 수다 on/off
+# 헤드리스 실행(scripts/fast_forward.py)은 LLM 대신 오프라인 정책을 꽂고 수다를 끕니다.
+# LLM_BATCH=1 이면 같은 페르소나/종목 에이전트를 묶어 요청 1번으로 결정 (요청 수·프롬프트 토큰이 대략 1/K)
+# (틱 사이 휴식과 틱당 에이전트 수는 core/tick_pacer가 목표 속도 SIM_MINUTES_PER_SEC에 맞춰 조절)
+decision_policy = BatchedSocietyThinker(limiter=llm_scheduler) if os.getenv("LLM_BATCH", "0") == "1" else agent_society_think
+ENABLE_CHATTER = True
+# 재현 모드 (헤드리스 실행이 켬): 에이전트를 고른 순서대로 하나씩 생각/주문 → 같은 시드면 같은 체결
+# (matching_pool.inline=True, agent_random.seed(...)와 같이 써야 완료 순서/난수열이 실행마다 같음)
+SERIAL_AGENTS = False
+# 양자화된 상태(페르소나/종목/뉴스/추세/수익률·보유·현금 구간)가 같으면 LLM 결정을 재사용 (DECISION_CACHE=0 이면 끔)
+decision_cache = DecisionCache() if os.getenv("DECISION_CACHE", "1") == "1" else None
+# ASYNC_DECISIONS=1 이면 에이전트가 틱과 상관없이 백그라운드에서 생각하고, 틱은 쌓인 결정만 실행 (시계가 일정한 속도로 흐름)
+ASYNC_DECISIONS = os.getenv("ASYNC_DECISIONS", "0") == "1"
+decision_pipeline = None # run_simulation_loop가 ASYNC_DECISIONS일 때 만듦
+# 벡터화 군중: LLM 표본 밖의 전원이 틱마다 이 확률로 규칙 기반 주문을 냄 (0이면 끔, 예: 0.05)
+CROWD_PARTICIPATION = float(os.getenv("CROWD_PARTICIPATION", 0))
+crowd = None # 첫 틱에 전원 장부를 올리고 만듦
+# 섹터 샤드 워커로 돌 때 (core/sim_shards): 맡은 종목/에이전트만 시뮬레이션하고, 정산분은 DB 대신 sink로 넘김
+shard = None           # ShardSpec (None이면 전 종목/전원)
+settlement_sink = None # (sim_time, tick, posts, signs) -> 정산 건수
+deferred_posts = []    # 샤드 워커: 이번 틱 종토방 글 (틱 끝에 정산분과 함께 writer로)
+deferred_signs = {}    # 샤드 워커: ticker -> 간판(현재가/등락률)
+# 틱 단계별 시간/DB 쿼리 수/LLM 지연 히스토그램 (관리자 API /api/admin/tick-profile, TICK_PROFILE=0 이면 끔)
+tick_profiler.attach_db(db_engine)
 
 running = True # 🟢 서버 실행 상태 플래그
 
@@ -30,226 +83,316 @@ running = True # 🟢 서버 실행 상태 플래그
 # ------------------------------------------------------------------
 def get_latest_sim_time():
     with SessionLocal() as db:
-        last_trade = db.query(DBTrade).order_by(desc(DBTrade.timestamp)).first()
-        if last_trade and last_trade.timestamp:
-            # 마지막 거래가 있다면 그 시간으로 세팅 (루프 돌면서 +1분 됨)
-            return last_trade.timestamp
+        # 시계 하트비트(거래 없이 흘러간 시간까지 기록)와 마지막 거래 시각 중 늦은 쪽에서 이어감 (루프 돌면서 +1분 됨)
+        stored = sim_clock.stored(db)
+        last_trade = db.query(DBTrade.timestamp).order_by(desc(DBTrade.timestamp)).limit(1).scalar()
+        latest = max((t for t in (stored, last_trade) if t), default=None)
+        if latest:
+            return latest
         # 만약 DB가 텅 비어있는 완전 초기 상태라면 오늘 09시로 시작
         return datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
 
-current_sim_time = get_latest_sim_time()
+def restore_market_journal():
+    """저널이 설정돼 있으면 재생해서 호가창을 복구하고, 저널에 남은 마지막 가상 시각을 돌려줍니다."""
+    if not JOURNAL_DIR: return None
+    with SessionLocal() as db:
+        restored_time = market_engine.attach_journal(OrderJournal(JOURNAL_DIR), db)
+    logger.info(f"📼 저널 복구 완료: 대기 주문 {len(market_engine.order_index)}건, 가상 시각 {restored_time}")
+    return restored_time
+
+# 저널 시계가 더 최근이면 그걸 쓰고(체결 없이 흘러간 시간까지 복구), 아니면 DB 마지막 거래 시각
+current_sim_time = max(t for t in (restore_market_journal(), get_latest_sim_time()) if t)
 
 # ------------------------------------------------------------------
 # 1. 마켓 메이커 (Market Maker)
 # ------------------------------------------------------------------
-def run_global_market_maker(db: Session, all_tickers: list, sim_time: datetime):
-    mm_id = "MARKET_MAKER"
-    mm_agent = db.query(DBAgent).filter(DBAgent.agent_id == mm_id).first()
+MM_ID = "MARKET_MAKER"
+_mm_ready = False # 마켓 메이커 계정 존재 여부 (한 번 확인하면 끝)
+
+def ensure_market_maker(db: Session, all_tickers: list):
+    global _mm_ready
+    if _mm_ready: return
+    mm_agent = db.query(DBAgent).filter(DBAgent.agent_id == MM_ID).first()
     
     if not mm_agent:
         initial_portfolio = {ticker: 1000000 for ticker in all_tickers}
-        mm_agent = DBAgent(agent_id=mm_id, cash_balance=1e15, portfolio=initial_portfolio, psychology={})
+        mm_agent = DBAgent(agent_id=MM_ID, cash_balance=1e15, portfolio=initial_portfolio, psychology={})
         db.add(mm_agent)
         db.commit()
+    _mm_ready = True
+
+def build_mm_ladder(curr_price: int):
+    """현재가 기준 위아래 5호가 사다리를 만듭니다."""
+    bids, asks = [], []
+    # 💡 [핵심 수정] 1개만 걸던 주문을 반복문을 통해 5개로 늘려 5호가를 만듭니다!
+    for step in range(1, 6):
+        # step이 커질수록 현재가에서 더 멀리 떨어진 가격(0.15% 간격)으로 호가를 만듭니다.
+        spread = max(1, int(curr_price * 0.0015 * step)) 
+        # 각 층마다 수량도 30주~250주 사이로 리얼하게 랜덤으로 깝니다.
+        bids.append((curr_price - spread, random.randint(30, 250))) # 매수 호가 (현재가보다 싼 가격들)
+        asks.append((curr_price + spread, random.randint(30, 250))) # 매도 호가 (현재가보다 비싼 가격들)
+    return bids, asks
+
+async def run_global_market_maker(prices: dict, sim_time: datetime):
+    """
+    prices: {ticker: 현재가} - 틱 시작 때 한 번 읽은 기업 정보를 그대로 씁니다.
+    종목마다 엔진의 replace_quotes로 사다리를 통째로 교체 (주문별 DB 조회 없음)
+    """
+    async def quote(ticker, curr_price):
+        bids, asks = build_mm_ladder(int(curr_price))
+        try:
+            await matching_pool.call(ticker, market_engine.replace_quotes, ticker, bids, asks, MM_ID, sim_time)
+        except Exception as e:
+            logger.error(f"🚨 [마켓 메이커] {ticker} 호가 교체 실패: {e}")
 
-    for ticker in all_tickers:
-        company = db.query(DBCompany).filter(DBCompany.ticker == ticker).first()
-        if not company: continue
-
-        curr_price = int(company.current_price)
-        
-        # 💡 [핵심 수정] 1개만 걸던 주문을 반복문을 통해 5개로 늘려 5호가를 만듭니다!
-        for step in range(1, 6):
-            # step이 커질수록 현재가에서 더 멀리 떨어진 가격(0.15% 간격)으로 호가를 만듭니다.
-            spread = max(1, int(curr_price * 0.0015 * step)) 
-            # 각 층마다 수량도 30주~250주 사이로 리얼하게 랜덤으로 깝니다.
-            qty_buy = random.randint(30, 250)
-            qty_sell = random.randint(30, 250)
-
-            try:
-                # 매수 호가 (현재가보다 싼 가격들: 1층, 2층... 5층)
-                market_engine.place_order(db, Order(agent_id=mm_id, ticker=ticker, side=OrderSide.BUY, order_type=OrderType.LIMIT, quantity=qty_buy, price=curr_price - spread), sim_time)
-                # 매도 호가 (현재가보다 비싼 가격들: 1층, 2층... 5층)
-                market_engine.place_order(db, Order(agent_id=mm_id, ticker=ticker, side=OrderSide.SELL, order_type=OrderType.LIMIT, quantity=qty_sell, price=curr_price + spread), sim_time)
-            except: 
-                pass
-
-# ------------------------------------------------------------------
-# [Helper] 추세 분석
-# ------------------------------------------------------------------
-def analyze_market_trend(db: Session, ticker: str):
-    trades = db.query(DBTrade).filter(DBTrade.ticker == ticker).order_by(desc(DBTrade.timestamp)).limit(20).all()
-    if not trades: return "정보 없음 (탐색 단계)"
-    
-    start_p = trades[-1].price
-    end_p = trades[0].price
-    
-    if end_p > start_p * 1.02: return "🔥 급등세 (매수세 강함)"
-    elif end_p > start_p: return "📈 완만한 상승"
-    elif end_p < start_p * 0.98: return "😱 급락세 (투매 발생)"
-    elif end_p < start_p: return "📉 하락세"
-    else: return "⚖️ 보합세 (눈치보기)"
+    await asyncio.gather(*(quote(t, p) for t, p in prices.items() if p))
 
 # ------------------------------------------------------------------
 # 2. 에이전트 거래 실행
 # ------------------------------------------------------------------
-async def run_agent_trade(agent_id: str, ticker: str, sim_time: datetime):
-    with SessionLocal() as db:
+async def think_agent(agent_id: str, ticker: str, market: MarketContext, background: bool = False):
+    """
+    에이전트 한 명의 매매 결정 (LLM 스케줄러 경유). 주문은 내지 않고 결정 dict만 돌려줍니다.
+    market: 공용 시장 정보 (현재가/추세/뉴스를 여기서 읽고 종목 DB 조회는 안 함)
+    background: 비동기 파이프라인에서 부를 때 True → LLM이 제때 못 내면 직전 결정/대체 정책 대신 None (이번 차례 건너뜀)
+    """
+    with tick_profiler.phase("cognition"):
+        return await _think_agent(agent_id, ticker, market, background)
+
+async def think_in_background(agent_id: str, ticker: str, market: MarketContext):
+    """비동기 파이프라인용: 실패하면 None이라 대체 결정이 대기열에 들어가지 않음"""
+    return await think_agent(agent_id, ticker, market, background=True)
+
+async def _think_agent(agent_id: str, ticker: str, market: MarketContext, background: bool = False):
+    ctx = market.get(ticker)
+    if not ctx: return
+    # 에이전트 상태는 틱 시작 때 한 번에 불러온 정산 장부 사본을 씀 (에이전트별 DB 조회 없음)
+    view = ledger.view(agent_id)
+    if not view: return
+    cash, portfolio, psychology = view
+    try:
+        news_text = ctx.news_text
+        trend_info = ctx.trend
+
+        portfolio_qty = portfolio.get(ticker, 0)
+        avg_price = psychology.get(f"avg_price_{ticker}", 0)
+        if portfolio_qty > 0 and avg_price == 0: avg_price = ctx.price
+        last_thought = psychology.get(f"last_thought_{ticker}", None)
+
+        cache_key = in_flight = None
+        if decision_cache is not None:
+            cache_key = decision_key(get_agent_persona(agent_id)[0], ticker, ctx.news_id, trend_info,
+                                     ctx.price, cash, portfolio_qty, avg_price)
+            cached = decision_cache.get(cache_key, ctx.price)
+            if cached is None:
+                # 같은 키를 먼저 묻고 있는 에이전트가 있으면 새로 묻지 않고 그 결과를 나눠 씀
+                cached = await decision_cache.wait(cache_key, ctx.price)
+            if cached is not None:
+                # 흔든 수량이 현금/보유량을 넘지 않도록 같은 검증을 한 번 더
+                return finalize_decision(agent_id, cached, ctx.price, cash, portfolio_qty)
+            in_flight = decision_cache.begin(cache_key)
+
         try:
-            agent = db.query(DBAgent).filter(DBAgent.agent_id == agent_id).first()
-            company = db.query(DBCompany).filter(DBCompany.ticker == ticker).first()
-            if not agent or not company: return
+            decision = await llm_scheduler.think(
+                # 파이프라인은 틱이 기다리지 않으므로 대체 정책/직전 결정으로 채울 필요 없음 (키 None = 직전 결정 재사용 안 함)
+                decision_policy, None if background else (agent_id, ticker), fallback=None if background else offline_think,
+                on_decision=(lambda d: decision_cache.put(cache_key, d, ctx.price)) if cache_key else None,
+                agent_name=agent_id, 
+                agent_state=AgentState(**psychology),
+                context_info=news_text, 
+                current_price=ctx.price, 
+                cash=cash,
+                portfolio_qty=portfolio_qty,
+                avg_price=avg_price,
+                last_action_desc=last_thought,
+                market_sentiment=trend_info
+            )
+            # logger.info(f"🔎 [추적 2] {agent_id} 정상적으로 생각 완료!")
+        except Exception as e:
+            logger.error(f"🚨 [에러 발생] AI 생각 실패 ({agent_id}): {e}")
+            if background: return None
+            rng = agent_random.get(agent_id)
+            decision = {
+                "action": rng.choice(["BUY", "SELL"]),
+                "quantity": rng.randint(10, 50),
+                "price": ctx.price,
+                "thought_process": "강제 매매"
+            }
+            # logger.info(f"🔎 [추적 2] {agent_id} 강제 뇌동매매 발동!")
+        finally:
+            if in_flight is not None: decision_cache.end(cache_key, in_flight)
+        return decision
+    except Exception as e:
+        logger.error(f"🚨 [에러 발생] {agent_id} 판단 준비 실패: {e}")
+        return None
+
+async def execute_decision(agent_id: str, ticker: str, decision: dict, sim_time: datetime, market: MarketContext):
+    """결정 하나를 뉴스 반응/수량 보정을 거쳐 주문으로 내고, 체결되면 커뮤니티 글/간판을 갱신합니다."""
+    with tick_profiler.phase("execution"):
+        await _execute_decision(agent_id, ticker, decision, sim_time, market)
+
+async def _execute_decision(agent_id: str, ticker: str, decision: dict, sim_time: datetime, market: MarketContext):
+    ctx = market.get(ticker)
+    if not ctx: return
+    news_text = ctx.news_text
+    rng = agent_random.get(agent_id)
+    try:
+
+        action = str(decision.get("action", "HOLD")).upper()
 
-            # 💡 [여기 수정!] DBNews.ticker와 company.ticker를 비교하도록 수정
-            news_obj = db.query(DBNews).filter(DBNews.ticker == company.ticker).order_by(desc(DBNews.id)).first()
-            
-            # news_obj가 있을 때만 title을 가져오고, 없으면 기본값 설정
-            news_text = news_obj.content if news_obj else "특이사항 없음" 
-            # (참고: DBNews 모델에 title이 없고 content만 있다면 content로 쓰세요!)
-            
-            trend_info = analyze_market_trend(db, ticker)
-
-            portfolio_qty = agent.portfolio.get(ticker, 0)
-            avg_price = agent.psychology.get(f"avg_price_{ticker}", 0)
-            if portfolio_qty > 0 and avg_price == 0: avg_price = company.current_price
-            last_thought = agent.psychology.get(f"last_thought_{ticker}", None)
-
-            try:
-                decision = await agent_society_think(
-                    agent_name=agent.agent_id, 
-                    agent_state=AgentState(**agent.psychology),
-                    context_info=news_text, 
-                    current_price=company.current_price, 
-                    cash=agent.cash_balance,
-                    portfolio_qty=portfolio_qty,
-                    avg_price=avg_price,
-                    last_action_desc=last_thought,
-                    market_sentiment=trend_info
-                )
-                # logger.info(f"🔎 [추적 2] {agent_id} 정상적으로 생각 완료!")
-            except Exception as e:
-                logger.error(f"🚨 [에러 발생] AI 생각 실패 ({agent_id}): {e}")
-                decision = {
-                    "action": random.choice(["BUY", "SELL"]),
-                    "quantity": random.randint(10, 50),
-                    "price": company.current_price,
-                    "thought_process": "강제 매매"
-                }
-                # logger.info(f"🔎 [추적 2] {agent_id} 강제 뇌동매매 발동!")
-
-            action = str(decision.get("action", "HOLD")).upper()
-
-            try:
-                qty_raw = decision.get("quantity", 0)
-                qty = int(float(qty_raw)) if qty_raw not in [None, "None", "null", ""] else 0
-            except:
-                qty = 0
-
-            # 🚀 [강력한 뉴스 반응 엔진 (News Impact Engine) 탑재!]
-            good_keywords = ["호재", "상승", "돌파", "계약", "성공", "출시", "인수", "흑자", "성장", "수주", "개발", "혁신", "M&A", "체결"]
-            bad_keywords = ["악재", "하락", "쇼크", "횡령", "소송", "결함", "위반", "붕괴", "적자", "포기", "실패", "우려", "매각", "논란"]
-
-            is_good_news = any(kw in news_text for kw in good_keywords)
-            is_bad_news = any(kw in news_text for kw in bad_keywords)
-            
-            impact_multiplier = 1
-            if news_obj and hasattr(news_obj, 'impact_score') and news_obj.impact_score:
-                if int(news_obj.impact_score) >= 80: 
-                    impact_multiplier = 10  
-                elif int(news_obj.impact_score) >= 60: 
-                    impact_multiplier = 5   
-
-            if is_good_news:
-                action = "BUY"
-                qty = random.randint(50, 100) * impact_multiplier
-                is_market_order = True
-                thought = f"미쳤다! '{news_text}' 떴네! 이건 무조건 풀매수 가즈아!!!"
-            elif is_bad_news:
-                action = "SELL"
-                qty = random.randint(50, 100) * impact_multiplier
-                is_market_order = True
-                thought = f"헐... '{news_text}' 실화냐? 당장 다 던져라 돔황챠!!!"
-            else:
-                if action == "HOLD": action = random.choice(["BUY", "SELL"])
-                if qty <= 0: qty = random.randint(10, 30)
-                is_market_order = True
-                thought = str(decision.get("thought_process", "차트 보고 매매합니다."))
-
-            try:
-                price_raw = decision.get("price", company.current_price)
-                ai_target_price = int(float(price_raw)) if price_raw not in [None, "None", "null", ""] else int(company.current_price)
-            except:
-                ai_target_price = int(company.current_price)
-
-            curr_p = company.current_price
-            final_price = ai_target_price
-            
-            # 💡 [여기 추가!] 1. AI가 눈치보며 "HOLD"를 선택하면, 강제로 BUY나 SELL로 바꿔버립니다!
-            if action == "HOLD":
-                action = random.choice(["BUY", "SELL"])
-            
-            try:
-                qty_raw = decision.get("quantity", 0)
-                qty = int(float(qty_raw)) if qty_raw not in [None, "None", "null", ""] else 0
-            except:
-                qty = 0
-            
-            # 💡 [여기 추가!] 혹시 수량이 0이면 무조건 10~50주 거래하게 만듭니다.
-            if qty <= 0:
-                qty = random.randint(10, 50)
-            
-            try:
-                price_raw = decision.get("price", company.current_price)
-                ai_target_price = int(float(price_raw)) if price_raw not in [None, "None", "null", ""] else int(company.current_price)
-            except:
-                ai_target_price = int(company.current_price)
-
-            # 💡 [여기 수정!] 2. 지정가 눈치싸움을 없애고 무조건 마켓메이커의 벽을 부수는 '시장가'로 돌격시킵니다!
-            is_market_order = True # (기존: random.random() < 0.7 지우고 True로 고정)
-            
-            curr_p = company.current_price
-            final_price = ai_target_price
+        try:
+            qty_raw = decision.get("quantity", 0)
+            qty = int(float(qty_raw)) if qty_raw not in [None, "None", "null", ""] else 0
+        except:
+            qty = 0
+
+        # 🚀 [강력한 뉴스 반응 엔진 (News Impact Engine) 탑재!] (호재/악재 분류는 틱 시작 때 종목별로 한 번만)
+        impact_multiplier = ctx.impact_multiplier
+
+        if ctx.is_good_news:
+            action = "BUY"
+            qty = rng.randint(50, 100) * impact_multiplier
+            is_market_order = True
+            thought = f"미쳤다! '{news_text}' 떴네! 이건 무조건 풀매수 가즈아!!!"
+        elif ctx.is_bad_news:
+            action = "SELL"
+            qty = rng.randint(50, 100) * impact_multiplier
+            is_market_order = True
+            thought = f"헐... '{news_text}' 실화냐? 당장 다 던져라 돔황챠!!!"
+        else:
+            if action == "HOLD": action = rng.choice(["BUY", "SELL"])
+            if qty <= 0: qty = rng.randint(10, 30)
+            is_market_order = True
+            thought = str(decision.get("thought_process", "차트 보고 매매합니다."))
 
-            if action == "BUY":
-                final_price = int(curr_p * 1.02) if is_market_order else min(ai_target_price, int(curr_p * 0.99))
-            elif action == "SELL":
-                final_price = int(curr_p * 0.98) if is_market_order else max(ai_target_price, int(curr_p * 1.01))
+        try:
+            price_raw = decision.get("price", ctx.price)
+            ai_target_price = int(float(price_raw)) if price_raw not in [None, "None", "null", ""] else int(ctx.price)
+        except:
+            ai_target_price = int(ctx.price)
 
-            # 💡 [추적 3] 봇이 최종적으로 어떤 주문을 넣으려는지 확인
-            # logger.info(f"🔎 [추적 3] {agent_id} -> {action} {qty}주 (가격: {final_price}) 주문 전송 중...")
+        curr_p = ctx.price
+        final_price = ai_target_price
+        
+        # 💡 [여기 추가!] 1. AI가 눈치보며 "HOLD"를 선택하면, 강제로 BUY나 SELL로 바꿔버립니다!
+        if action == "HOLD":
+            action = rng.choice(["BUY", "SELL"])
+        
+        try:
+            qty_raw = decision.get("quantity", 0)
+            qty = int(float(qty_raw)) if qty_raw not in [None, "None", "null", ""] else 0
+        except:
+            qty = 0
+        
+        # 💡 [여기 추가!] 혹시 수량이 0이면 무조건 10~50주 거래하게 만듭니다.
+        if qty <= 0:
+            qty = rng.randint(10, 50)
+        
+        try:
+            price_raw = decision.get("price", ctx.price)
+            ai_target_price = int(float(price_raw)) if price_raw not in [None, "None", "null", ""] else int(ctx.price)
+        except:
+            ai_target_price = int(ctx.price)
 
-            if action in ["BUY", "SELL"] and qty > 0:
-                side = OrderSide.BUY if action == "BUY" else OrderSide.SELL
-                order = Order(agent_id=agent.agent_id, ticker=ticker, side=side, order_type=OrderType.LIMIT, quantity=qty, price=final_price)
-                result = market_engine.place_order(db, order, sim_time=sim_time)
-                
-                if result['status'] == 'SUCCESS':
+        # 💡 [여기 수정!] 2. 지정가 눈치싸움을 없애고 무조건 마켓메이커의 벽을 부수는 '시장가'로 돌격시킵니다!
+        is_market_order = True # (기존: random.random() < 0.7 지우고 True로 고정)
+        
+        curr_p = ctx.price
+        final_price = ai_target_price
+
+        # (시장가는 가격 없이 엔진이 호가를 직접 훑으므로, 지정가일 때만 가격을 정합니다)
+        if action == "BUY":
+            final_price = min(ai_target_price, int(curr_p * 0.99))
+        elif action == "SELL":
+            final_price = max(ai_target_price, int(curr_p * 1.01))
+
+        # 💡 [추적 3] 봇이 최종적으로 어떤 주문을 넣으려는지 확인
+        # logger.info(f"🔎 [추적 3] {agent_id} -> {action} {qty}주 (가격: {final_price}) 주문 전송 중...")
+
+        if action in ["BUY", "SELL"] and qty > 0:
+            side = OrderSide.BUY if action == "BUY" else OrderSide.SELL
+            # (값은 위에서 이미 검증했으므로 pydantic Order를 만들지 않고 엔진 내부 경로로 바로 전달)
+            if is_market_order:
+                # 진짜 시장가: 호가를 보호 범위까지 훑고, 남은 수량은 호가창에 남기지 않고 취소
+                result = await matching_pool.place(agent_id, ticker, side, qty, order_type=OrderType.MARKET, sim_time=sim_time)
+            else:
+                result = await matching_pool.place(agent_id, ticker, side, qty, price=final_price, sim_time=sim_time,
+                                                   time_in_force=TimeInForce.GTT, expire_at=sim_time + timedelta(minutes=AI_ORDER_TTL_MINUTES))
+            
+            # 이번 결정은 장부 심리 필드에 적어두고 틱 끝에 한 번에 저장 (다음 판단 때 last_thought로 씀)
+            ledger.remember(agent_id, **{f"last_thought_{ticker}": thought})
+
+            if result['status'] == 'SUCCESS':
+                with tick_profiler.phase("comments"):
                     #logger.info(f"⚡ {ticker} 체결! | {agent_id} | {action} {qty}주")
                     try:
-                        post_comment(db, agent_id, ticker, action, company.name, sim_time=sim_time)
-                    except: pass
-                    
+                        post = compose_comment(agent_id, ticker, action, ctx.name, sim_time=sim_time)
+                    except: post = None
+                
                     # 💡 [무적의 등락률 계산기 장착!] 
-                    latest_trade = db.query(DBTrade).filter(DBTrade.ticker == ticker).order_by(desc(DBTrade.timestamp)).first()
-                    if latest_trade:
-                        company.current_price = latest_trade.price
-                        
+                    # (거래 기록은 틱 끝에 일괄 정산되므로 DB 대신 엔진이 알려준 마지막 체결가를 씁니다)
+                    sign = None
+                    last_price = result.get('last_price')
+                    if last_price:
+                        # 공용 시장 정보도 같이 갱신 → 같은 틱에 나중에 생각하는 에이전트는 최신가를 봄
+                        ctx.price = float(last_price)
+                    
                         # 과거 DB 데이터 꼬임을 방지하기 위해 기획된 가격을 직접 기준으로 삼습니다.
                         BASE_PRICES = {
                             "SS011": 172000, "JW004": 45000, "AT010": 28000, "MH012": 580000,
                             "SH001": 62000, "ND008": 34000, "JH005": 89000, "SE002": 54000,
                             "IA009": 41000, "SW006": 22000, "QD007": 115000, "YJ003": 198000
                         }
-                        base_price = BASE_PRICES.get(ticker, latest_trade.price)
-                        
-                        if base_price > 0:
-                            company.change_rate = ((latest_trade.price - base_price) / base_price) * 100
-                            
-                        db.commit()
-                        #logger.info(f"📈 [간판 교체] {company.name}: {company.current_price}원 ({company.change_rate:.2f}%)")
-                        
+                        base_price = BASE_PRICES.get(ticker, last_price)
+                    
+                        change_rate = ((last_price - base_price) / base_price) * 100 if base_price > 0 else 0.0
+                        sign = {"ticker": ticker, "current_price": ctx.price, "change_rate": change_rate}
+
+                    if shard is not None:
+                        # 샤드 워커: 프로세스끼리 DB 쓰기 잠금을 다투지 않게 틱 끝 정산분과 함께 writer가 씀
+                        if post: deferred_posts.append(post)
+                        if sign: deferred_signs[ticker] = sign
+                    elif post or sign:
+                        # 체결됐을 때만 세션을 열어 커뮤니티 글 / 간판 교체를 씀 (커밋 1번)
+                        with SessionLocal() as db:
+                            if post: db.add(DBDiscussion(**post))
+                            if sign:
+                                # 기업 행을 다시 읽지 않고 UPDATE 한 번으로 간판만 교체
+                                db.query(DBCompany).filter(DBCompany.ticker == ticker) \
+                                  .update({DBCompany.current_price: sign["current_price"], DBCompany.change_rate: sign["change_rate"]}, synchronize_session=False)
+                            db.commit()
+                        #logger.info(f"📈 [간판 교체] {ctx.name}: {ctx.price}원 ({change_rate:.2f}%)")
+
+    except Exception as e:
+        logger.error(f"🚨 트레이드 전체 에러 발생: {e}")
+
+async def run_agent_trade(agent_id: str, ticker: str, sim_time: datetime, market: MarketContext):
+    """틱 안에서 바로 생각하고 주문까지 내는 동기 모드 (비동기 파이프라인을 안 쓸 때)"""
+    decision = await think_agent(agent_id, ticker, market)
+    if decision is not None:
+        await execute_decision(agent_id, ticker, decision, sim_time, market)
+
+async def run_crowd(market: MarketContext, sim_time: datetime, exclude) -> int:
+    """벡터화 군중의 주문을 한 번에 계산해서 종목 워커마다 한 묶음씩 넣습니다. (넣은 주문 수 반환)"""
+    with tick_profiler.phase("crowd"):
+        orders = crowd.decide(market, CROWD_PARTICIPATION, exclude)
+        grouped = crowd.by_ticker(orders)
+    # 이번 틱에 주문하는 군중만 장부를 DB 값으로 새로 읽음 (실행 중 DB 수정이 flush로 덮이지 않게, 전원 재로딩은 안 함)
+    with tick_profiler.phase("load_agents"), SessionLocal() as db:
+        market_engine.load_agents(db, [crowd.agent_ids[i] for i in set(orders.agent.tolist())])
+
+    async def submit(ticker, batch):
+        try:
+            result = await matching_pool.call(ticker, market_engine.submit_many, ticker, batch, sim_time)
         except Exception as e:
-            logger.error(f"🚨 트레이드 전체 에러 발생: {e}")
+            logger.error(f"🚨 [군중] {ticker} 주문 실패: {e}")
+            return
+        if result.get("last_price"):
+            market[ticker].price = float(result["last_price"])
+
+    await asyncio.gather(*(submit(t, b) for t, b in grouped.items()))
+    return len(orders)
+
 # ------------------------------------------------------------------
 # 🔥 3. 글로벌 라운지 (커뮤니티) - DB 락 방지 추가
 # ------------------------------------------------------------------
@@ -257,33 +400,38 @@ async def run_global_chatter(agent_id: str, sim_time: datetime):
     # 매매하는 다른 30명의 에이전트들과 DB 충돌이 나지 않도록 약간의 엇박자 딜레이를 줍니다.
     await asyncio.sleep(random.uniform(0.5, 2.0))
     
-    with SessionLocal() as db:
+    view = ledger.view(agent_id)
+    if not view: return
+    cash, portfolio, psychology = view
+
+    # LLM을 기다리는 동안 DB 연결을 붙잡지 않도록 세션은 글을 쓸 때만 엶
+    with tick_profiler.phase("chatter"):
         try:
-            agent = db.query(DBAgent).filter(DBAgent.agent_id == agent_id).first()
-            if not agent: return
-            
-            port_summary = ", ".join([f"{k} {v}주" for k, v in agent.portfolio.items()]) or "보유 주식 없음"
+            port_summary = ", ".join([f"{k} {v}주" for k, v in portfolio.items()]) or "보유 주식 없음"
             
             context_prompt = (
-                f"현재 당신의 계좌 상태 - 잔고: {agent.cash_balance}원, 보유주식: {port_summary}. "
+                f"현재 당신의 계좌 상태 - 잔고: {cash}원, 보유주식: {port_summary}. "
                 "당신은 방금 주식 시장을 확인하고 투자자 커뮤니티 라운지에 접속했습니다. "
                 "당신의 성향과 현재 계좌 상태를 바탕으로, 지금 느끼는 감정이나 시장에 대한 생각을 자연스러운 커뮤니티 게시글(1문장)로 작성하세요. "
                 "반드시 아래 JSON 형식으로 응답해야 시스템이 인식합니다:\n"
                 '{"action": "HOLD", "quantity": 0, "price": 0, "thought_process": "게시글 내용"}'
             )
             
-            decision = await agent_society_think(
-                agent_name=agent.agent_id, 
-                agent_state=AgentState(**agent.psychology),
+            # 수다는 대체 정책 없음: 마감/429면 이번 턴은 글을 안 씀
+            decision = await llm_scheduler.think(
+                agent_society_think, None,
+                agent_name=agent_id, 
+                agent_state=AgentState(**psychology),
                 context_info=context_prompt, 
                 current_price=0, 
-                cash=agent.cash_balance,
+                cash=cash,
                 portfolio_qty=0,
                 avg_price=0,
                 last_action_desc="커뮤니티에서 다른 사람들의 반응을 지켜보는 중",
                 market_sentiment="자유게시판 (수다 떠는 곳)"
             )
             
+            if decision is None: return
             chatter = decision.get("thought_process", "")
             
             if not chatter or chatter == "생각 없음" or chatter.lower() in ["none", "null"]: 
@@ -295,70 +443,212 @@ async def run_global_chatter(agent_id: str, sim_time: datetime):
             
             new_post = DBDiscussion(
                 ticker="GLOBAL",
-                agent_id=agent.agent_id,
+                agent_id=agent_id,
                 content=chatter,
                 sentiment=sentiment,
                 created_at=sim_time
             )
-            db.add(new_post)
-            db.commit()
+            with SessionLocal() as db:
+                db.add(new_post)
+                db.commit()
             
             logger.info(f"💬 [시장 라운지] {agent_id}: {chatter}")
             
         except Exception as e:
             logger.error(f"❌ [시장 라운지 에러] {agent_id} 글쓰기 실패: {e}")
 
+# ------------------------------------------------------------------
+# [Helper] 단일가 매매 (장 시작 / 충격 뉴스)
+# ------------------------------------------------------------------
+def schedule_news_auctions(db: Session, last_news_id: int, sim_time: datetime) -> int:
+    """새로 들어온 충격 뉴스 종목을 단일가 접수로 돌리고, 마지막으로 본 뉴스 id를 돌려줍니다."""
+    shocks = db.query(DBNews.id, DBNews.ticker, DBNews.impact_score).filter(DBNews.id > last_news_id).all()
+    for news in shocks:
+        if shard is not None and news.ticker not in shard.tickers: continue
+        if news.ticker and news.impact_score and int(news.impact_score) >= NEWS_AUCTION_IMPACT:
+            market_engine.start_auction(news.ticker, sim_time + timedelta(minutes=NEWS_AUCTION_MINUTES))
+            logger.info(f"🔔 [단일가] {news.ticker} 충격 뉴스(강도 {news.impact_score}) → {NEWS_AUCTION_MINUTES}분간 주문 모아서 한 번에 체결")
+    return max([last_news_id] + [n.id for n in shocks])
+
+async def run_due_auctions(prices: dict, sim_time: datetime):
+    """마감된 옥션을 종목 워커 순서에 맞춰 단일가로 체결합니다."""
+    async def uncross(ticker):
+        result = await matching_pool.call(ticker, market_engine.run_auction, ticker, sim_time, prices.get(ticker))
+        if result.get("filled_qty"):
+            logger.info(f"🔔 [단일가 체결] {ticker} {result['auction_price']}원 / {result['filled_qty']}주")
+
+    await asyncio.gather(*(uncross(t) for t in market_engine.due_auctions(sim_time)))
+
 # ------------------------------------------------------------------
 # 4. 메인 시뮬레이션 루프
 # ------------------------------------------------------------------
+_last_news_id = None # 마지막으로 확인한 뉴스 id (단일가 트리거용)
+
+def advance_clock(sim_time: datetime) -> datetime:
+    """가상 시계를 1분 진행합니다. 19시가 되면 당일 주문을 정리하고 다음날 09:00으로 점프."""
+    sim_time += timedelta(minutes=1)
+    
+    if sim_time.minute == 0:
+        logger.info(f"⏰ 현재 가상 시간: {sim_time.strftime('%H:%M')}")
+
+    # 현실 10분마다 하루가 지나도록 설정 (19시 마감)
+    if sim_time.hour >= 19:
+         cleared = market_engine.clear_day_orders()
+         logger.info(f"🌙 장 마감! 당일 주문 {cleared}건 정리 후 다음날 아침으로 점프합니다.")
+         sim_time += timedelta(days=1)
+         sim_time = sim_time.replace(hour=9, minute=0)
+    return sim_time
+
+async def run_tick(sim_time: datetime, tick: int) -> dict:
+    """
+    시뮬레이션 1틱 (가상 1분): 만료 정리 → 마켓 메이커 호가 → 에이전트 매매 → 단일가 체결 → 일괄 정산.
+    서버 루프(run_simulation_loop)와 헤드리스 실행(scripts/fast_forward.py)이 같이 씁니다.
+    반환: {"agents": 이번 틱 매매한 에이전트 수, "trades": 정산된 체결 건수, "llm": LLM 호출/대체 통계}
+    """
+    global _last_news_id, crowd
+    # 💡 마켓 메이커 호가는 run_global_market_maker가 매 턴 replace_quotes로 통째로 교체합니다.
+    tick_profiler.start_tick()
+
+    # 만료 시각이 지난 주문만 타이머 휠에서 꺼내 취소 (전체 호가창을 훑지 않음)
+    with tick_profiler.phase("expire"):
+        market_engine.expire_orders(sim_time)
+    # 이번 틱 LLM 예산 시작 (이 안에 못 끝낸 에이전트는 직전 결정/오프라인 정책으로 매매)
+    # 파이프라인 모드는 틱이 LLM을 기다리지 않으므로 틱 예산 없이 호출별 마감만 적용
+    llm_scheduler.start_tick(budget=decision_pipeline is None)
+    
+    with tick_profiler.phase("context"), SessionLocal() as db:
+        # API가 읽는 시계 갱신 (같은 프로세스는 메모리, 다른 프로세스는 하트비트 행)
+        sim_clock.publish(sim_time, db)
+        all_companies = db.query(DBCompany).all()
+        if shard is not None:
+            all_companies = [c for c in all_companies if c.ticker in shard.tickers]
+        all_tickers = [c.ticker for c in all_companies] 
+        prices = {c.ticker: c.current_price for c in all_companies}
+        # 종목별 현재가/추세/최신 뉴스를 틱마다 한 번만 계산해서 모든 에이전트가 공유
+        market = MarketContext.build(db, all_companies, recent=ledger.recent_prices)
+
+        # 장 시작 동시호가 + 충격 뉴스 직후 단일가 접수
+        if sim_time.hour == 9 and sim_time.minute == 0:
+            for ticker in all_tickers:
+                market_engine.start_auction(ticker, sim_time + timedelta(minutes=OPEN_AUCTION_MINUTES))
+        if _last_news_id is None:
+            _last_news_id = db.query(DBNews.id).order_by(desc(DBNews.id)).limit(1).scalar() or 0
+        _last_news_id = schedule_news_auctions(db, _last_news_id, sim_time)
+        
+        ensure_market_maker(db, all_tickers)
+        if shard is None: # 샤드 모드의 공용 계정은 현금 변화량으로 합치므로 다시 읽으면 안 됨
+            market_engine.load_agents(db, [MM_ID])
+        all_agents = [a.agent_id for a in db.query(DBAgent.agent_id).all()
+                      if a.agent_id != MM_ID and (shard is None or shard.owns_agent(a.agent_id))]
+
+    with tick_profiler.phase("market_maker"):
+        await run_global_market_maker(prices, sim_time)
+
+    if decision_pipeline is not None:
+        # 비동기 파이프라인: 전원이 백그라운드에서 생각 중 → 이번 틱엔 그동안 쌓인 결정만 실행
+        with tick_profiler.phase("load_agents"), SessionLocal() as db:
+            market_engine.load_agents(db, all_agents, refresh=False) # 생각할 때 볼 장부 (처음 보는 에이전트만 읽음)
+        decision_pipeline.update_market(market, tick)
+        decision_pipeline.start(all_agents)
+        pending = decision_pipeline.drain(limit=tick_pacer.agents) # 속도 조절기 예산만큼만 실행
+        active_agents = list(dict.fromkeys(p.agent_id for p in pending))
+        with tick_profiler.phase("load_agents"), SessionLocal() as db:
+            market_engine.load_agents(db, active_agents) # 이번 틱에 주문하는 에이전트만 DB 값으로 새로 읽음
+        tasks = [execute_decision(p.agent_id, p.ticker, p.decision, sim_time, market) for p in pending]
+    else:
+        # 💡 1번 수정: 한 턴에 움직이는 봇의 수를 30명 -> 5명으로 줄입니다. (서버 부하 1/6로 감소!)
+        # → 이제 속도 조절기가 틱 처리 시간/루프 지연/LLM 적체를 보고 자동으로 정함 (헤드리스 실행은 시작값 고정)
+        n_active = tick_pacer.agents
+        active_agents = random.sample(all_agents, k=n_active) if len(all_agents) > n_active else all_agents
+        # 이번 틱에 움직일 에이전트를 쿼리 한 번(IN 절)으로 장부에 올림 (정산 대기분 없는 장부는 DB 값으로 새로 읽음)
+        with tick_profiler.phase("load_agents"), SessionLocal() as db:
+            market_engine.load_agents(db, active_agents)
+        
+        tasks = []
+        
+        for agent_id in active_agents:
+            my_ticker = random.choice(all_tickers) 
+            tasks.append(run_agent_trade(agent_id, my_ticker, sim_time, market))
+    
+    if CROWD_PARTICIPATION > 0:
+        if crowd is None:
+            with tick_profiler.phase("load_agents"), SessionLocal() as db:
+                market_engine.load_agents(db, all_agents, refresh=False)
+            crowd = VectorPopulation(all_agents, all_tickers, rng=np.random.default_rng(random.getrandbits(32)))
+            crowd.refresh(ledger)
+            ledger.take_changed()
+        else:
+            crowd.refresh_changed(ledger) # 지난 틱에 체결된 에이전트만 배열에 다시 반영
+        tasks.append(run_crowd(market, sim_time, active_agents))
+
+    if ENABLE_CHATTER and active_agents and random.random() < 0.3:
+        chatty_agent = random.choice(active_agents)
+        tasks.append(run_global_chatter(chatty_agent, sim_time))
+    
+    # 에이전트 인지/주문/군중/수다가 동시에 도는 구간 (안쪽 단계는 태스크별 시간의 합으로 따로 집계)
+    with tick_profiler.phase("agents"):
+        if SERIAL_AGENTS:
+            for task in tasks: # 고른 순서 그대로 하나씩 (완료 순서가 실행마다 달라지지 않게)
+                await task
+        else:
+            await asyncio.gather(*tasks)
+    llm_stats = dict(llm_scheduler.stats)
+    if llm_stats["timeouts"] or llm_stats["rate_limited"]:
+        logger.warning(f"⏳ [LLM] 마감 초과 {llm_stats['timeouts']} / 429 {llm_stats['rate_limited']} → 직전 결정 {llm_stats['reused']}, 대체 정책 {llm_stats['fallback']}")
+
+    # 접수 마감된 단일가 종목 일괄 체결
+    with tick_profiler.phase("auctions"):
+        await run_due_auctions(prices, sim_time)
+
+    # 이번 틱에 쌓인 체결(잔고/포트폴리오/거래기록)을 한 트랜잭션으로 정산 (저널도 이때 디스크에 확정)
+    market_engine.journal_clock(sim_time)
+    if settlement_sink is not None:
+        # 샤드 워커: 정산분 + 미뤄둔 글/간판을 writer 프로세스로 보냄
+        posts, signs = list(deferred_posts), dict(deferred_signs)
+        deferred_posts.clear()
+        deferred_signs.clear()
+        trades = settlement_sink(sim_time, tick, posts, signs)
+    else:
+        trades = await matching_pool.settle()
+    if tick % SNAPSHOT_EVERY_TICKS == 0:
+        with tick_profiler.phase("snapshot"):
+            market_engine.snapshot()
+    if decision_cache is not None and sim_time.minute == 0:
+        c = decision_cache.stats()
+        logger.info(f"🗃️ [결정 캐시] 적중률 {c['hit_rate']:.1%} ({c['hits']}/{c['hits'] + c['misses']}), 동시 요청 공유 {c['shared']}, 항목 {c['size']}개, 만료 {c['expired']} / 밀려남 {c['evicted']}")
+    tick_profiler.end_tick({"agents": len(active_agents), "trades": trades, "llm.calls": llm_stats["calls"],
+                            "llm.timeouts": llm_stats["timeouts"], "llm.fallback": llm_stats["fallback"]})
+    return {"agents": len(active_agents), "trades": trades, "llm": llm_stats}
+
 async def run_simulation_loop():
-    global current_sim_time
+    global current_sim_time, decision_pipeline
     logger.info(f"🚀 [Time Warp] 시뮬레이션 가동! 시작 시간: {current_sim_time.strftime('%H:%M')}")
+    tick = 0
+    if ASYNC_DECISIONS and decision_pipeline is None:
+        decision_pipeline = DecisionPipeline(think_in_background, workers=llm_scheduler.max_concurrency)
+        logger.info("🧠 비동기 의사결정 파이프라인 사용: 틱은 LLM을 기다리지 않고 목표 속도대로 진행")
+    loop = asyncio.get_running_loop()
+    lag, last_started = 0.0, None
     
     while True:
         try:
-            current_sim_time += timedelta(minutes=1)
-            
-            if current_sim_time.minute == 0:
-                logger.info(f"⏰ 현재 가상 시간: {current_sim_time.strftime('%H:%M')}")
-
-            # 💡 [여기서부터 수정] 시간 계산 대신 "마켓메이커"의 주문만 콕 집어서 삭제합니다.
-            for ticker, book in market_engine.order_books.items():
-                # AI의 주문은 살려두고, 마켓 메이커의 거대한 벽만 매 턴마다 허물어줍니다.
-                book["BUY"] = [o for o in book["BUY"] if o["agent_id"] != "MARKET_MAKER"]
-                book["SELL"] = [o for o in book["SELL"] if o["agent_id"] != "MARKET_MAKER"]
-            # 💡 [여기까지 수정 완료]
-
-            # 현실 10분마다 하루가 지나도록 설정 (19시 마감)
-            if current_sim_time.hour >= 19:
-                 logger.info("🌙 장 마감! 다음날 아침으로 점프합니다.")
-                 current_sim_time += timedelta(days=1)
-                 current_sim_time = current_sim_time.replace(hour=9, minute=0)
-            
-            with SessionLocal() as db:
-                all_companies = db.query(DBCompany).all()
-                all_tickers = [c.ticker for c in all_companies] 
-                
-                run_global_market_maker(db, all_tickers, current_sim_time)
-                all_agents = [a.agent_id for a in db.query(DBAgent.agent_id).all() if a.agent_id != "MARKET_MAKER"]
-
-            # 💡 1번 수정: 한 턴에 움직이는 봇의 수를 30명 -> 5명으로 줄입니다. (서버 부하 1/6로 감소!)
-            active_agents = random.sample(all_agents, k=30) if len(all_agents) > 40 else all_agents
-            
-            tasks = []
-            
-            for agent_id in active_agents:
-                my_ticker = random.choice(all_tickers) 
-                tasks.append(run_agent_trade(agent_id, my_ticker, current_sim_time))
-            
-            if active_agents and random.random() < 0.3:
-                chatty_agent = random.choice(active_agents)
-                tasks.append(run_global_chatter(chatty_agent, current_sim_time))
-            
-            await asyncio.gather(*tasks) 
+            started = loop.time()
+            if last_started is not None:
+                tick_pacer.record_interval(started - last_started)
+            last_started = started
+            current_sim_time = advance_clock(current_sim_time)
+            tick += 1
+            stats = await run_tick(current_sim_time, tick)
             
             # 💡 2번 수정: 1초마다 돌던 루프를 3초~5초마다 돌도록 휴식 시간을 줍니다.
-            await asyncio.sleep(1)
+            # → 이제 목표 속도(실제 1초당 가상 N분)에 맞춰 처리 시간을 뺀 만큼만 쉬고, 과부하면 다음 틱 에이전트 수를 줄임
+            # (LLM 적체 = 마감 초과 + 429. 파이프라인 모드에서 버려진 결정은 세지 않음: 예산을 줄일수록 더 버려져 계속 줄어드는 되먹임이 생김)
+            backlog = stats["llm"]["timeouts"] + stats["llm"]["rate_limited"]
+            delay = tick_pacer.observe(loop.time() - started, lag, backlog)
+            requested = loop.time()
+            await asyncio.sleep(delay)
+            # 요청한 것보다 늦게 깨어난 시간 = 이벤트 루프 지연 (API 요청/다른 태스크가 루프를 잡고 있었음)
+            lag = max(0.0, loop.time() - requested - delay)
 
         except Exception as e:
             logger.error(f"🚨 메인 루프 치명적 에러: {e}")
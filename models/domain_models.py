@@ -14,9 +14,18 @@ class OrderSide(str, Enum):
     SELL = "SELL"
 
 class OrderType(str, Enum):
-    """지정가(LIMIT) 주문인지 시장가(MARKET) 주문인지 구분"""
+    """지정가(LIMIT) / 시장가(MARKET) / 조건부(STOP, STOP_LIMIT, TAKE_PROFIT) 주문 구분"""
     LIMIT = "LIMIT"   # 특정 가격에 사겠다
     MARKET = "MARKET" # 지금 당장 사겠다
+    STOP = "STOP"               # 손절(역지정가): 가격이 불리하게 trigger_price에 닿으면 시장가로
+    STOP_LIMIT = "STOP_LIMIT"   # STOP과 같은 조건, 발동하면 price에 지정가로
+    TAKE_PROFIT = "TAKE_PROFIT" # 익절: 가격이 유리하게 trigger_price에 닿으면 시장가로
+
+class TimeInForce(str, Enum):
+    """주문이 호가창에 살아있는 기간"""
+    DAY = "DAY"   # 당일 장 마감(19:00)까지
+    GTT = "GTT"   # 지정한 시각(expire_at)까지 (Good-Till-Time)
+    IOC = "IOC"   # 즉시 체결 가능한 만큼만 체결, 나머지는 바로 취소 (Immediate-Or-Cancel)
 
 # ==========================================
 # 2. Core Models (데이터 구조 정의)
@@ -66,6 +75,9 @@ class Order(BaseModel):
     order_type: OrderType
     quantity: int
     price: Optional[float] = Field(None)
+    trigger_price: Optional[float] = Field(None, description="조건부 주문(STOP/STOP_LIMIT/TAKE_PROFIT) 발동 가격")
+    time_in_force: TimeInForce = Field(TimeInForce.DAY, description="주문 유효 기간")
+    expire_at: Optional[datetime] = Field(None, description="GTT 주문 만료 시각 (시뮬레이션 시간)")
     timestamp: datetime = Field(default_factory=datetime.now)
     status: str = Field("PENDING")
 
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from pydantic import BaseModel
+from typing import Optional
+import os
+import hmac
+
+from core.tick_profiler import tick_profiler
+from core.tick_pacer import tick_pacer
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"])
+
+# X-Admin-Token 헤더가 ADMIN_TOKEN과 같아야 호출 가능 (ADMIN_TOKEN 미설정이면 모두 거부)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def verify_admin(x_admin_token: str = Header(None)):
+    if not ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="관리자 토큰이 필요합니다.")
+    return True
+
+# 1. 틱 단계별 시간 / DB 쿼리 수 / LLM 호출·지연 (최근 N틱 p50/p95/p99)
+@router.get("/tick-profile")
+def get_tick_profile(is_admin: bool = Depends(verify_admin)):
+    return tick_profiler.summary()
+
+# 2. 다음 N틱 동안 cProfile / pyinstrument 트레이스 예약
+@router.post("/tick-profile/trace")
+def request_tick_trace(
+    ticks: int = Query(10, ge=1, le=600, description="트레이스를 뜰 틱 수"),
+    tool: str = Query("cprofile", description="cprofile | pyinstrument"),
+    is_admin: bool = Depends(verify_admin)
+):
+    try:
+        tick_profiler.request_trace(ticks, tool)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "scheduled", "ticks": ticks, "tool": tool}
+
+# 3. 마지막으로 끝난 트레이스 (파일 경로 + 상위 함수 요약)
+@router.get("/tick-profile/trace")
+def get_tick_trace(is_admin: bool = Depends(verify_admin)):
+    if tick_profiler.last_trace is None:
+        raise HTTPException(status_code=404, detail="아직 완료된 트레이스가 없습니다.")
+    return tick_profiler.last_trace
+
+# 4. 틱 속도 조절기 상태 (목표/달성 속도, 틱 처리 시간, 루프 지연, LLM 적체, 현재 에이전트 수)
+class PacingUpdate(BaseModel):
+    sim_minutes_per_sec: Optional[float] = None
+    min_agents: Optional[int] = None
+    max_agents: Optional[int] = None
+
+@router.get("/pacing")
+def get_pacing(is_admin: bool = Depends(verify_admin)):
+    return tick_pacer.status()
+
+# 5. 재시작 없이 목표 속도 / 에이전트 범위 변경 (다음 틱부터 적용)
+@router.put("/pacing")
+def update_pacing(req: PacingUpdate, is_admin: bool = Depends(verify_admin)):
+    try:
+        tick_pacer.configure(rate=req.sim_minutes_per_sec, min_agents=req.min_agents, max_agents=req.max_agents)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return tick_pacer.status()
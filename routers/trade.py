@@ -205,7 +205,7 @@ def place_order(req: OrderRequest, db: Session = Depends(get_db)):
         # 시뮬레이션 시장에도 참고용으로 전송
         try:
             sim_side = OrderSide.BUY if side_str == "BUY" else OrderSide.SELL
-            sim_order = SimOrder(agent_id=str(user_id), ticker=target_ticker, side=sim_side, order_type=OrderType.LIMIT, quantity=quantity, price=order_price)
+            sim_order = SimOrder(order_id=str(order_id), agent_id=str(user_id), ticker=target_ticker, side=sim_side, order_type=OrderType.LIMIT, quantity=quantity, price=order_price)
             market_engine.place_order(db, sim_order)
         except Exception: pass
 
@@ -262,10 +262,11 @@ def cancel_order(order_id: int, db: Session = Depends(get_db)):
         db.execute(text("UPDATE orders SET status = 'CANCELLED' WHERE id = :oid"), {"oid": order_id})
         db.commit()
         
-        # 엔진에서도 삭제 시도
+        # 엔진 호가창에서도 삭제 (DB 주문 번호 = 엔진 order_id)
         try:
-             market_engine.cancel_order(str(user_id), ticker, order_id)
-        except: pass
+            market_engine.cancel_order(str(order_id))
+        except Exception as e:
+            print(f"⚠️ 엔진 주문 취소 실패 (order_id={order_id}): {e}")
         
         return {"status": "success", "message": "주문이 성공적으로 취소되었습니다."}
         
@@ -292,10 +293,10 @@ def get_order_book(company_name: str, is_authorized: bool = Depends(verify_level
     # 💡 실제 호가창 데이터를 가져오는 로직 (임시 하드코딩 제거 고려)
     try:
         if company_name in market_engine.order_books:
-            book = market_engine.order_books[company_name]
-            # 단순 집계
-            asks = [{"price": o["price"], "qty": o["quantity"]} for o in book["SELL"][:5]]
-            bids = [{"price": o["price"], "qty": o["quantity"]} for o in book["BUY"][:5]]
+            # 가격대별 잔량 집계 (엔진이 실시간으로 유지하는 L2 요약)
+            depth = market_engine.top_levels(company_name, 5)
+            asks = [{"price": lv["price"], "qty": lv["volume"]} for lv in depth["asks"]]
+            bids = [{"price": lv["price"], "qty": lv["volume"]} for lv in depth["bids"]]
             return {"company": company_name, "asks": asks, "bids": bids}
     except: pass
     
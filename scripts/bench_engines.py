@@ -0,0 +1,158 @@
+import os
+import sys
+import time
+import queue
+import random
+import argparse
+import resource
+import tempfile
+import multiprocessing as mp
+from datetime import datetime
+
+# 1. 경로 설정
+current_file = os.path.abspath(__file__)
+scripts_folder = os.path.dirname(current_file)
+backend_root = os.path.dirname(scripts_folder)
+if backend_root not in sys.path: sys.path.insert(0, backend_root)
+
+from models.domain_models import Order, OrderSide, OrderType, get_initial_companies
+
+# ------------------------------------------------------------------
+# 매칭 엔진 벤치마크 (두 MarketEngine 비교)
+# - memory: core/market_engine.MarketEngine (순수 인메모리, pydantic 주문 리스트)
+# - team:   core/team_market_engine.MarketEngine (가격대 호가창 + SQLite 일괄 정산)
+# - 같은 시드의 합성 주문 흐름을 그대로 흘려보내고 orders/s, place_order 지연(p50/p99), 최대 RSS 측정
+# - 엔진마다 별도 프로세스에서 돌려서 RSS가 서로 섞이지 않게 함 (DB는 임시 SQLite 파일이라 오프라인 OK)
+# 사용법: python scripts/bench_engines.py --orders 20000 --depth 200 --cross 0.3 --tickers 4
+# ------------------------------------------------------------------
+
+MID_PRICE = 10_000
+N_AGENTS = 200
+
+def make_flow(args, tickers):
+    """
+    (에이전트, 종목, 매수여부, 가격, 수량) 튜플 목록.
+    앞쪽 depth*2*종목수 건은 호가창을 채우는 비체결 주문, 나머지는 cross 비율만큼 스프레드를 넘는 주문.
+    """
+    rnd = random.Random(args.seed)
+    agent = lambda: f"Bench_{rnd.randrange(N_AGENTS):03d}"
+    flow = []
+    for ticker in tickers:
+        for level in range(1, args.depth + 1):
+            flow.append((agent(), ticker, True, MID_PRICE - level, rnd.randint(1, 50)))
+            flow.append((agent(), ticker, False, MID_PRICE + level, rnd.randint(1, 50)))
+    for _ in range(args.orders):
+        is_buy = rnd.random() < 0.5
+        offset = rnd.randint(0, 5) if rnd.random() < args.cross else -rnd.randint(1, args.depth)
+        price = MID_PRICE + offset if is_buy else MID_PRICE - offset
+        flow.append((agent(), rnd.choice(tickers), is_buy, price, rnd.randint(1, 50)))
+    return flow
+
+def to_orders(flow):
+    return [Order(agent_id=a, ticker=t, side=OrderSide.BUY if b else OrderSide.SELL,
+                  order_type=OrderType.LIMIT, quantity=q, price=float(p)) for a, t, b, p, q in flow]
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if sys.platform == "darwin" else rss / 1e3 # macOS는 바이트, 리눅스는 KB
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct))]
+
+
+def run_memory(args, tickers, flow):
+    from core.market_engine import MarketEngine
+    engine = MarketEngine()
+    return replay(engine.place_order, None, to_orders(flow), args)
+
+def run_team(args, tickers, flow):
+    # database 모듈이 import될 때 URL을 읽으므로 반드시 그 전에 임시 SQLite로 지정
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    from database import Base, engine as db_engine, SessionLocal, DBAgent, DBCompany
+    from core.team_market_engine import MarketEngine
+
+    Base.metadata.create_all(bind=db_engine)
+    with SessionLocal() as db:
+        db.add_all([DBCompany(ticker=t, name=t, current_price=MID_PRICE) for t in tickers])
+        db.add_all([DBAgent(agent_id=f"Bench_{i:03d}", cash_balance=1e15, portfolio={t: 10**9 for t in tickers}, psychology={})
+                    for i in range(N_AGENTS)])
+        db.commit()
+
+    engine = MarketEngine(auto_settle=args.settle_every <= 1)
+    sim_time = datetime.now()
+    with SessionLocal() as db:
+        result = replay(lambda o: engine.place_order(db, o, sim_time), lambda: engine.settle(db), to_orders(flow), args)
+    os.remove(db_path)
+    return result
+
+def replay(place, settle, orders, args):
+    latencies = []
+    settle_every = max(1, args.settle_every)
+    start = time.perf_counter()
+    for i, order in enumerate(orders, 1):
+        t0 = time.perf_counter_ns()
+        place(order)
+        latencies.append(time.perf_counter_ns() - t0)
+        if settle and i % settle_every == 0:
+            settle()
+    if settle:
+        settle()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {"orders_per_sec": len(orders) / elapsed, "p50_us": percentile(latencies, 0.50) / 1e3,
+            "p99_us": percentile(latencies, 0.99) / 1e3, "peak_rss_mb": peak_rss_mb()}
+
+RUNNERS = {"memory": run_memory, "team": run_team}
+
+def _child(name, args, tickers, flow, out):
+    out.put(RUNNERS[name](args, tickers, flow))
+
+
+def wait_result(proc, out, poll_sec: float = 1.0):
+    """자식 프로세스 결과를 기다립니다. 결과 없이 죽으면(import/DB 에러, OOM 등) 멈춰 있지 않고 None"""
+    while True:
+        try:
+            result = out.get(timeout=poll_sec)
+        except queue.Empty:
+            if proc.is_alive(): continue
+            try: # 종료 직전에 넣은 결과가 아직 파이프에 남아 있을 수 있음
+                result = out.get(timeout=poll_sec)
+            except queue.Empty:
+                proc.join()
+                return None
+        proc.join()
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MarketEngine 매칭 벤치마크")
+    parser.add_argument("--engine", choices=["memory", "team", "both"], default="both")
+    parser.add_argument("--orders", type=int, default=20_000, help="측정 주문 수 (호가창 채우기 주문 제외)")
+    parser.add_argument("--depth", type=int, default=100, help="종목별 초기 호가 가격대 수 (한쪽 기준)")
+    parser.add_argument("--cross", type=float, default=0.3, help="스프레드를 넘어 체결되는 주문 비율 (0~1)")
+    parser.add_argument("--tickers", type=int, default=4, help="종목 수 (최대 기본 상장사 수)")
+    parser.add_argument("--settle-every", type=int, default=100, help="team 엔진: 주문 N건마다 settle (1이면 주문마다)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # 인메모리 엔진은 기본 상장사 목록만 받으므로 같은 종목을 양쪽에 씀
+    tickers = [c.ticker for c in get_initial_companies()][:max(1, args.tickers)]
+    flow = make_flow(args, tickers)
+    names = ["memory", "team"] if args.engine == "both" else [args.engine]
+
+    print(f"=== ⏱️ 매칭 엔진 벤치마크: 주문 {len(flow):,}건 (호가 깊이 {args.depth}, 체결 비율 {args.cross:.0%}, 종목 {len(tickers)}개) ===")
+    print(f"{'engine':<8} {'orders/s':>12} {'p50(us)':>10} {'p99(us)':>10} {'peak RSS(MB)':>14}")
+    ctx = mp.get_context("spawn")
+    for name in names:
+        out = ctx.Queue()
+        proc = ctx.Process(target=_child, args=(name, args, tickers, flow, out))
+        proc.start()
+        r = wait_result(proc, out)
+        if r is None:
+            sys.exit(f"🚨 {name} 엔진 벤치마크 프로세스가 결과 없이 종료됨 (exit code {proc.exitcode})")
+        print(f"{name:<8} {r['orders_per_sec']:>12,.0f} {r['p50_us']:>10,.1f} {r['p99_us']:>10,.1f} {r['peak_rss_mb']:>14,.1f}")
+
+if __name__ == "__main__":
+    main()
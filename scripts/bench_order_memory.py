@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import random
+import tracemalloc
+from datetime import datetime
+
+# 1. 경로 설정
+current_file = os.path.abspath(__file__)
+scripts_folder = os.path.dirname(current_file)
+backend_root = os.path.dirname(scripts_folder)
+if backend_root not in sys.path: sys.path.insert(0, backend_root)
+
+from models.domain_models import Order, OrderSide, OrderType, TimeInForce
+from core.order_book import OrderBook, BookOrder, AgentRegistry
+
+# ------------------------------------------------------------------
+# 주문 표현 방식 비교 (100k 대기 주문 기준)
+# - 기존: pydantic Order 생성(uuid4/now/검증) → dict로 다시 복사해서 호가창에 보관
+# - 신규: BookOrder(__slots__) 하나만 생성, 가격은 정수 틱 / 에이전트는 정수 핸들
+# 사용법: python scripts/bench_order_memory.py [주문 수]
+# ------------------------------------------------------------------
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+def make_inputs(n):
+    rnd = random.Random(42)
+    return [(f"Citizen_{rnd.randint(1, 475):03d}", rnd.random() < 0.5, rnd.randint(9_500, 10_500), rnd.randint(1, 100)) for _ in range(n)]
+
+def legacy_orders(inputs, sim_time):
+    resting = []
+    for seq, (agent_id, is_buy, price, qty) in enumerate(inputs, 1):
+        order = Order(agent_id=agent_id, ticker="SS011", side=OrderSide.BUY if is_buy else OrderSide.SELL,
+                      order_type=OrderType.LIMIT, quantity=qty, price=price)
+        resting.append({
+            "seq": seq, "order_id": order.order_id, "agent_id": order.agent_id,
+            "price": int(order.price), "quantity": order.quantity, "side": order.side,
+            "tif": order.time_in_force, "expire_at": order.expire_at, "timestamp": sim_time,
+        })
+    return resting
+
+def slotted_orders(inputs, sim_time):
+    registry = AgentRegistry()
+    book = OrderBook("SS011", registry)
+    for seq, (agent_id, is_buy, price, qty) in enumerate(inputs, 1):
+        book.side("BUY" if is_buy else "SELL").add(
+            BookOrder(seq, f"E{seq}", registry.handle(agent_id), "BUY" if is_buy else "SELL", price, qty, TimeInForce.DAY, None, sim_time))
+    return book
+
+def measure(label, fn, inputs, sim_time):
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = fn(inputs, sim_time)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {N / elapsed:>12,.0f} orders/s   {current / N:>8,.1f} B/order   ({current / 1e6:,.1f} MB)")
+    return kept
+
+if __name__ == "__main__":
+    inputs = make_inputs(N)
+    sim_time = datetime.now()
+    print(f"=== 📦 대기 주문 {N:,}건 표현 비교 ===")
+    measure("pydantic Order + dict", legacy_orders, inputs, sim_time)
+    measure("BookOrder + OrderBook", slotted_orders, inputs, sim_time)
@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import logging
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+# 1. 경로 설정
+current_file = os.path.abspath(__file__)
+scripts_folder = os.path.dirname(current_file)
+backend_root = os.path.dirname(scripts_folder)
+if backend_root not in sys.path: sys.path.insert(0, backend_root)
+
+# ------------------------------------------------------------------
+# 헤드리스 고속 시뮬레이션 (Fast-Forward)
+# - FastAPI 없이 main_simulation.run_tick()을 쉬지 않고 돌림 (틱 사이 sleep 없음)
+# - 시드 고정 RNG + 오프라인 의사결정 정책(LLM 호출 없음) + 격리된 SQLite 파일
+# - 재현 모드(기본): 매칭을 스레드 없이 그 자리에서, 에이전트는 고른 순서대로 하나씩, 난수는 에이전트별 생성기
+#   → 같은 --seed면 체결 건수/가격이 실행마다 같음 (--concurrent면 서버처럼 동시 실행 - 처리량 비교용, 재현 안 됨)
+# - 끝나면 ticks/s, fills/s, 틱당 DB 시간 출력 → 처리량 회귀 테스트 / 과거 데이터 생성용
+# 사용법: python scripts/fast_forward.py --days 1 --seed 42 [--db ./ff.db] [--policy offline|llm] [--profile] [--trace N] [--concurrent]
+# ------------------------------------------------------------------
+
+TICKS_PER_DAY = 10 * 60 # 09:00 ~ 19:00, 1틱 = 가상 1분
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="헤드리스 고속 시뮬레이션")
+    parser.add_argument("--days", type=float, default=1, help="돌릴 가상 거래일 수")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default=None, help="SQLite 파일 경로 (기본: 임시 파일, 실행 후 삭제)")
+    parser.add_argument("--policy", choices=["offline", "llm"], default="offline")
+    parser.add_argument("--start", default="2025-01-06", help="가상 시작 날짜 (YYYY-MM-DD, 09:00 시작)")
+    parser.add_argument("--crowd", type=float, default=0, help="벡터화 군중 참여 확률 (0이면 끔, 예: 0.05)")
+    parser.add_argument("--extra-agents", type=int, default=0, help="init_agents 500명 외에 추가할 일반 에이전트 수 (군중 규모 테스트용)")
+    parser.add_argument("--verbose", action="store_true", help="시뮬레이션 로그 출력")
+    parser.add_argument("--profile", action="store_true", help="틱 단계별 시간/DB 쿼리 수 백분위 출력")
+    parser.add_argument("--trace", type=int, default=0, help="첫 N틱 동안 cProfile 트레이스를 떠서 상위 함수 출력")
+    parser.add_argument("--concurrent", action="store_true", help="종목 워커 스레드 + 에이전트 동시 실행 (서버와 같은 경로, 결과 재현 안 됨)")
+    return parser.parse_args()
+
+def setup_database(args):
+    """database 모듈이 import될 때 URL을 읽으므로, main_simulation보다 먼저 격리된 SQLite로 지정"""
+    keep = args.db is not None
+    path = os.path.abspath(args.db) if keep else os.path.join(tempfile.mkdtemp(prefix="ff_"), "fast_forward.db")
+    if os.path.exists(path): os.remove(path)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.pop("MARKET_JOURNAL_DIR", None) # 운영 저널과 섞이지 않게
+    return path, keep
+
+def seed_database(extra_agents: int = 0):
+    from database import init_db, SessionLocal, DBCompany, DBAgent
+    from models.domain_models import get_initial_companies
+    from init_agents import create_agents
+
+    init_db()
+    with SessionLocal() as db:
+        db.add_all([DBCompany(ticker=c.ticker, name=c.name, sector=c.sector, current_price=c.current_price)
+                    for c in get_initial_companies()])
+        db.commit()
+    create_agents() # 전역 random 사용 → 시드 고정이면 같은 에이전트 구성
+    if extra_agents:
+        with SessionLocal() as db:
+            db.bulk_insert_mappings(DBAgent, [{
+                "agent_id": f"Crowd_{i+1:06d}", "cash_balance": float(random.randint(2_000_000, 5_000_000)), "portfolio": {},
+                "psychology": {"safety_needs": random.random(), "social_needs": random.random(),
+                               "fear_index": random.random(), "greed_index": random.random()}
+            } for i in range(extra_agents)])
+            db.commit()
+
+class DBTimer:
+    """SQLAlchemy 커서 실행 시간 합계 (종목 워커 스레드에서도 호출되므로 잠금)"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.total = 0.0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("ff_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["ff_start"].pop()
+        with self._lock:
+            self.total += elapsed
+
+async def fast_forward(args, sim):
+    from database import engine as db_engine
+    timer = DBTimer(db_engine)
+
+    sim_time = datetime.strptime(args.start, "%Y-%m-%d").replace(hour=9, minute=0) - timedelta(minutes=1)
+    n_ticks = int(args.days * TICKS_PER_DAY)
+    fills = 0
+    if args.trace:
+        sim.tick_profiler.request_trace(min(args.trace, n_ticks))
+    start = time.perf_counter()
+    for tick in range(1, n_ticks + 1):
+        sim_time = sim.advance_clock(sim_time)
+        stats = await sim.run_tick(sim_time, tick)
+        fills += stats["trades"]
+    elapsed = time.perf_counter() - start
+    await sim.matching_pool.close()
+
+    mode = "concurrent" if args.concurrent else "deterministic"
+    print(f"=== ⏩ Fast-Forward 결과 (seed {args.seed}, policy {args.policy}, crowd {args.crowd}, {mode}) ===")
+    print(f"가상 기간     : {args.days}일 ({n_ticks:,}틱, 마지막 시각 {sim_time:%Y-%m-%d %H:%M})")
+    print(f"실제 소요     : {elapsed:,.2f}s")
+    print(f"ticks/s       : {n_ticks / elapsed:,.1f}")
+    print(f"fills/s       : {fills / elapsed:,.1f} (총 {fills:,}건)")
+    print(f"DB 시간/틱    : {timer.total / n_ticks * 1000:,.2f}ms ({timer.total / elapsed:.0%} of wall time)")
+    if args.profile:
+        print_profile(sim.tick_profiler.summary())
+    if args.trace and sim.tick_profiler.last_trace:
+        print(f"--- cProfile ({args.trace}틱, {sim.tick_profiler.last_trace['path']}) ---")
+        print(sim.tick_profiler.last_trace["report"])
+
+def print_profile(summary: dict):
+    print(f"--- 틱 프로파일 (최근 {summary['histograms'].get('tick_ms', {}).get('count', 0)}틱) ---")
+    print(f"{'항목':<24}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, h in summary["histograms"].items():
+        if not h.get("count"): continue
+        print(f"{name:<24}{h['p50']:>10,.2f}{h['p95']:>10,.2f}{h['p99']:>10,.2f}{h['max']:>10,.2f}")
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+    path, keep = setup_database(args)
+    seed_database(args.extra_agents)
+
+    import main_simulation as sim
+    from core.offline_policy import offline_think
+    if args.policy == "offline":
+        sim.decision_policy = offline_think
+        sim.ENABLE_CHATTER = False # 수다는 LLM 전용
+        sim.decision_cache = None # 오프라인 정책은 결정이 싸서 캐시할 필요 없음
+    sim.CROWD_PARTICIPATION = args.crowd
+    if not args.concurrent:
+        sim.SERIAL_AGENTS = True
+        sim.matching_pool.inline = True
+        sim.agent_random.seed(args.seed)
+    if not args.verbose:
+        sim.logger.setLevel(logging.WARNING)
+
+    try:
+        asyncio.run(fast_forward(args, sim))
+    finally:
+        if not keep: os.remove(path)
+        else: print(f"DB 파일: {path}")
+
+if __name__ == "__main__":
+    main()
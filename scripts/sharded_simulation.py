@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import logging
+import argparse
+
+# 1. 경로 설정
+current_file = os.path.abspath(__file__)
+scripts_folder = os.path.dirname(current_file)
+backend_root = os.path.dirname(scripts_folder)
+if backend_root not in sys.path: sys.path.insert(0, backend_root)
+
+# ------------------------------------------------------------------
+# 섹터별 멀티 프로세스 시뮬레이션 실행기
+# - 감독 프로세스(이 스크립트) = 정산 writer + 시계, 섹터마다 워커 프로세스 1개 (core/sim_shards.py)
+# - API 서버와 따로 띄우면 시뮬레이션 부하가 API 프로세스의 이벤트 루프를 잡아먹지 않음
+#   (API는 sim_clock 하트비트 / DB로 시뮬레이션 결과를 읽음)
+# - API 서버는 SIM_MODE=external로 띄워야 함 → 서버가 자기 시뮬레이션 루프를 따로 돌리지 않음 (두 시뮬레이션이 같은 DB에 쓰지 않게)
+# 사용법: python scripts/sharded_simulation.py [--days 1] [--shards 4] [--policy offline|llm] [--crowd 0.05] [--seed 42]
+# ------------------------------------------------------------------
+
+TICKS_PER_DAY = 10 * 60 # 09:00 ~ 19:00, 1틱 = 가상 1분
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="섹터별 멀티 프로세스 시뮬레이션")
+    parser.add_argument("--days", type=float, default=None, help="돌릴 가상 거래일 수 (없으면 멈출 때까지)")
+    parser.add_argument("--shards", type=int, default=None, help="최대 워커 프로세스 수 (기본: 섹터 수)")
+    parser.add_argument("--policy", choices=["offline", "llm"], default="llm")
+    parser.add_argument("--crowd", type=float, default=None, help="벡터화 군중 참여 확률 (기본: CROWD_PARTICIPATION 환경변수)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="워커 시뮬레이션 로그 출력")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    os.environ.pop("MARKET_JOURNAL_DIR", None) # 샤드 모드는 저널을 쓰지 않음
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s", datefmt="%H:%M:%S")
+    from core.sim_shards import SimSupervisor
+
+    ticks = int(args.days * TICKS_PER_DAY) if args.days else None
+    supervisor = SimSupervisor(max_shards=args.shards, ticks=ticks, options={
+        "policy": args.policy, "crowd": args.crowd, "seed": args.seed, "verbose": args.verbose})
+    supervisor.start()
+    start = time.perf_counter()
+    try:
+        stats = supervisor.run()
+    except KeyboardInterrupt:
+        stats = supervisor.stats
+    elapsed = time.perf_counter() - start
+
+    print(f"=== 🧩 샤드 시뮬레이션 결과 ({len(supervisor.shards)}개 프로세스, policy {args.policy}) ===")
+    print(f"진행 틱       : {stats['ticks']:,} (마지막 시각 {supervisor.sim_time:%Y-%m-%d %H:%M})")
+    print(f"실제 소요     : {elapsed:,.2f}s")
+    print(f"ticks/s       : {stats['ticks'] / elapsed:,.1f}")
+    print(f"fills/s       : {stats['trades'] / elapsed:,.1f} (총 {stats['trades']:,}건)")
+    for name, trades in stats["by_shard"].items():
+        print(f"  - {name}: {trades:,}건")
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ import os
 
 # 유저님의 핵심 엔진 및 멘토 임포트
 from core.team_market_engine import MarketEngine
+from core.sim_clock import sim_clock
 from models.domain_models import Order, OrderSide, OrderType
 from core.mentor_brain import generate_all_mentors_advice, chat_with_mentor
 
@@ -28,11 +29,9 @@ def get_db():
 def get_current_sim_time(db: Session):
     """
     시뮬레이션의 '가짜 현재 시간'을 가져옵니다.
+    (시뮬레이션 루프가 publish한 시계: 같은 프로세스면 메모리, 아니면 하트비트 행 1개 조회)
     """
-    last_trade = db.query(DBTrade).order_by(desc(DBTrade.timestamp)).first()
-    if last_trade:
-        return last_trade.timestamp
-    return datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    return sim_clock.now(db)
 
 # --- [Schemas] 요청 데이터 검증 ---
 
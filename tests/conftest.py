@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+
+# ------------------------------------------------------------------
+# 테스트 공용 설정
+# - database 모듈은 import될 때 DATABASE_URL을 읽으므로, 어떤 모듈보다 먼저 임시 SQLite로 지정
+# - 저널/운영 설정이 섞이지 않게 관련 환경변수는 지움
+# ------------------------------------------------------------------
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='tests_'), 'test.db')}"
+os.environ.pop("MARKET_JOURNAL_DIR", None)
+
+import pytest
+from core.settlement import AgentLedger
+from core.team_market_engine import MarketEngine
+
+AGENTS = ("A", "B", "C", "D")
+
+
+@pytest.fixture
+def engine():
+    """DB 없이 도는 엔진: 정산 장부에 에이전트를 미리 올려두고(db=None), 정산은 하지 않음"""
+    eng = MarketEngine(auto_settle=False)
+    for i, agent_id in enumerate(AGENTS, 1):
+        eng.settlement.ledgers[agent_id] = AgentLedger(i, agent_id, 10_000_000, {"X": 1000})
+    return eng
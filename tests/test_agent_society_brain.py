@@ -0,0 +1,97 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import core.agent_society_brain as brain
+from core.agent_society_brain import BatchedSocietyThinker
+
+
+def _kwargs(name, price=1000, news="뉴스 없음"):
+    return {"agent_name": name, "context_info": news, "current_price": price, "cash": 1_000_000,
+            "portfolio_qty": 0, "market_sentiment": None}
+
+
+def test_thinker_groups_by_persona_and_ticker(monkeypatch):
+    batches = []
+
+    async def fake_batch(agents, context_info, current_price, market_sentiment=None):
+        batches.append(([a["agent_name"] for a in agents], context_info, current_price))
+        return [{"action": "HOLD", "agent": a["agent_name"]} for a in agents]
+
+    monkeypatch.setattr(brain, "agent_society_think_batch", fake_batch)
+
+    async def scenario():
+        thinker = BatchedSocietyThinker(window=0.01)
+        # Agent_0/1은 가치 투자자(끝자리 0~3), Agent_8은 투기꾼 / 같은 페르소나라도 종목(뉴스·가격)이 다르면 따로
+        return await asyncio.gather(thinker(**_kwargs("Agent_0")), thinker(**_kwargs("Agent_1")),
+                                    thinker(**_kwargs("Agent_8")), thinker(**_kwargs("Agent_2", price=2000, news="다른 종목")))
+
+    results = asyncio.run(scenario())
+    assert [r["agent"] for r in results] == ["Agent_0", "Agent_1", "Agent_8", "Agent_2"]
+    assert sorted(b[0] for b in batches) == [["Agent_0", "Agent_1"], ["Agent_2"], ["Agent_8"]]
+
+
+def test_thinker_flushes_full_batch_and_sends_chatter_alone(monkeypatch):
+    sizes, singles = [], []
+
+    async def fake_batch(agents, *args, **kwargs):
+        sizes.append(len(agents))
+        return [None] * len(agents) # 묶음 응답에 빠진 에이전트 → None (스케줄러가 대체 결정)
+
+    async def fake_single(**kwargs):
+        singles.append(kwargs["agent_name"])
+        return {"action": "HOLD"}
+
+    monkeypatch.setattr(brain, "agent_society_think_batch", fake_batch)
+    monkeypatch.setattr(brain, "agent_society_think", fake_single)
+
+    async def scenario():
+        thinker = BatchedSocietyThinker(batch_size=2, window=10) # 창이 길어도 가득 차면 바로 보냄
+        full = await asyncio.wait_for(asyncio.gather(thinker(**_kwargs("Agent_0")), thinker(**_kwargs("Agent_1"))), 1)
+        chatter = await thinker(**_kwargs("Agent_3", price=0))
+        return full, chatter
+
+    full, chatter = asyncio.run(scenario())
+    assert full == [None, None] and sizes == [2]
+    assert chatter == {"action": "HOLD"} and singles == ["Agent_3"]
+
+
+def test_batch_maps_decisions_by_name_and_skips_missing(monkeypatch):
+    content = json.dumps({"decisions": [
+        {"agent": "Agent_1", "action": "BUY", "price": 1000, "quantity": 3, "thought_process": "간다"},
+        {"agent": "Agent_0", "action": "JUMP", "price": 1000, "quantity": 1},
+    ]})
+
+    async def create(**kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(brain, "get_client", lambda: client)
+
+    decisions = asyncio.run(brain.agent_society_think_batch([_kwargs("Agent_0"), _kwargs("Agent_1")], "뉴스 없음", 1000))
+    assert decisions[0] is None # 잘못된 행동은 버림
+    assert decisions[1]["action"] == "BUY" and decisions[1]["quantity"] == 3 and "agent" not in decisions[1]
+
+
+def test_failed_batch_falls_back_per_agent_through_scheduler(monkeypatch):
+    from core.llm_scheduler import LLMScheduler
+
+    async def failing_batch(agents, *args, **kwargs):
+        raise ValueError("bad json")
+
+    async def offline(**kwargs):
+        return {"action": "HOLD", "agent": kwargs["agent_name"], "offline": True}
+
+    monkeypatch.setattr(brain, "agent_society_think_batch", failing_batch)
+
+    async def scenario():
+        scheduler = LLMScheduler()
+        scheduler.start_tick()
+        thinker = BatchedSocietyThinker(limiter=scheduler, window=0.01)
+        results = await asyncio.gather(*(scheduler.think(thinker, (name, "X"), fallback=offline, **_kwargs(name))
+                                         for name in ("Agent_0", "Agent_1")))
+        return results, scheduler.stats
+
+    results, stats = asyncio.run(scenario())
+    assert [r["agent"] for r in results] == ["Agent_0", "Agent_1"] and all(r["offline"] for r in results)
+    assert stats["calls"] == 1 # 묶음 요청 1번만 한도에 셈
+    assert stats["errors"] == 2 and stats["fallback"] == 2
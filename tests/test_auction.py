@@ -0,0 +1,53 @@
+from datetime import datetime
+from core.order_book import OrderBook, BookOrder
+from core.team_market_engine import MarketEngine
+from models.domain_models import TimeInForce
+
+T0 = datetime(2025, 1, 6, 9, 0)
+
+
+def _book(bids, asks):
+    book = OrderBook("X")
+    seq = 0
+    for side, levels in (("BUY", bids), ("SELL", asks)):
+        for price, qty in levels:
+            seq += 1
+            book.side(side).add(BookOrder(seq, f"O{seq}", 0, side, price, qty, "DAY"))
+    return book
+
+
+def test_uncross_price_maximizes_matched_volume():
+    book = _book(bids=[(102, 10), (101, 10), (100, 10)], asks=[(99, 5), (100, 10), (101, 20)])
+    # 99: 5주, 100: 15주, 101: min(20, 35) = 20주, 102: 10주
+    assert MarketEngine._uncross_price(book) == 101
+
+
+def test_uncross_price_breaks_volume_tie_by_imbalance_then_reference():
+    book = _book(bids=[(101, 10)], asks=[(100, 10), (101, 5)])
+    assert MarketEngine._uncross_price(book) == 100 # 둘 다 10주, 100원이 잔량 차이 0
+
+    book = _book(bids=[(102, 10)], asks=[(100, 10)])
+    assert MarketEngine._uncross_price(book, reference=102) == 102
+    assert MarketEngine._uncross_price(book, reference=99) == 100
+
+
+def test_uncross_price_none_without_cross():
+    assert MarketEngine._uncross_price(_book(bids=[(99, 10)], asks=[(100, 10)])) is None
+    assert MarketEngine._uncross_price(_book(bids=[(99, 10)], asks=[])) is None
+
+
+def test_run_auction_fills_at_one_price_and_cancels_leftover_ioc(engine):
+    engine.start_auction("X", T0)
+    engine.submit(None, "A", "X", "SELL", 5, price=99)
+    engine.submit(None, "B", "X", "SELL", 10, price=101)
+    engine.submit(None, "C", "X", "BUY", 10, price=102)
+    engine.submit(None, "D", "X", "BUY", 10, price=100, time_in_force=TimeInForce.IOC, order_id="ioc")
+    assert engine.settlement.pending_trades == [] # 접수 중에는 체결 없음
+
+    result = engine.run_auction(None, "X", T0)
+
+    assert result["auction_price"] == 101
+    assert {t["price"] for t in engine.settlement.pending_trades} == {101}
+    assert result["filled_qty"] == 10
+    assert result["cancelled"] == 1 and "ioc" not in engine.order_index
+    assert "X" not in engine.auctions
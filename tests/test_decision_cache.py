@@ -0,0 +1,67 @@
+import asyncio
+from core.decision_cache import DecisionCache, decision_key
+
+
+def test_key_buckets_nearby_states_together():
+    a = decision_key("공포", "X", 3, "상승", 100, cash=10_000, portfolio_qty=10, avg_price=98)
+    b = decision_key("공포", "X", 3, "상승", 100, cash=11_000, portfolio_qty=12, avg_price=97)
+    c = decision_key("공포", "X", 3, "상승", 100, cash=10_000, portfolio_qty=10, avg_price=80)
+    assert a == b
+    assert a != c # 수익률 구간이 다름
+
+
+def test_hit_scales_price_and_never_stores_errors():
+    cache = DecisionCache(jitter=0)
+    cache.put("k", {"action": "BUY", "quantity": 10, "price": 100}, current_price=100)
+    cache.put("e", {"action": "HOLD", "error": True}, current_price=100)
+    cache.put("n", None, current_price=100)
+
+    assert cache.get("k", current_price=110) == {"action": "BUY", "quantity": 10, "price": 110}
+    assert cache.get("e", 100) is None and cache.get("n", 100) is None
+    assert cache.stats()["size"] == 1
+
+
+def test_single_flight_shares_one_llm_call():
+    calls = []
+
+    async def agent(cache, price):
+        decision = cache.get("k", price) or await cache.wait("k", price)
+        if decision is not None:
+            return decision
+        token = cache.begin("k")
+        try:
+            calls.append(price)
+            await asyncio.sleep(0.01)
+            decision = {"action": "BUY", "quantity": 5, "price": price}
+            cache.put("k", decision, price)
+            return decision
+        finally:
+            cache.end("k", token)
+
+    async def scenario():
+        cache = DecisionCache(jitter=0)
+        leader = asyncio.create_task(agent(cache, 100))
+        await asyncio.sleep(0) # 리더가 begin()까지 가게
+        results = await asyncio.gather(leader, *(agent(cache, 200) for _ in range(3)))
+        return cache, results
+
+    cache, results = asyncio.run(scenario())
+    assert calls == [100]
+    assert [r["price"] for r in results] == [100, 200, 200, 200]
+    assert cache.stats()["shared"] == 3
+
+
+def test_waiters_compute_themselves_when_leader_fails():
+    async def scenario():
+        cache = DecisionCache()
+        token = cache.begin("k")
+        assert cache.begin("k") is None # 이미 묻는 중
+        waiter = asyncio.create_task(cache.wait("k", 100))
+        await asyncio.sleep(0)
+        cache.end("k", token) # put 없이 끝남 (마감/에러)
+        result = await waiter
+        return result, cache.begin("k")
+
+    result, again = asyncio.run(scenario())
+    assert result is None
+    assert again is not None # 표시가 정리돼서 다음 에이전트가 다시 물어볼 수 있음
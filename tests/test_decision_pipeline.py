@@ -0,0 +1,44 @@
+import asyncio
+from core.decision_pipeline import DecisionPipeline, PendingDecision
+
+
+class _Market:
+    tickers = {"X": None}
+
+
+def test_workers_are_bounded_and_failed_thinks_are_not_queued():
+    active, peak = [0], [0]
+
+    async def think(agent_id, ticker, market):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.01)
+        active[0] -= 1
+        return None if agent_id.startswith("fail") else {"action": "BUY"}
+
+    async def scenario():
+        pipeline = DecisionPipeline(think, cadence=(0.01, 0.02), workers=2)
+        pipeline.update_market(_Market(), tick=1)
+        pipeline.start([f"ok{i}" for i in range(6)] + ["fail0", "fail1"])
+        await asyncio.sleep(0.2)
+        ready = pipeline.drain()
+        await pipeline.close()
+        return ready
+
+    ready = _run(scenario())
+    assert peak[0] == 2
+    assert ready and all(p.agent_id.startswith("ok") for p in ready)
+
+
+def test_drain_drops_stale_decisions():
+    pipeline = DecisionPipeline(None, max_age_ticks=5)
+    pipeline._push(PendingDecision("old", "X", {}, tick=1))
+    pipeline._push(PendingDecision("new", "X", {}, tick=8))
+    pipeline.update_market(None, tick=10)
+
+    assert [p.agent_id for p in pipeline.drain()] == ["new"]
+    assert pipeline.dropped == 1
+
+
+def _run(coro):
+    return asyncio.run(coro)
@@ -0,0 +1,18 @@
+import os
+import re
+import subprocess
+import sys
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "fast_forward.py")
+
+
+def _fills(seed: int) -> int:
+    out = subprocess.run([sys.executable, SCRIPT, "--days", "0.02", "--seed", str(seed)],
+                         capture_output=True, text=True, check=True, timeout=300).stdout
+    return int(re.search(r"총 ([\d,]+)건", out).group(1).replace(",", ""))
+
+
+def test_same_seed_gives_same_fills():
+    first = _fills(7)
+    assert first > 0
+    assert _fills(7) == first
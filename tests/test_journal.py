@@ -0,0 +1,87 @@
+import os
+import pytest
+from datetime import datetime
+from core import journal as jr
+from core.settlement import AgentLedger, mark_settled
+from core.team_market_engine import MarketEngine
+from database import init_db, SessionLocal, DBSimClock
+
+T0 = datetime(2025, 1, 6, 9, 30)
+
+
+@pytest.fixture
+def db():
+    init_db()
+    with SessionLocal() as session:
+        session.query(DBSimClock).delete()
+        session.commit()
+        yield session
+
+
+def _engine():
+    eng = MarketEngine(auto_settle=False)
+    for i, agent_id in enumerate(("A", "B"), 1):
+        eng.settlement.ledgers[agent_id] = AgentLedger(i, agent_id, 1_000_000, {"X": 100})
+    return eng
+
+
+def _tear_tail(journal):
+    """마지막 세그먼트 끝에 쓰다 만 레코드(헤더 + 본문 일부)를 붙임"""
+    path = journal.segments()[-1][1]
+    with open(path, "ab") as f:
+        f.write(jr.encode_clock(T0)[:-3])
+    return path
+
+
+def test_replay_stops_at_torn_record_and_truncates_it(tmp_path):
+    journal = jr.OrderJournal(str(tmp_path)).open()
+    journal.append(jr.encode_remove("o1"))
+    journal.append(jr.encode_clock(T0))
+    journal.close()
+    path = _tear_tail(journal)
+    good_size = os.path.getsize(path) - len(jr.encode_clock(T0)[:-3])
+
+    reopened = jr.OrderJournal(str(tmp_path))
+    records = list(reopened.replay())
+
+    assert records == [(jr.REMOVE, {"order_id": "o1"}), (jr.CLOCK, {"sim_time": T0})]
+    assert os.path.getsize(path) == good_size
+    # 잘라낸 자리부터 이어 쓴 레코드도 다음 재생에서 읽힘
+    reopened.open().append(jr.encode_remove("o2"))
+    reopened.close()
+    assert list(jr.OrderJournal(str(tmp_path)).replay())[-1] == (jr.REMOVE, {"order_id": "o2"})
+
+
+def test_engine_recovers_book_and_unsettled_fill_after_torn_tail(tmp_path, db):
+    eng = _engine()
+    eng.attach_journal(jr.OrderJournal(str(tmp_path)), db)
+    eng.submit(db, "A", "X", "SELL", 5, price=100, order_id="s1")
+    eng.submit(db, "B", "X", "BUY", 2, price=100, order_id="b1")
+    eng.journal_clock(T0)
+    eng.journal.close() # 정산 전에 죽음
+    _tear_tail(eng.journal)
+
+    restored = _engine()
+    assert restored.attach_journal(jr.OrderJournal(str(tmp_path)), db) == T0
+    restored.journal.close()
+
+    assert restored.top_levels("X")["asks"] == [{"price": 100, "volume": 3, "orders": 1}]
+    assert [(t["buyer_id"], t["quantity"]) for t in restored.settlement.pending_trades] == [("B", 2)]
+    assert restored.settlement.fill_seq == 1
+
+
+def test_fills_at_or_below_db_settled_seq_are_not_replayed(tmp_path, db):
+    eng = _engine()
+    eng.attach_journal(jr.OrderJournal(str(tmp_path)), db)
+    eng.submit(db, "A", "X", "SELL", 5, price=100)
+    eng.submit(db, "B", "X", "BUY", 2, price=100)
+    eng.journal.close()
+    mark_settled(db, 1) # DB COMMIT은 끝났는데 SETTLED 기록 전에 죽은 경우
+    db.commit()
+
+    restored = _engine()
+    restored.attach_journal(jr.OrderJournal(str(tmp_path)), db)
+    restored.journal.close()
+
+    assert restored.settlement.pending_trades == []
+    assert restored.settlement.fill_seq == 1
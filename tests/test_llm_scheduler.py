@@ -0,0 +1,92 @@
+import asyncio
+from core.llm_scheduler import TokenBucket, LLMScheduler
+
+
+def test_token_bucket_refills_at_rate_and_caps_at_capacity():
+    bucket = TokenBucket(rate_per_min=60, capacity=2) # 초당 1개
+    assert bucket.wait_time(1, now=0.0) == 0.0
+    bucket.take(2)
+    assert bucket.wait_time(1, now=0.0) == 1.0
+    assert bucket.wait_time(1, now=0.5) == 0.5
+    assert bucket.wait_time(1, now=100.0) == 0.0
+    assert bucket.tokens == 2 # 오래 쉬어도 capacity 이상 쌓이지 않음
+    assert bucket.wait_time(5, now=100.0) == 0.0 # capacity보다 큰 요청은 capacity만큼으로 봄
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _slow(**kwargs):
+    await asyncio.sleep(1)
+    return {"action": "BUY"}
+
+
+async def _offline(**kwargs):
+    return {"action": "HOLD", "offline": True}
+
+
+def test_timeout_falls_back_to_policy_then_to_last_decision():
+    async def scenario():
+        scheduler = LLMScheduler(call_timeout=0.05)
+        scheduler.start_tick(budget=False)
+        first = await scheduler.think(_slow, ("A", "X"), fallback=_offline)
+
+        async def fast(**kwargs): return {"action": "SELL"}
+        seen = []
+        second = await scheduler.think(fast, ("A", "X"), fallback=_offline, on_decision=seen.append)
+        third = await scheduler.think(_slow, ("A", "X"), fallback=_offline, on_decision=seen.append)
+        return first, second, third, seen, scheduler.stats
+
+    first, second, third, seen, stats = _run(scenario())
+    assert first == {"action": "HOLD", "offline": True}
+    assert second == third == {"action": "SELL"} # 마감 초과 → 직전 결정 재사용
+    assert seen == [{"action": "SELL"}]          # 콜백은 제때 나온 결정에만
+    assert (stats["timeouts"], stats["fallback"], stats["reused"]) == (2, 1, 1)
+
+
+def test_errors_without_key_or_fallback_return_none():
+    async def failing(**kwargs): raise ValueError("bad json")
+
+    async def scenario():
+        scheduler = LLMScheduler()
+        scheduler.start_tick()
+        return await scheduler.think(failing, None), scheduler.stats
+
+    decision, stats = _run(scenario())
+    assert decision is None
+    assert stats["errors"] == 1 and stats["fallback"] == 0
+
+
+def test_rate_limit_starts_cooldown():
+    class RateLimitError(Exception): pass
+    calls = []
+
+    async def limited(**kwargs):
+        calls.append(1)
+        raise RateLimitError()
+
+    async def scenario():
+        scheduler = LLMScheduler()
+        scheduler.start_tick()
+        await scheduler.think(limited, ("A", "X"), fallback=_offline)
+        decision = await scheduler.think(limited, ("A", "X"), fallback=_offline) # 쿨다운 중: 호출 없이 대체 정책
+        return decision, scheduler.stats
+
+    decision, stats = _run(scenario())
+    assert decision["offline"] and len(calls) == 1
+    assert stats["rate_limited"] == 1 and stats["fallback"] == 2
+
+
+def test_tick_budget_bounds_every_call():
+    async def scenario():
+        scheduler = LLMScheduler(call_timeout=5, tick_budget=0.05)
+        scheduler.start_tick()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.gather(*(scheduler.think(_slow, (a, "X"), fallback=_offline) for a in "ABC"))
+        return loop.time() - started, scheduler.stats
+
+    elapsed, stats = _run(scenario())
+    assert elapsed < 0.5
+    assert stats["timeouts"] == 3
@@ -0,0 +1,41 @@
+import pytest
+from datetime import datetime, timedelta
+from core.market_context import MarketContext, RecentPrices
+from database import init_db, SessionLocal, DBCompany, DBTrade
+
+T0 = datetime(2025, 1, 6, 9, 0)
+
+
+@pytest.fixture
+def db():
+    init_db()
+    with SessionLocal() as session:
+        session.query(DBTrade).delete()
+        session.query(DBCompany).filter(DBCompany.ticker == "CTX").delete()
+        session.add(DBCompany(ticker="CTX", name="컨텍스트", sector="IT", current_price=100))
+        session.add_all([DBTrade(ticker="CTX", price=p, quantity=1, buyer_id="A", seller_id="B", timestamp=T0 + timedelta(minutes=i))
+                         for i, p in enumerate((100, 101, 110))])
+        session.commit()
+        yield session
+
+
+def test_seeds_window_from_db_once_then_follows_fills(db):
+    companies = db.query(DBCompany).filter(DBCompany.ticker == "CTX").all()
+    recent = RecentPrices(window=3)
+
+    assert MarketContext.build(db, companies, recent)["CTX"].trend.startswith("🔥") # 100 → 110
+
+    db.query(DBTrade).delete() # 두 번째 틱부터는 trades를 다시 읽지 않음
+    db.commit()
+    for price in (109, 105):
+        recent.add("CTX", price)
+    assert recent.ends("CTX") == (105, 110)
+    assert MarketContext.build(db, companies, recent)["CTX"].trend.startswith("😱")
+
+
+def test_seed_keeps_fills_made_before_it():
+    recent = RecentPrices(window=3)
+    recent.add("X", 5) # 예: 저널 재생으로 먼저 들어온 미정산 체결
+    recent.seed("X", [1, 2, 3])
+    assert recent.ends("X") == (5, 2)
+    assert recent.unseeded(["X", "Y"]) == ["Y"]
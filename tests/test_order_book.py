@@ -0,0 +1,182 @@
+from core.order_book import OrderBook, BookOrder, StopOrder, TriggerBook
+from models.domain_models import OrderType, TimeInForce
+
+
+def _order(seq, side, price, qty, agent=0):
+    return BookOrder(seq, f"O{seq}", agent, side, price, qty, "DAY")
+
+
+def test_book_side_orders_by_price_then_arrival():
+    book = OrderBook("X")
+    for seq, price in ((1, 100), (2, 101), (3, 100), (4, 99)):
+        book.bids.add(_order(seq, "BUY", price, 1))
+    for seq, price in ((5, 105), (6, 104), (7, 104)):
+        book.asks.add(_order(seq, "SELL", price, 1))
+
+    assert [o.seq for o in book.bids] == [2, 1, 3, 4]
+    assert [o.seq for o in book.asks] == [6, 7, 5]
+    assert book.bids.best_price() == 101 and book.asks.best_price() == 104
+
+
+def test_engine_fills_best_price_first_and_earlier_order_within_level(engine):
+    engine.submit(None, "A", "X", "SELL", 5, price=101)
+    engine.submit(None, "B", "X", "SELL", 5, price=100)
+    engine.submit(None, "C", "X", "SELL", 5, price=100)
+
+    result = engine.submit(None, "D", "X", "BUY", 12, price=101)
+
+    assert result["filled_qty"] == 12
+    sellers = [t["seller_id"] for t in engine.settlement.pending_trades]
+    assert sellers == ["B", "C", "A"]
+    assert [t["price"] for t in engine.settlement.pending_trades] == [100, 100, 101]
+    # 남은 3주는 101원 매도 호가에 A 주문으로 남음
+    rest = engine.order_books["X"]["SELL"]
+    assert [(o["agent_id"], o["price"], o["quantity"]) for o in rest] == [("A", 101, 3)]
+
+
+def test_cancel_removes_order_and_empty_level(engine):
+    engine.submit(None, "A", "X", "BUY", 5, price=100, order_id="a1")
+    engine.submit(None, "B", "X", "BUY", 5, price=99, order_id="b1")
+
+    assert engine.cancel_order("a1") is True
+    assert engine.cancel_order("a1") is False # 두 번 취소는 실패
+    book = engine.order_books["X"]
+    assert book.bids.best_price() == 99 and 100 not in book.bids.levels
+    assert "a1" not in engine.order_index
+
+
+def test_cancel_agent_orders_only_touches_that_agent(engine):
+    engine.submit(None, "A", "X", "BUY", 1, price=100)
+    engine.submit(None, "A", "Y", "SELL", 1, price=200)
+    engine.submit(None, "B", "X", "BUY", 1, price=100)
+
+    assert engine.cancel_agent_orders("A", ticker="X") == 1
+    assert engine.cancel_agent_orders("A") == 1
+    assert [o["agent_id"] for o in engine.order_books["X"]["BUY"]] == ["B"]
+
+
+def test_resize_keeps_queue_position_and_level_total(engine):
+    engine.submit(None, "A", "X", "SELL", 10, price=100, order_id="a1")
+    engine.submit(None, "B", "X", "SELL", 10, price=100, order_id="b1")
+
+    assert engine.amend_order(None, "a1", quantity=4)["status"] == "PENDING"
+    assert engine.top_levels("X")["asks"] == [{"price": 100, "volume": 14, "orders": 2}]
+
+    engine.submit(None, "C", "X", "BUY", 6, price=100)
+    # 줄인 a1(4주)이 여전히 먼저 체결되고, b1은 8주 남음
+    assert [t["seller_id"] for t in engine.settlement.pending_trades] == ["A", "B"]
+    assert engine.top_levels("X")["asks"] == [{"price": 100, "volume": 8, "orders": 1}]
+
+
+def test_amend_up_moves_to_back_of_queue(engine):
+    engine.submit(None, "A", "X", "SELL", 5, price=100, order_id="a1")
+    engine.submit(None, "B", "X", "SELL", 5, price=100, order_id="b1")
+
+    engine.amend_order(None, "a1", quantity=6)
+    assert [o["order_id"] for o in engine.order_books["X"]["SELL"]] == ["b1", "a1"]
+    assert engine.top_levels("X")["asks"][0]["volume"] == 11
+
+
+def _stop(seq, trigger, rises):
+    return StopOrder(seq, f"S{seq}", "A", "SELL", trigger, None, 1, OrderType.STOP, TimeInForce.DAY, None, rises)
+
+
+def test_pop_triggered_takes_only_crossed_triggers_in_arrival_order():
+    triggers = TriggerBook()
+    for seq, trigger, rises in ((1, 110, True), (2, 105, True), (3, 120, True),
+                                (4, 90, False), (5, 95, False), (6, 80, False), (7, 105, True)):
+        triggers.add(_stop(seq, trigger, rises))
+
+    # 체결가가 95~105를 지나감 → 상승 105 이하(2, 7) + 하락 95 이상(5)
+    assert [o.seq for o in triggers.pop_triggered(95, 105)] == [2, 5, 7]
+    assert triggers.pop_triggered(96, 104) == []
+    assert len(triggers) == 4
+
+    assert triggers.remove(triggers.orders[1]) is True
+    assert [o.seq for o in triggers.pop_triggered(85, 200)] == [3, 4]
+    assert sorted(triggers.orders) == [6]
+
+
+def test_stop_order_fires_when_trade_crosses_trigger(engine):
+    engine.submit(None, "A", "X", "SELL", 1, order_type=OrderType.STOP, trigger_price=95, order_id="stop")
+    engine.submit(None, "B", "X", "BUY", 5, price=94)
+    engine.submit(None, "C", "X", "SELL", 1, price=100)
+    engine.submit(None, "D", "X", "BUY", 1, price=100) # 100원 체결 → 발동 안 함
+    assert "stop" in engine.stop_index
+
+    engine.submit(None, "C", "X", "SELL", 1, price=95)
+    result = engine.submit(None, "B", "X", "BUY", 1, price=95) # 95원 체결 → 시장가 매도로 발동, 94원 매수에 체결
+    assert result["triggered"] == 1 and "stop" not in engine.stop_index
+    assert engine.settlement.pending_trades[-1]["seller_id"] == "A"
+    assert engine.settlement.pending_trades[-1]["price"] == 94
+
+
+def _quotes(engine, side="BUY"):
+    return [(o["agent_id"], o["price"], o["quantity"]) for o in engine.order_books["X"][side]]
+
+
+def test_replace_quotes_cancels_prices_dropped_from_ladder(engine):
+    engine.replace_quotes(None, "X", bids=[(99, 5), (98, 5)], asks=[(101, 5)], agent_id="D")
+    result = engine.replace_quotes(None, "X", bids=[(99, 5)], asks=[(102, 5)], agent_id="D")
+
+    assert result["status"] == "PENDING" # 교차하지 않는 교체는 매칭 없이 끝남
+    assert _quotes(engine, "BUY") == [("D", 99, 5)]
+    assert _quotes(engine, "SELL") == [("D", 102, 5)]
+    assert len(engine.agent_orders[engine.agents.find("D")]) == 2
+
+
+def test_replace_quotes_decrease_keeps_priority_increase_requeues(engine):
+    engine.replace_quotes(None, "X", bids=[(99, 5)], asks=[], agent_id="D")
+    engine.submit(None, "A", "X", "BUY", 3, price=99)
+
+    engine.replace_quotes(None, "X", bids=[(99, 4)], asks=[], agent_id="D")
+    assert _quotes(engine) == [("D", 99, 4), ("A", 99, 3)]
+
+    engine.replace_quotes(None, "X", bids=[(99, 10)], asks=[], agent_id="D")
+    assert _quotes(engine) == [("A", 99, 3), ("D", 99, 10)]
+    assert engine.top_levels("X")["bids"] == [{"price": 99, "volume": 13, "orders": 2}]
+
+
+def test_replace_quotes_matches_only_when_crossed(engine, monkeypatch):
+    calls = []
+    match = engine._match_orders
+    monkeypatch.setattr(engine, "_match_orders", lambda *a, **k: calls.append(a) or match(*a, **k))
+    engine.submit(None, "A", "X", "SELL", 2, price=100)
+    calls.clear()
+
+    assert engine.replace_quotes(None, "X", bids=[(99, 5)], asks=[], agent_id="D")["status"] == "PENDING"
+    assert calls == []
+
+    result = engine.replace_quotes(None, "X", bids=[(100, 5)], asks=[], agent_id="D")
+    assert len(calls) == 1 and result["filled_qty"] == 2
+    assert _quotes(engine) == [("D", 100, 3)]
+
+
+def test_market_order_sweeps_within_band_and_never_rests(engine):
+    for price in (100, 104, 106):
+        engine.submit(None, "A", "X", "SELL", 5, price=price)
+
+    result = engine.submit(None, "B", "X", "BUY", 20, order_type=OrderType.MARKET) # 한도 100 + 5% = 105
+    assert result["filled_qty"] == 10 and result["cancelled_qty"] == 10
+    assert [t["price"] for t in engine.settlement.pending_trades] == [100, 104]
+    assert _quotes(engine, "BUY") == []
+    assert _quotes(engine, "SELL") == [("A", 106, 5)]
+    assert result["order_id"] not in engine.order_index
+
+
+def test_market_sell_fills_at_resting_bid_prices(engine):
+    engine.submit(None, "A", "X", "BUY", 2, price=100)
+    engine.submit(None, "B", "X", "BUY", 2, price=97)
+
+    result = engine.submit(None, "C", "X", "SELL", 3, order_type=OrderType.MARKET)
+    assert [t["price"] for t in engine.settlement.pending_trades] == [100, 97]
+    assert result["filled_qty"] == 3 and _quotes(engine, "SELL") == []
+
+
+def test_market_order_on_empty_side_rests_nothing(engine):
+    engine.submit(None, "A", "X", "BUY", 5, price=100)
+
+    result = engine.submit(None, "B", "X", "BUY", 5, order_type=OrderType.MARKET)
+    assert result["status"] == "CANCELLED" and result["cancelled_qty"] == 5
+    assert _quotes(engine, "BUY") == [("A", 100, 5)]
+    assert _quotes(engine, "SELL") == []
@@ -0,0 +1,64 @@
+import pytest
+from core.settlement import SettlementBatch, AgentLedger
+from database import init_db, SessionLocal, DBAgent, DBCompany
+
+
+@pytest.fixture
+def db():
+    init_db()
+    with SessionLocal() as session:
+        session.query(DBAgent).filter(DBAgent.agent_id.in_(["R1", "R2"])).delete()
+        session.merge(DBCompany(ticker="X", name="엑스", sector="IT", current_price=100))
+        session.add_all([DBAgent(agent_id="R1", cash_balance=1000, portfolio={}, psychology={}),
+                         DBAgent(agent_id="R2", cash_balance=0, portfolio={"X": 5}, psychology={})])
+        session.commit()
+        yield session
+
+
+def _batch():
+    batch = SettlementBatch()
+    batch.ledgers = {"A": AgentLedger(1, "A", 100_000, {}), "B": AgentLedger(2, "B", 0, {"X": 10})}
+    return batch
+
+
+def test_buy_fills_keep_a_weighted_average_cost():
+    batch = _batch()
+    batch.apply_fill(None, "X", "A", "B", 100, 2)
+    batch.apply_fill(None, "X", "A", "B", 130, 1)
+
+    assert batch.ledgers["A"].psychology["avg_price_X"] == 110
+    assert batch.ledgers["A"].dirty
+
+
+def test_selling_out_clears_average_cost():
+    batch = _batch()
+    batch.apply_fill(None, "X", "A", "B", 100, 3)
+    batch.apply_fill(None, "X", "B", "A", 120, 2)
+    assert batch.ledgers["A"].psychology["avg_price_X"] == 100 # 일부 매도는 평단 그대로
+
+    batch.apply_fill(None, "X", "B", "A", 120, 1)
+    assert "X" not in batch.ledgers["A"].portfolio
+    assert "avg_price_X" not in batch.ledgers["A"].psychology
+
+
+def test_reload_picks_up_external_db_writes_for_clean_ledgers(db):
+    batch = SettlementBatch()
+    batch.load(db, ["R1", "R2"])
+    batch.apply_fill(db, "X", "R1", "R2", 100, 1) # R1/R2 정산 대기 중
+    batch.flush(db)
+
+    db.query(DBAgent).filter(DBAgent.agent_id == "R1").update({DBAgent.cash_balance: 5})  # 실행 중 초기화/수동 수정
+    db.commit()
+    batch.take_changed()
+    batch.load(db, ["R1"])
+    assert batch.ledgers["R1"].cash == 5 and batch.take_changed() == {"R1"}
+
+    batch.ledgers["R1"].psychology["note"] = "아직 저장 안 됨"
+    batch.ledgers["R1"].dirty = True
+    db.query(DBAgent).filter(DBAgent.agent_id == "R1").update({DBAgent.cash_balance: 7})
+    db.commit()
+    batch.load(db, ["R1"]) # 정산 대기분이 있는 장부는 다시 읽지 않음
+    assert batch.ledgers["R1"].cash == 5
+
+    batch.ledger(db, "R1") # 단건 조회는 있으면 그대로
+    assert batch.ledgers["R1"].cash == 5
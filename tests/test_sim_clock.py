@@ -0,0 +1,48 @@
+import pytest
+from datetime import datetime
+from core.sim_clock import SimClock, CLOCK_ROW_ID
+from database import init_db, SessionLocal, DBSimClock, DBTrade
+
+T0 = datetime(2025, 1, 6, 10, 30)
+
+
+@pytest.fixture
+def db():
+    init_db()
+    with SessionLocal() as session:
+        session.query(DBSimClock).delete()
+        session.query(DBTrade).delete()
+        session.commit()
+        yield session
+
+
+def test_in_process_value_wins_without_db_reads(db):
+    clock = SimClock(heartbeat=False, external=False)
+    clock.publish(T0, db)
+    assert clock.now(db) == T0
+    assert db.query(DBSimClock).count() == 0 # 하트비트를 끄면 DB에 안 씀
+
+
+def test_heartbeat_row_is_written_and_read_back_by_another_process(db):
+    SimClock(heartbeat=True, external=False).publish(T0, db)
+    later = T0.replace(minute=31)
+    SimClock(heartbeat=True, external=False).publish(later, db) # 두 번째는 같은 행 UPDATE
+    assert db.query(DBSimClock).one().id == CLOCK_ROW_ID
+
+    api = SimClock(external=False) # 시뮬레이션이 안 도는 API 프로세스
+    assert api.now(db) == later
+
+
+def test_external_mode_ignores_in_memory_value(db):
+    SimClock(heartbeat=True, external=False).publish(T0, db)
+    api = SimClock(external=True)
+    api.current = datetime(2020, 1, 1)
+    assert api.now(db) == T0
+
+
+def test_falls_back_to_last_trade_then_market_open(db):
+    clock = SimClock()
+    assert clock.now(db).hour == 9 and clock.now(db).minute == 0
+    db.add(DBTrade(ticker="X", price=1, quantity=1, buyer_id="A", seller_id="B", timestamp=T0))
+    db.commit()
+    assert clock.now(db) == T0
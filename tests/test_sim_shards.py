@@ -0,0 +1,89 @@
+import queue
+import pytest
+from datetime import datetime
+from core.settlement import SettlementBatch
+from core.sim_shards import ShardSpec, ShardSettlementSink, write_tick
+from database import init_db, SessionLocal, DBAgent, DBCompany, DBTrade
+
+MM = "SH_MM"
+T0 = datetime(2025, 1, 6, 10, 0)
+
+
+@pytest.fixture
+def db():
+    init_db()
+    with SessionLocal() as session:
+        session.query(DBAgent).filter(DBAgent.agent_id.in_([MM, "SH_T1", "SH_T2"])).delete()
+        session.query(DBTrade).filter(DBTrade.ticker.in_(["SX", "SY"])).delete()
+        session.merge(DBCompany(ticker="SX", name="에스엑스", sector="IT", current_price=100))
+        session.merge(DBCompany(ticker="SY", name="에스와이", sector="금융", current_price=50))
+        session.add_all([DBAgent(agent_id=MM, cash_balance=1000, portfolio={"SX": 10, "SY": 10}, psychology={}),
+                         DBAgent(agent_id="SH_T1", cash_balance=1000, portfolio={}, psychology={}),
+                         DBAgent(agent_id="SH_T2", cash_balance=0, portfolio={"SY": 5}, psychology={})])
+        session.commit()
+        yield session
+
+
+def _shard(db, index, ticker, trader, out):
+    """샤드 하나 = 자기 장부(마켓 메이커 + 자기 에이전트) + 감독 큐로 보내는 sink"""
+    spec = ShardSpec(ticker, index, 2, [ticker])
+    ledger = SettlementBatch()
+    ledger.load(db, [MM, trader])
+    return ledger, ShardSettlementSink(spec, ledger, out, [MM])
+
+
+def _mm(db):
+    db.expire_all()
+    return db.query(DBAgent).filter(DBAgent.agent_id == MM).one()
+
+
+def test_shared_market_maker_merges_cash_deltas_and_per_shard_positions(db):
+    out = queue.Queue()
+    ledger_x, sink_x = _shard(db, 0, "SX", "SH_T1", out)
+    ledger_y, sink_y = _shard(db, 1, "SY", "SH_T2", out)
+
+    ledger_x.apply_fill(None, "SX", "SH_T1", MM, 100, 2, T0) # 마켓 메이커 매도: 현금 +200, SX 8
+    ledger_y.apply_fill(None, "SY", MM, "SH_T2", 50, 1, T0)  # 마켓 메이커 매수: 현금 -50, SY 11
+    sink_x(T0, 1)
+    sink_y(T0, 1)
+    payloads = [out.get_nowait(), out.get_nowait()]
+
+    # 공용 계정은 절댓값 행 대신 변화량으로만 전달됨
+    assert payloads[0]["shared"][MM] == {"cash_delta": 200, "portfolio": {"SX": 8}}
+    assert payloads[1]["shared"][MM] == {"cash_delta": -50, "portfolio": {"SY": 11}}
+    mm_row = _mm(db).id
+    assert all(row["id"] != mm_row for p in payloads for row in p["agents"])
+
+    assert write_tick(db, payloads) == 2
+    db.commit()
+    mm = _mm(db)
+    assert mm.cash_balance == 1150 # 한 샤드의 절댓값이 다른 샤드 몫을 덮어쓰지 않음
+    assert mm.portfolio == {"SX": 8, "SY": 11}
+    assert db.query(DBAgent.cash_balance).filter(DBAgent.agent_id == "SH_T1").scalar() == 800
+
+
+def test_deltas_are_relative_to_the_last_sent_tick(db):
+    out = queue.Queue()
+    ledger_y, sink_y = _shard(db, 1, "SY", "SH_T2", out)
+
+    ledger_y.apply_fill(None, "SY", "SH_T2", MM, 50, 10, T0) # 마켓 메이커가 SY를 다 팖
+    sink_y(T0, 1)
+    write_tick(db, [out.get_nowait()])
+    db.commit()
+
+    sink_y(T0, 2) # 체결 없는 틱: 공용 계정 변화 없음
+    quiet = out.get_nowait()
+    assert quiet["shared"] == {}
+    write_tick(db, [quiet])
+    db.commit()
+
+    ledger_y.apply_fill(None, "SY", MM, "SH_T2", 40, 2, T0)
+    sink_y(T0, 3)
+    third = out.get_nowait()
+    assert third["shared"][MM]["cash_delta"] == -80 # 첫 틱의 +500을 다시 보내지 않음
+    write_tick(db, [third])
+    db.commit()
+
+    mm = _mm(db)
+    assert mm.cash_balance == 1000 + 500 - 80
+    assert mm.portfolio == {"SX": 10, "SY": 2}
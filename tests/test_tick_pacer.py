@@ -0,0 +1,46 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from core.decision_pipeline import DecisionPipeline, PendingDecision
+from core.tick_pacer import TickPacer
+import routers.admin as admin
+
+
+def test_pacer_backs_off_on_overload_and_grows_with_headroom():
+    pacer = TickPacer(rate=1.0, agents=20, min_agents=5, max_agents=30)
+
+    assert pacer.observe(tick_sec=0.9) == pytest.approx(0.1) # 주기 1초 중 0.9초 → 과부하
+    assert pacer.overloaded and pacer.agents == 16
+    pacer.observe(tick_sec=0.1, backlog=3) # LLM 적체도 과부하
+    assert pacer.agents == 12
+
+    pacer = TickPacer(rate=1.0, agents=5, min_agents=5, max_agents=8)
+    for _ in range(5):
+        pacer.observe(tick_sec=0.1)
+    assert pacer.agents == 8
+
+
+def test_pipeline_drain_respects_budget_round_robin():
+    pipeline = DecisionPipeline(None)
+    for ticker, n in (("X", 3), ("Y", 1), ("Z", 2)):
+        for i in range(n):
+            pipeline._push(PendingDecision(f"{ticker}{i}", ticker, {}, tick=0))
+
+    assert [p.agent_id for p in pipeline.drain(limit=4)] == ["X0", "Y0", "Z0", "X1"]
+    assert [p.agent_id for p in pipeline.drain(limit=4)] == ["X2", "Z1"]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(admin.router)
+    return TestClient(app)
+
+
+def test_admin_fails_closed_without_token(client, monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", None)
+    assert client.get("/api/admin/pacing", headers={"X-Admin-Token": "anything"}).status_code == 403
+
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "secret")
+    assert client.get("/api/admin/pacing").status_code == 403
+    assert client.get("/api/admin/pacing", headers={"X-Admin-Token": "secret"}).status_code == 200
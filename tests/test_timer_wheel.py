@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from core.timer_wheel import TimerWheel
+
+T0 = datetime(2025, 1, 6, 9, 0)
+
+def at(minutes):
+    return T0 + timedelta(minutes=minutes)
+
+
+def test_expires_only_due_keys():
+    wheel = TimerWheel(slots=8)
+    wheel.advance(at(0))
+    wheel.schedule("a", at(2))
+    wheel.schedule("b", at(5))
+
+    assert wheel.advance(at(1)) == []
+    assert wheel.advance(at(3)) == ["a"]
+    assert wheel.advance(at(5)) == ["b"]
+
+
+def test_timer_beyond_one_lap_waits_for_its_minute():
+    wheel = TimerWheel(slots=8)
+    wheel.advance(at(0))
+    wheel.schedule("far", at(11)) # 11 % 8 == 3 → 3분 칸에 있지만 한 바퀴 뒤
+    wheel.schedule("near", at(3))
+
+    assert wheel.advance(at(3)) == ["near"]
+    assert wheel.advance(at(10)) == []
+    assert wheel.advance(at(11)) == ["far"]
+
+
+def test_jump_over_several_laps_fires_everything_due():
+    wheel = TimerWheel(slots=8)
+    wheel.advance(at(0))
+    for m in (1, 7, 9, 30):
+        wheel.schedule(m, at(m))
+
+    assert sorted(wheel.advance(at(25))) == [1, 7, 9]
+    assert wheel.advance(at(30)) == [30]
+
+
+def test_past_time_expires_on_next_advance_and_cancel():
+    wheel = TimerWheel(slots=8)
+    wheel.advance(at(10))
+    wheel.schedule("late", at(4))
+    wheel.schedule("gone", at(12))
+    wheel.cancel("gone", at(12))
+
+    assert wheel.advance(at(11)) == ["late"]
+    assert wheel.advance(at(20)) == []